@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script async_chat_engine.py
+===========================
+Motor assíncrono de chat que atende muitas threads (thread_id) ao mesmo
+tempo no mesmo processo. Usa o MESMO graph do chatbot
+(filternode → chatnode), mas executado com `ainvoke`/`astream` sobre um
+checkpointer SQLite assíncrono (AsyncSqliteSaver + aiosqlite).
+
+Enquanto uma thread espera a resposta da API, o event loop continua
+atendendo as demais, em vez de ficar bloqueado num `input()` + `invoke`.
+
+Exemplo
+-------
+async with AsyncChatEngine("chatbot_memory.db") as engine:
+    resposta = await engine.send("usuario_1", "Olá!")
+    async for token in engine.stream("usuario_2", "Me conte uma história"):
+        print(token, end="")
+
+Run
+---
+uv run async_chat_engine.py --threads 20 --message "Olá!"
+uv run async_chat_engine.py --stub --threads 200
+"""
+import argparse
+import asyncio
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiosqlite
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AnyMessage
+from langgraph.checkpoint.base import BaseCheckpointSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from checkpoint_cache import cached_saver
+from chatbot_with_memory_checkpoints import (
+    CHECKPOINT_SHARDS,
+    DEDUP_MESSAGES,
+    DEFER_MAINTENANCE,
+    ENABLE_SUMMARY,
+    amaintenance_update,
+    build_graph,
+    report_maintenance_error,
+    summary_runnable,
+)
+from compressed_serializer import make_serializer
+from group_commit_saver import (
+    GROUP_COMMIT,
+    AsyncGroupCommitDedupSaver,
+    AsyncGroupCommitSqliteSaver,
+)
+from message_dedup_saver import DedupAsyncSqliteSaver
+from metrics import instrumented_saver, write_metrics_file
+from session_scheduler import SessionScheduler
+from shard_layout import check_layout, shard_paths
+from sharded_saver import ShardedCheckpointSaver
+from storage_profiles import aapply_profile
+from turn_profiler import TurnProfiler, profiled, turn_profiler
+from usage_ledger import USAGE_LEDGER, UsageLedger
+from usage_ledger_saver import ledger_saver
+
+
+def _saver_class(group_commit: bool, dedup: bool) -> type:
+    if group_commit:
+        return AsyncGroupCommitDedupSaver if dedup else AsyncGroupCommitSqliteSaver
+    return DedupAsyncSqliteSaver if dedup else AsyncSqliteSaver
+
+
+async def _has_message_blobs(conn: aiosqlite.Connection) -> bool:
+    async with conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_blobs'"
+    ) as cur:
+        return await cur.fetchone() is not None
+
+
+class AsyncChatEngine:
+    """
+    Executa turnos de conversa de forma assíncrona para várias threads.
+
+    Args:
+        db_path: Arquivo SQLite onde os checkpoints são persistidos
+        chat_llm: Modelo de chat alternativo (ex.: StubChatModel). Por
+            padrão usa o ChatGroq do chatbot.
+        max_concurrent_turns: Número máximo de turnos em andamento ao mesmo
+            tempo (protege a API e o banco contra picos). Turnos da mesma
+            thread sempre rodam um de cada vez (ver session_scheduler.py).
+        deferred_maintenance: Roda recorte/resumo numa task em segundo plano
+            depois da resposta. Por padrão segue DEFER_MAINTENANCE.
+        shards: Número de arquivos SQLite entre os quais as threads são
+            distribuídas. Por padrão segue CHECKPOINT_SHARDS.
+        group_commit: Junta as escritas concorrentes num único COMMIT por
+            lote. Por padrão segue CHECKPOINT_GROUP_COMMIT.
+        dedup_messages: Grava cada mensagem uma vez (ver
+            message_dedup_saver.py). Por padrão segue DEDUP_MESSAGES; um
+            shard que já tem `message_blobs` sempre usa o saver com dedup.
+        usage_ledger: Grava uma linha por turno em `turn_ledger` e aplica
+            os orçamentos de tokens. Por padrão segue USAGE_LEDGER.
+        profile_every: Perfila um a cada N turnos de cada thread (0 desliga,
+            ver turn_profiler.py). Por padrão segue PROFILE_TURNS.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "chatbot_memory.db",
+        chat_llm: Optional[BaseChatModel] = None,
+        max_concurrent_turns: int = 512,
+        deferred_maintenance: Optional[bool] = None,
+        shards: Optional[int] = None,
+        group_commit: Optional[bool] = None,
+        dedup_messages: Optional[bool] = None,
+        usage_ledger: Optional[bool] = None,
+        profile_every: Optional[int] = None,
+    ):
+        self.db_path = db_path
+        self.chat_llm = chat_llm
+        self.max_concurrent_turns = max_concurrent_turns
+        self.deferred_maintenance = (
+            DEFER_MAINTENANCE if deferred_maintenance is None else deferred_maintenance
+        )
+        self.shards = CHECKPOINT_SHARDS if shards is None else shards
+        self.group_commit = GROUP_COMMIT if group_commit is None else group_commit
+        self.dedup_messages = (
+            DEDUP_MESSAGES if dedup_messages is None else dedup_messages
+        )
+        self.usage_ledger = USAGE_LEDGER if usage_ledger is None else usage_ledger
+        self._maintenance_tasks: Dict[str, asyncio.Task] = {}
+        self.conns: List[aiosqlite.Connection] = []
+        self.checkpointer: Optional[BaseCheckpointSaver] = None
+        self.ledger: Optional[UsageLedger] = None
+        self.profiler: Optional[TurnProfiler] = turn_profiler(profile_every)
+        self.graph = None
+        self.scheduler: Optional[SessionScheduler] = None
+
+    async def start(self) -> "AsyncChatEngine":
+        """Abre as conexões assíncronas, cria as tabelas e compila o graph."""
+        check_layout(self.db_path, self.shards)
+        serde = make_serializer()
+        savers = []
+        for path in shard_paths(self.db_path, self.shards):
+            conn = await aiosqlite.connect(path)
+            await aapply_profile(conn)
+            # Checkpoints com referências (gravados pelo chatbot com
+            # DEDUP_MESSAGES=1) só podem ser lidos pelo saver com dedup
+            dedup = self.dedup_messages or await _has_message_blobs(conn)
+            saver = _saver_class(self.group_commit, dedup)(conn, serde=serde)
+            await saver.setup()
+            self.conns.append(conn)
+            savers.append(saver)
+        if self.usage_ledger:
+            # Abre os bancos e lê o gasto de cada thread fora do event loop
+            self.ledger = await asyncio.to_thread(
+                UsageLedger, self.db_path, self.shards
+            )
+        self.checkpointer = instrumented_saver(
+            ledger_saver(
+                cached_saver(
+                    savers[0] if len(savers) == 1 else ShardedCheckpointSaver(savers)
+                ),
+                self.ledger,
+            )
+        )
+        self.graph = build_graph(
+            self.checkpointer,
+            self.chat_llm,
+            deferred_maintenance=self.deferred_maintenance,
+            ledger=self.ledger,
+        )
+        self.scheduler = SessionScheduler(self.graph, self.max_concurrent_turns)
+        return self
+
+    async def close(self) -> None:
+        """Espera a manutenção pendente e fecha as conexões com o banco."""
+        try:
+            if self._maintenance_tasks:
+                tarefas, self._maintenance_tasks = self._maintenance_tasks, {}
+                resultados = await asyncio.gather(
+                    *tarefas.values(), return_exceptions=True
+                )
+                for thread_id, resultado in zip(tarefas, resultados):
+                    if isinstance(resultado, BaseException):
+                        report_maintenance_error(thread_id, resultado)
+        finally:
+            try:
+                if self.ledger is not None:
+                    self.ledger, ledger = None, self.ledger
+                    ledger.close()
+            finally:
+                conns, self.conns = self.conns, []
+                for conn in conns:
+                    try:
+                        await conn.close()
+                    except Exception as e:
+                        print(f"[ERRO] Fechando a conexão SQLite: {e!r}")
+                write_metrics_file()
+
+    async def __aenter__(self) -> "AsyncChatEngine":
+        return await self.start()
+
+    async def __aexit__(self, *exc) -> None:
+        await self.close()
+
+    @staticmethod
+    def config_for(thread_id: str) -> dict:
+        """Configuração do LangGraph para uma thread."""
+        return {"configurable": {"thread_id": thread_id}}
+
+    async def send(
+        self, thread_id: str, text: Optional[str], metadata: Optional[dict] = None
+    ) -> AIMessage:
+        """
+        Executa um turno completo e devolve a resposta do assistente.
+
+        Args:
+            thread_id: Conversa que recebe a mensagem
+            text: Mensagem do usuário. None retoma, a partir do último
+                checkpoint, um turno interrompido (ex.: por um crash)
+            metadata: Valores gravados nos metadados dos checkpoints do turno
+
+        Returns:
+            Última mensagem do estado (a resposta do ChatNode)
+        """
+        config = self.config_for(thread_id)
+        if metadata:
+            config["metadata"] = metadata
+        async with self.scheduler.slot(thread_id):
+            await self._wait_maintenance(thread_id)
+            with profiled(self.profiler, thread_id):
+                response_state = await self.graph.ainvoke(
+                    None if text is None else {"messages": [text]}, config=config
+                )
+            self._schedule_maintenance(thread_id)
+        return response_state["messages"][-1]
+
+    async def stream(self, thread_id: str, text: str) -> AsyncIterator[str]:
+        """
+        Executa um turno devolvendo os pedaços da resposta à medida que chegam.
+
+        O checkpoint é gravado normalmente ao fim do turno.
+        """
+        async with self.scheduler.slot(thread_id):
+            await self._wait_maintenance(thread_id)
+            with profiled(self.profiler, thread_id):
+                async for chunk, metadata in self.graph.astream(
+                    {"messages": [text]},
+                    config=self.config_for(thread_id),
+                    stream_mode="messages",
+                ):
+                    if metadata.get("langgraph_node") == "chatnode" and chunk.content:
+                        yield chunk.content
+            self._schedule_maintenance(thread_id)
+
+    async def history(self, thread_id: str) -> List[AnyMessage]:
+        """Mensagens atualmente guardadas no último checkpoint da thread."""
+        # No slot da thread: `_wait_maintenance` tira a tarefa da fila, e um
+        # `send` concorrente não pode começar enquanto ela ainda grava
+        async with self.scheduler.slot(thread_id):
+            await self._wait_maintenance(thread_id)
+            state_snapshot = await self.graph.aget_state(self.config_for(thread_id))
+        return state_snapshot.values.get("messages", [])
+
+    async def _maintain(self, thread_id: str) -> None:
+        """Aplica recorte/resumo no checkpoint mais recente da thread."""
+        config = self.config_for(thread_id)
+        state_snapshot = await self.graph.aget_state(config)
+        update = await amaintenance_update(
+            state_snapshot.values, ENABLE_SUMMARY, summary_runnable(self.chat_llm)
+        )
+        if update:
+            await self.graph.aupdate_state(config, update, as_node="chatnode")
+
+    def _schedule_maintenance(self, thread_id: str) -> None:
+        if self.deferred_maintenance:
+            self._maintenance_tasks[thread_id] = asyncio.create_task(
+                self._maintain(thread_id)
+            )
+
+    async def _wait_maintenance(self, thread_id: str) -> None:
+        task = self._maintenance_tasks.pop(thread_id, None)
+        if task is not None:
+            # Uma falha só é registrada (ver DeferredMaintenance.wait)
+            try:
+                await task
+            except Exception as e:
+                report_maintenance_error(thread_id, e)
+
+
+async def _demo(threads: int, message: str, db_path: str, stub: bool) -> None:
+    chat_llm = None
+    if stub:
+        from benchmarks.stub_llm import StubChatModel
+
+        chat_llm = StubChatModel()
+
+    async with AsyncChatEngine(db_path, chat_llm=chat_llm) as engine:
+        inicio = time.perf_counter()
+        respostas = await asyncio.gather(
+            *(engine.send(f"usuario_{i}", message) for i in range(1, threads + 1))
+        )
+        tempo = time.perf_counter() - inicio
+
+    for i, resposta in enumerate(respostas[:3], 1):
+        print(f"\n🤖 usuario_{i}: {str(resposta.content)[:200]}")
+    print(f"\n✅ {threads} turnos concorrentes em {tempo:.2f} s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Motor assíncrono de chat")
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--message", default="Olá! Quem é você?")
+    parser.add_argument("--db", default="chatbot_memory.db")
+    parser.add_argument("--stub", action="store_true", help="Usa o LLM stub (sem rede)")
+    args = parser.parse_args()
+
+    asyncio.run(_demo(args.threads, args.message, args.db, args.stub))
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script batch_runner.py
+======================
+Executa em lote conversas roteirizadas (JSONL) pelo graph do chatbot.
+
+Suítes de regressão e importações em massa eram reproduzidas pelo
+`chat_interativo`, uma linha por vez. Aqui cada linha do arquivo é uma
+conversa:
+
+    {"thread_id": "regressao_1", "messages": ["Olá", "Meu nome é Ana", "Qual é o meu nome?"]}
+
+Cada thread avança um turno por vez (a ordem das mensagens importa), mas
+até `concurrency` threads avançam ao mesmo tempo sobre o AsyncChatEngine:
+as chamadas ao LLM e as escritas no SQLite de threads diferentes se
+sobrepõem, em vez de esperarem uma pela outra.
+
+Retomada: o número do turno vai nos metadados dos checkpoints
+(`batch_turn`). Ao rodar de novo sobre o mesmo banco, os turnos já
+gravados são pulados e um turno interrompido no meio (crash depois do
+checkpoint de entrada) é concluído a partir do último checkpoint, sem
+reenviar a mensagem. Uma thread com erro para no turno que falhou; as
+demais seguem e a próxima execução tenta de novo.
+
+Com `--output`, cada resposta é anexada ao arquivo assim que o turno é
+gravado. O banco é a fonte da verdade: um crash entre o checkpoint e a
+linha de saída deixa essa resposta só no banco.
+
+Run
+---
+uv run batch_runner.py conversas.jsonl --db batch.db --concurrency 64
+uv run batch_runner.py conversas.jsonl --db batch.db --output respostas.jsonl --stub
+uv run batch_runner.py conversas.jsonl --stub --profile-every 10   # ver turn_profiler.py
+"""
+import argparse
+import asyncio
+import json
+import time
+from contextlib import aclosing
+from typing import Iterator, Optional, TextIO, Tuple
+
+from langchain_core.language_models import BaseChatModel
+
+from async_chat_engine import AsyncChatEngine
+
+# Chave dos metadados do checkpoint com o número do turno (1, 2, ...)
+TURN_KEY = "batch_turn"
+
+
+def read_conversations(path: str) -> Iterator[dict]:
+    """Conversas do arquivo JSONL (linhas em branco são ignoradas)."""
+    with open(path, encoding="utf-8") as f:
+        for numero, linha in enumerate(f, 1):
+            if not linha.strip():
+                continue
+            conversa = json.loads(linha)
+            if "thread_id" not in conversa or "messages" not in conversa:
+                raise ValueError(
+                    f"{path}:{numero}: cada linha precisa de 'thread_id' e 'messages'"
+                )
+            yield conversa
+
+
+async def completed_turns(engine: AsyncChatEngine, thread_id: str) -> Tuple[int, bool]:
+    """
+    Turnos já gravados da thread e se o último ficou pela metade.
+
+    Returns:
+        (turnos concluídos, True se o turno seguinte foi interrompido)
+    """
+    # O checkpoint mais recente pode ser da manutenção (sem `batch_turn`).
+    # `aclosing` fecha o gerador ao sair cedo: aberto, ele segura o lock
+    # da conexão do AsyncSqliteSaver.
+    historico = engine.graph.aget_state_history(engine.config_for(thread_id))
+    async with aclosing(historico):
+        async for state_snapshot in historico:
+            turno = (state_snapshot.metadata or {}).get(TURN_KEY)
+            if turno is None:
+                continue
+            if state_snapshot.next:
+                return turno - 1, True  # Parou entre dois nós: retoma daqui
+            if state_snapshot.metadata.get("source") == "input":
+                return turno - 1, False  # Só o checkpoint de entrada, sem a mensagem
+            return turno, False
+    return 0, False
+
+
+async def run_conversation(
+    engine: AsyncChatEngine, conversa: dict, saida: Optional[TextIO], stats: dict
+) -> None:
+    """Avança uma thread até o fim do roteiro, pulando os turnos já gravados."""
+    thread_id = str(conversa["thread_id"])
+    feitos, interrompido = await completed_turns(engine, thread_id)
+    stats["skipped_turns"] += feitos
+    for turno, texto in enumerate(conversa["messages"][feitos:], feitos + 1):
+        try:
+            resposta = await engine.send(
+                thread_id,
+                None if interrompido else texto,
+                metadata={TURN_KEY: turno},
+            )
+        except Exception as e:
+            stats["failed_threads"] += 1
+            print(f"[ERRO] {thread_id} turno {turno}: {e}")
+            return
+        if interrompido:
+            stats["resumed_turns"] += 1
+            interrompido = False
+        stats["turns"] += 1
+        if saida is not None:
+            linha = {
+                "thread_id": thread_id,
+                "turn": turno,
+                "response": resposta.content,
+            }
+            saida.write(json.dumps(linha, ensure_ascii=False) + "\n")
+            saida.flush()
+    stats["conversations"] += 1
+
+
+async def run_batch(
+    path: str,
+    db_path: str = "batch_memory.db",
+    chat_llm: Optional[BaseChatModel] = None,
+    concurrency: int = 64,
+    output: Optional[str] = None,
+    profile_every: Optional[int] = None,
+) -> dict:
+    """
+    Executa todas as conversas de `path` e devolve as estatísticas do lote.
+
+    Args:
+        path: Arquivo JSONL com as conversas
+        db_path: Banco SQLite dos checkpoints (o mesmo para retomar)
+        chat_llm: Modelo de chat alternativo (ex.: StubChatModel)
+        concurrency: Threads avançando ao mesmo tempo
+        output: Arquivo JSONL onde anexar as respostas (opcional)
+        profile_every: Perfila um a cada N turnos de cada thread (ver
+            turn_profiler.py). Por padrão segue PROFILE_TURNS.
+    """
+    stats = {
+        "conversations": 0,
+        "turns": 0,
+        "skipped_turns": 0,
+        "resumed_turns": 0,
+        "failed_threads": 0,
+    }
+    fila: asyncio.Queue = asyncio.Queue()
+    for conversa in read_conversations(path):
+        fila.put_nowait(conversa)
+
+    saida = open(output, "a", encoding="utf-8") if output else None
+    inicio = time.perf_counter()
+    try:
+        async with AsyncChatEngine(
+            db_path,
+            chat_llm=chat_llm,
+            max_concurrent_turns=concurrency,
+            profile_every=profile_every,
+        ) as engine:
+
+            async def worker() -> None:
+                while not fila.empty():
+                    await run_conversation(engine, fila.get_nowait(), saida, stats)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+            if engine.profiler is not None:
+                stats["profiles"] = engine.profiler.stats()
+    finally:
+        if saida is not None:
+            saida.close()
+    stats["seconds"] = time.perf_counter() - inicio
+    stats["turns_per_second"] = stats["turns"] / stats["seconds"]
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversas em lote a partir de JSONL")
+    parser.add_argument("conversations", help="Arquivo JSONL com as conversas")
+    parser.add_argument("--db", default="batch_memory.db")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--output", help="Arquivo JSONL para as respostas")
+    parser.add_argument("--stub", action="store_true", help="Usa o LLM stub (sem rede)")
+    parser.add_argument(
+        "--profile-every", type=int, help="Perfila um a cada N turnos de cada thread"
+    )
+    args = parser.parse_args()
+
+    chat_llm = None
+    if args.stub:
+        from benchmarks.stub_llm import StubChatModel
+
+        chat_llm = StubChatModel()
+
+    stats = asyncio.run(
+        run_batch(
+            args.conversations,
+            args.db,
+            chat_llm,
+            args.concurrency,
+            args.output,
+            args.profile_every,
+        )
+    )
+    print(
+        f"✅ {stats['conversations']} conversas, {stats['turns']} turnos em "
+        f"{stats['seconds']:.1f} s ({stats['turns_per_second']:.0f} turnos/s); "
+        f"{stats['skipped_turns']} já gravados, {stats['resumed_turns']} retomados, "
+        f"{stats['failed_threads']} threads com erro"
+    )
+    if "profiles" in stats:
+        perfis = stats["profiles"]
+        print(
+            f"🔥 {perfis['profiled']} turnos perfilados em '{perfis['directory']}' "
+            f"({perfis['skipped']} coincidiram com outro perfil); "
+            f"resumo: uv run turn_profiler.py summary {perfis['directory']}"
+        )
@@ -0,0 +1,16 @@
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Pacote benchmarks
+=================
+Benchmarks offline do chatbot. Todos usam um LLM stub determinístico
+(`benchmarks.stub_llm`), então não precisam de GROQ_API_KEY nem de rede.
+
+`benchmarks.suite` roda os cenários principais e grava um JSON para
+comparar commits.
+
+Run
+---
+uv run python -m benchmarks.async_engine
+uv run python -m benchmarks.suite --output bench.json
+"""
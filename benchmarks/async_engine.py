@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script async_engine.py
+======================
+Mede a vazão (turnos/s) do AsyncChatEngine em função do número de sessões
+concorrentes, usando o LLM stub. Como referência, também mede o caminho
+síncrono atual (`graph.invoke` em sequência, uma thread por vez).
+
+Run
+---
+uv run python -m benchmarks.async_engine
+uv run python -m benchmarks.async_engine --sessions 1,10,100,500 --turns 5 --latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from async_chat_engine import AsyncChatEngine
+from benchmarks.stub_llm import StubChatModel
+from chatbot_with_memory_checkpoints import build_graph
+
+
+def medir_sincrono(db_path: str, turns: int, latency: float) -> dict:
+    """Turnos em sequência com `graph.invoke` (comportamento do chat_interativo)."""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    graph = build_graph(SqliteSaver(conn), StubChatModel(latency=latency))
+    config = {"configurable": {"thread_id": "sync_0"}}
+
+    inicio = time.perf_counter()
+    for turno in range(turns):
+        graph.invoke({"messages": [f"mensagem {turno}"]}, config=config)
+    tempo = time.perf_counter() - inicio
+    conn.close()
+
+    return {"mode": "sync", "sessions": 1, "turns": turns, "seconds": tempo}
+
+
+async def medir_assincrono(
+    db_path: str, sessions: int, turns: int, latency: float
+) -> dict:
+    """Cada sessão faz `turns` turnos em sequência; as sessões rodam em paralelo."""
+
+    async def sessao(engine: AsyncChatEngine, thread_id: str) -> None:
+        for turno in range(turns):
+            await engine.send(thread_id, f"mensagem {turno}")
+
+    async with AsyncChatEngine(
+        db_path, chat_llm=StubChatModel(latency=latency)
+    ) as engine:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(sessao(engine, f"s_{i}") for i in range(sessions)))
+        tempo = time.perf_counter() - inicio
+
+    return {
+        "mode": "async",
+        "sessions": sessions,
+        "turns": sessions * turns,
+        "seconds": tempo,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do AsyncChatEngine")
+    parser.add_argument("--sessions", default="1,10,50,100,200")
+    parser.add_argument("--turns", type=int, default=3, help="Turnos por sessão")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        resultados.append(
+            medir_sincrono(os.path.join(tmp, "sync.db"), args.turns, args.latency)
+        )
+        for n in [int(x) for x in args.sessions.split(",")]:
+            db_path = os.path.join(tmp, f"async_{n}.db")
+            resultados.append(
+                asyncio.run(medir_assincrono(db_path, n, args.turns, args.latency))
+            )
+
+    print("=" * 60)
+    print(f"⚡ VAZÃO vs SESSÕES CONCORRENTES (latência stub {args.latency}s)")
+    print("=" * 60)
+    print(f"{'modo':<8}{'sessões':>10}{'turnos':>10}{'tempo (s)':>12}{'turnos/s':>12}")
+    for r in resultados:
+        r["turns_per_second"] = r["turns"] / r["seconds"]
+        print(
+            f"{r['mode']:<8}{r['sessions']:>10}{r['turns']:>10}"
+            f"{r['seconds']:>12.2f}{r['turns_per_second']:>12.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script batch_runner.py
+======================
+Tempo para reproduzir `--conversations` conversas roteirizadas de
+`--turns` turnos: em sequência com `graph.invoke` (como o
+`chat_interativo`) e com o batch_runner em várias concorrências.
+
+A latência padrão do stub (0.5 s) é a de uma resposta típica da API. O
+modo sequencial levaria horas em 10k conversas, então roda só as
+primeiras `--sequential-sample` e a vazão é comparada por turnos/s.
+
+Também simula um crash: o lote é interrompido no meio (a task é
+cancelada com turnos em andamento) e depois executado de novo sobre o
+mesmo banco. Ao final cada thread deve ter exatamente as mensagens do
+roteiro, na ordem, sem turnos repetidos nem perdidos.
+
+Run
+---
+uv run python -m benchmarks.batch_runner
+uv run python -m benchmarks.batch_runner --conversations 10000 --turns 3 --concurrency 64,256
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+# Sem recorte, para conferir o histórico inteiro depois do crash
+os.environ.setdefault("MAX_CONTEXT_TOKENS", "1000000")
+
+from langchain_core.messages import HumanMessage
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from async_chat_engine import AsyncChatEngine
+from batch_runner import read_conversations, run_batch
+from benchmarks.stub_llm import StubChatModel
+from chatbot_with_memory_checkpoints import build_graph
+
+
+def gerar_conversas(path: str, conversations: int, turns: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(conversations):
+            mensagens = [f"conversa {i}: mensagem {t}" for t in range(turns)]
+            f.write(json.dumps({"thread_id": f"c_{i}", "messages": mensagens}) + "\n")
+
+
+def medir_sequencial(path: str, db_path: str, latency: float, amostra: int) -> dict:
+    """Um turno por vez com `graph.invoke`, como o chat_interativo."""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    graph = build_graph(SqliteSaver(conn), StubChatModel(latency=latency))
+    turnos = 0
+    inicio = time.perf_counter()
+    for conversa in itertools.islice(read_conversations(path), amostra):
+        config = {"configurable": {"thread_id": conversa["thread_id"]}}
+        for texto in conversa["messages"]:
+            graph.invoke({"messages": [texto]}, config=config)
+            turnos += 1
+    tempo = time.perf_counter() - inicio
+    conn.close()
+    return {"mode": "sequencial", "turns": turnos, "seconds": tempo}
+
+
+async def conferir(path: str, db_path: str) -> int:
+    """Threads cujo histórico difere do roteiro (0 = nada perdido ou repetido)."""
+    erradas = 0
+    async with AsyncChatEngine(db_path, chat_llm=StubChatModel(latency=0)) as engine:
+        for conversa in read_conversations(path):
+            historico = await engine.history(conversa["thread_id"])
+            humanas = [m.content for m in historico if isinstance(m, HumanMessage)]
+            erradas += humanas != conversa["messages"]
+    return erradas
+
+
+async def medir_crash(path: str, db_path: str, latency: float, args) -> dict:
+    """Interrompe o lote no meio e executa de novo sobre o mesmo banco."""
+    lote = asyncio.create_task(
+        run_batch(path, db_path, StubChatModel(latency=latency), args.crash_concurrency)
+    )
+    await asyncio.sleep(args.crash_after)
+    lote.cancel()
+    try:
+        await lote
+    except asyncio.CancelledError:
+        pass
+    stats = await run_batch(
+        path, db_path, StubChatModel(latency=latency), args.crash_concurrency
+    )
+    stats["mismatched_threads"] = await conferir(path, db_path)
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do batch_runner")
+    parser.add_argument("--conversations", type=int, default=300)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--concurrency", default="16,64,256")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--sequential-sample", type=int, default=10)
+    parser.add_argument("--crash-after", type=float, default=2.0)
+    parser.add_argument("--crash-concurrency", type=int, default=64)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "conversas.jsonl")
+        gerar_conversas(path, args.conversations, args.turns)
+        resultados.append(
+            medir_sequencial(
+                path, os.path.join(tmp, "seq.db"), args.latency, args.sequential_sample
+            )
+        )
+        for concorrencia in [int(c) for c in args.concurrency.split(",")]:
+            stats = asyncio.run(
+                run_batch(
+                    path,
+                    os.path.join(tmp, f"lote_{concorrencia}.db"),
+                    StubChatModel(latency=args.latency),
+                    concorrencia,
+                )
+            )
+            resultados.append({"mode": f"lote x{concorrencia}", **stats})
+        crash = asyncio.run(
+            medir_crash(path, os.path.join(tmp, "crash.db"), args.latency, args)
+        )
+
+    print("=" * 64)
+    print(
+        f"📦 LOTE ({args.conversations} conversas x {args.turns} turnos, "
+        f"LLM {1000 * args.latency:.0f} ms)"
+    )
+    print("=" * 64)
+    print(f"{'modo':>14}{'turnos':>9}{'tempo s':>10}{'turnos/s':>10}{'ganho':>8}")
+    base = resultados[0]["turns"] / resultados[0]["seconds"]
+    for r in resultados:
+        vazao = r["turns"] / r["seconds"]
+        print(
+            f"{r['mode']:>14}{r['turns']:>9}{r['seconds']:>10.1f}{vazao:>10.0f}"
+            f"{vazao / base:>7.1f}x"
+        )
+    print(
+        f"\n💥 Crash após {args.crash_after} s e nova execução: "
+        f"{crash['skipped_turns']} turnos já gravados, {crash['turns']} executados "
+        f"({crash['resumed_turns']} retomados no meio), "
+        f"{crash['mismatched_threads']} threads com histórico diferente do roteiro"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"runs": resultados, "crash": crash}, f, indent=2)
+    if crash["mismatched_threads"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
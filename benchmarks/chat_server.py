@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script chat_server.py
+=====================
+Teste de carga do ChatService (chat_server.py) com o LLM stub, sem
+abrir porta: os pedidos vão direto ao app ASGI pelo `httpx.ASGITransport`.
+
+Para cada nível de concorrência, `--clients` clientes enviam `--requests`
+mensagens cada (cada cliente na sua própria conversa). Mede pedidos/s, latência
+p50/p99 das respostas 200 e quantos pedidos foram recusados com 429.
+
+No fim, verifica o desligamento: dispara uma rajada, chama `shutdown()`
+no meio dela e confere que todo turno respondido com 200 está no banco
+depois de reabri-lo, e que os pedidos tardios recebem 503.
+
+Run
+---
+uv run python -m benchmarks.chat_server
+uv run python -m benchmarks.chat_server --clients 10,100,1000 --max-in-flight 16 --max-queue 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+import httpx
+
+from benchmarks.stub_llm import StubChatModel
+from chat_server import ChatService
+
+
+def percentil(valores: list, p: float) -> float:
+    if not valores:
+        return 0.0
+    return statistics.quantiles(valores, n=100, method="inclusive")[int(p) - 1]
+
+
+def novo_servico(db_path: str, args) -> ChatService:
+    return ChatService(
+        db_path,
+        chat_llm=StubChatModel(latency=args.latency),
+        max_in_flight=args.max_in_flight,
+        max_queue=args.max_queue,
+    )
+
+
+async def medir_carga(db_path: str, clients: int, args) -> dict:
+    servico = novo_servico(db_path, args)
+    await servico.startup()
+    latencias, status = [], []
+
+    async def cliente(http: httpx.AsyncClient, indice: int) -> None:
+        for n in range(args.requests):
+            inicio = time.perf_counter()
+            r = await http.post(
+                f"/threads/c_{indice}/messages", json={"message": f"mensagem {n}"}
+            )
+            status.append(r.status_code)
+            if r.status_code == 200:
+                latencias.append(time.perf_counter() - inicio)
+
+    transporte = httpx.ASGITransport(app=servico)
+    async with httpx.AsyncClient(
+        transport=transporte, base_url="http://chat", timeout=None
+    ) as http:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente(http, i) for i in range(clients)))
+        tempo = time.perf_counter() - inicio
+    await servico.shutdown()
+
+    return {
+        "clients": clients,
+        "requests": len(status),
+        "ok": status.count(200),
+        "rejected_429": status.count(429),
+        "ok_per_s": status.count(200) / tempo,
+        "p50_ms": 1000 * percentil(latencias, 50),
+        "p99_ms": 1000 * percentil(latencias, 99),
+    }
+
+
+async def verificar_desligamento(db_path: str, args) -> dict:
+    servico = novo_servico(db_path, args)
+    await servico.startup()
+    respondidos, tardios = [], []
+
+    async def enviar(http: httpx.AsyncClient, indice: int) -> None:
+        r = await http.post(f"/threads/d_{indice}/messages", json={"message": "oi"})
+        if r.status_code == 200:
+            respondidos.append(f"d_{indice}")
+        elif r.status_code == 503:
+            tardios.append(f"d_{indice}")
+
+    transporte = httpx.ASGITransport(app=servico)
+    async with httpx.AsyncClient(
+        transport=transporte, base_url="http://chat", timeout=None
+    ) as http:
+        rajada = [
+            asyncio.create_task(enviar(http, i)) for i in range(args.max_in_flight)
+        ]
+        await asyncio.sleep(args.latency / 2)  # Turnos no meio do caminho
+        desligando = asyncio.create_task(servico.shutdown())
+        await asyncio.sleep(0)
+        extras = [
+            asyncio.create_task(enviar(http, args.max_in_flight + i)) for i in range(5)
+        ]
+        await asyncio.gather(*rajada, *extras, desligando)
+
+    # Reabre o banco: todo turno respondido precisa estar persistido
+    reaberto = novo_servico(db_path, args)
+    await reaberto.startup()
+    perdidos = [t for t in respondidos if not await reaberto.engine.history(t)]
+    await reaberto.shutdown()
+
+    return {
+        "answered": len(respondidos),
+        "rejected_503": len(tardios),
+        "lost": perdidos,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Teste de carga do chat_server")
+    parser.add_argument("--clients", default="10,100,500")
+    parser.add_argument("--requests", type=int, default=3, help="Pedidos por cliente")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-in-flight", type=int, default=32)
+    parser.add_argument("--max-queue", type=int, default=64)
+    parser.add_argument("--dir", help="Pasta dos bancos de teste")
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        carga = [
+            asyncio.run(medir_carga(os.path.join(tmp, f"carga_{c}.db"), c, args))
+            for c in [int(n) for n in args.clients.split(",")]
+        ]
+        desligamento = asyncio.run(
+            verificar_desligamento(os.path.join(tmp, "desligamento.db"), args)
+        )
+
+    print("=" * 66)
+    print(
+        f"🌐 CHAT SERVER (em voo {args.max_in_flight}, fila {args.max_queue}, "
+        f"latência {args.latency} s)"
+    )
+    print("=" * 66)
+    print(
+        f"{'clientes':>9}{'pedidos':>9}{'200':>7}{'429':>7}"
+        f"{'ok/s':>9}{'p50 ms':>10}{'p99 ms':>10}"
+    )
+    for r in carga:
+        print(
+            f"{r['clients']:>9}{r['requests']:>9}{r['ok']:>7}{r['rejected_429']:>7}"
+            f"{r['ok_per_s']:>9.1f}{r['p50_ms']:>10.1f}{r['p99_ms']:>10.1f}"
+        )
+    print(
+        f"\n🛑 Desligamento: {desligamento['answered']} respondidos, "
+        f"{desligamento['rejected_503']} recusados com 503, "
+        f"{len(desligamento['lost'])} perdidos"
+    )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"load": carga, "shutdown": desligamento}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script checkpoint_cache.py
+==========================
+Mede a latência de leitura do último checkpoint (`graph.get_state`) e o
+tempo de um turno completo em conversas ativas, com e sem o
+CachedCheckpointSaver. Cada thread recebe `--history` turnos antes da
+medição, sem recorte, para que o checkpoint tenha um histórico grande.
+
+Run
+---
+uv run python -m benchmarks.checkpoint_cache
+uv run python -m benchmarks.checkpoint_cache --threads 20 --history 200
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import chatbot_with_memory_checkpoints as chatbot
+from benchmarks.stub_llm import StubChatModel
+from checkpoint_cache import CachedCheckpointSaver
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def rodar(db_path: str, cache: bool, args) -> dict:
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    memory = SqliteSaver(conn)
+    if cache:
+        memory = CachedCheckpointSaver(memory, max_entries=args.threads)
+    graph = chatbot.build_graph(memory, StubChatModel(latency=0))
+    configs = [
+        {"configurable": {"thread_id": f"thread_{i}"}} for i in range(args.threads)
+    ]
+
+    for turno in range(args.history):
+        for config in configs:
+            graph.invoke({"messages": [f"histórico {turno}"]}, config=config)
+
+    leituras, turnos = [], []
+    for turno in range(args.turns):
+        for config in configs:
+            inicio = time.perf_counter()
+            graph.get_state(config)
+            leituras.append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            graph.invoke({"messages": [f"mensagem {turno}"]}, config=config)
+            turnos.append(time.perf_counter() - inicio)
+
+    stats = memory.stats() if cache else {}
+    conn.close()
+    return {
+        "mode": "cache" if cache else "sqlite",
+        "read_mean_s": statistics.mean(leituras),
+        "read_p95_s": percentil(leituras, 95),
+        "turn_mean_s": statistics.mean(turnos),
+        "hit_rate": stats.get("hit_rate"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do cache de checkpoints")
+    parser.add_argument("--threads", type=int, default=10)
+    parser.add_argument("--history", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    # Sem recorte: o histórico cresce a cada turno
+    chatbot.MAX_CONTEXT_TOKENS = 10**9
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for cache in (False, True):
+            db_path = os.path.join(tmp, f"cache_{cache}.db")
+            resultados.append(rodar(db_path, cache, args))
+
+    print("=" * 62)
+    print(f"🧠 CACHE DE CHECKPOINTS ({args.threads} threads, {args.history} turnos)")
+    print("=" * 62)
+    print(f"{'modo':<8}{'leitura ms':>12}{'p95 ms':>10}{'turno ms':>12}{'acertos':>10}")
+    for r in resultados:
+        acertos = "-" if r["hit_rate"] is None else f"{r['hit_rate']:.0%}"
+        print(
+            f"{r['mode']:<8}{r['read_mean_s'] * 1000:>12.2f}"
+            f"{r['read_p95_s'] * 1000:>10.2f}{r['turn_mean_s'] * 1000:>12.2f}"
+            f"{acertos:>10}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
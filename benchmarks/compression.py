@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script compression.py
+=====================
+Compara bytes no disco e tempo de codificação/decodificação dos
+checkpoints com cada configuração do `compressed_serializer`: sem
+compressão, zlib (níveis 1, 6 e 9), lzma e zlib com dicionário treinado.
+
+Primeiro uma conversa é gravada sem compressão (LLM stub); os objetos
+dos checkpoints e writes dessa conversa são então serializados com cada
+configuração. Em seguida a mesma conversa é regravada, via graph, num
+banco por configuração para medir o tamanho real do arquivo.
+
+Run
+---
+uv run python -m benchmarks.compression
+uv run python -m benchmarks.compression --turns 300 --words 120
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import chatbot_with_memory_checkpoints as chatbot
+from benchmarks.stub_llm import StubChatModel
+from compressed_serializer import (
+    CompressedSerializer,
+    CompressionCipher,
+    make_serializer,
+    raw_samples,
+    train_dictionary,
+)
+
+FRASES = [
+    "Olá, meu nome é Eddy e estou estudando LangGraph",
+    "Você pode me explicar como funciona a memória de curto prazo?",
+    "Qual é a diferença entre checkpoints e o histórico de mensagens?",
+    "Me dê um exemplo de código em Python com SqliteSaver",
+    "Como faço para recortar as mensagens antigas da conversa?",
+]
+
+
+def conversar(db_path: str, serde: CompressedSerializer, args) -> None:
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    stub = StubChatModel(latency=0, response_words=args.words)
+    graph = chatbot.build_graph(SqliteSaver(conn, serde=serde), stub)
+    config = {"configurable": {"thread_id": "bench"}}
+    for turno in range(args.turns):
+        frase = FRASES[turno % len(FRASES)]
+        graph.invoke({"messages": [f"{frase} (turno {turno})"]}, config=config)
+    conn.close()
+
+
+def objetos(db_path: str) -> list:
+    """Checkpoints e writes (já desserializados) gravados na conversa."""
+    serde = make_serializer("none")
+    conn = sqlite3.connect(db_path)
+    linhas = conn.execute("SELECT type, checkpoint FROM checkpoints").fetchall()
+    linhas += conn.execute("SELECT type, value FROM writes").fetchall()
+    conn.close()
+    return [serde.loads_typed(linha) for linha in linhas]
+
+
+def medir(nome: str, serde: CompressedSerializer, objs: list, db_path: str, args):
+    inicio = time.perf_counter()
+    blobs = [serde.dumps_typed(obj) for obj in objs]
+    codificar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for blob in blobs:
+        serde.loads_typed(blob)
+    decodificar = time.perf_counter() - inicio
+
+    conversar(db_path, serde, args)
+    return {
+        "config": nome,
+        "blob_bytes": sum(len(dados) for _, dados in blobs),
+        "file_bytes": os.path.getsize(db_path),
+        "encode_us_per_blob": codificar / len(blobs) * 1e6,
+        "decode_us_per_blob": decodificar / len(blobs) * 1e6,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de compressão")
+    parser.add_argument("--turns", type=int, default=150)
+    parser.add_argument("--words", type=int, default=80)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    # Sem recorte: o histórico cresce e os checkpoints ficam grandes
+    chatbot.MAX_CONTEXT_TOKENS = 10**9
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        base = os.path.join(tmp, "base.db")
+        conversar(base, make_serializer("none"), args)
+        objs = objetos(base)
+        zdict = train_dictionary(raw_samples(base))
+
+        configs = [
+            ("none", make_serializer("none")),
+            ("zlib-1", make_serializer("zlib", 1)),
+            ("zlib-6", make_serializer("zlib", 6)),
+            ("zlib-9", make_serializer("zlib", 9)),
+            ("lzma-6", make_serializer("lzma", 6)),
+        ]
+        dicionario = CompressionCipher("zlib", 6, zdict)
+        configs.append(
+            ("zlib-6+dict", CompressedSerializer(dicionario, make_serializer().serde))
+        )
+
+        for nome, serde in configs:
+            db_path = os.path.join(tmp, f"{nome}.db")
+            resultados.append(medir(nome, serde, objs, db_path, args))
+
+    print("=" * 70)
+    print(f"🗜️  COMPRESSÃO DOS CHECKPOINTS ({len(objs)} blobs, {args.turns} turnos)")
+    print("=" * 70)
+    print(
+        f"{'config':<13}{'blobs KB':>10}{'arquivo KB':>12}{'razão':>8}"
+        f"{'enc µs':>10}{'dec µs':>10}"
+    )
+    referencia = resultados[0]["blob_bytes"]
+    for r in resultados:
+        print(
+            f"{r['config']:<13}{r['blob_bytes'] / 1024:>10.1f}"
+            f"{r['file_bytes'] / 1024:>12.1f}{referencia / r['blob_bytes']:>8.2f}"
+            f"{r['encode_us_per_blob']:>10.1f}{r['decode_us_per_blob']:>10.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
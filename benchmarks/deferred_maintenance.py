@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script deferred_maintenance.py
+==============================
+Compara o tempo até a resposta de cada turno com a manutenção da memória
+(resumo + recorte) no caminho crítico e com a manutenção adiada
+(DeferredMaintenance, em segundo plano depois da resposta).
+
+O resumo usa o mesmo LLM stub do chat, então cada lote de recorte custa
+uma chamada extra de `--latency` segundos. O `--think` simula o tempo que
+o usuário leva para digitar a próxima mensagem.
+
+Run
+---
+uv run python -m benchmarks.deferred_maintenance
+uv run python -m benchmarks.deferred_maintenance --turns 200 --latency 0.2 --think 0.3
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import chatbot_with_memory_checkpoints as chatbot
+from benchmarks.stub_llm import StubChatModel
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def rodar(
+    db_path: str, deferred: bool, turns: int, latency: float, think: float
+) -> dict:
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    stub = StubChatModel(latency=latency)
+    graph = chatbot.build_graph(
+        SqliteSaver(conn), stub, summarize=True, deferred_maintenance=deferred
+    )
+    maintenance = chatbot.DeferredMaintenance(graph, stub, summarize=True)
+    config = {"configurable": {"thread_id": "bench"}}
+
+    tempos = []
+    for turno in range(turns):
+        inicio = time.perf_counter()
+        if deferred:
+            maintenance.wait(config)
+        graph.invoke({"messages": [f"mensagem número {turno}"]}, config=config)
+        tempos.append(time.perf_counter() - inicio)
+        if deferred:
+            maintenance.schedule(config)
+        time.sleep(think)
+
+    maintenance.shutdown()
+    mensagens = len(graph.get_state(config).values["messages"])
+    conn.close()
+
+    return {
+        "mode": "deferred" if deferred else "inline",
+        "turns": turns,
+        "mean_s": statistics.mean(tempos),
+        "p50_s": percentil(tempos, 50),
+        "p95_s": percentil(tempos, 95),
+        "max_s": max(tempos),
+        "final_messages": mensagens,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark da manutenção adiada")
+    parser.add_argument("--turns", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--think", type=float, default=0.2)
+    parser.add_argument("--high", type=int, default=800)
+    parser.add_argument("--low", type=int, default=480)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    chatbot.MAX_CONTEXT_TOKENS = args.high
+    chatbot.CONTEXT_LOW_WATERMARK_TOKENS = args.low
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for deferred in (False, True):
+            db_path = os.path.join(tmp, f"deferred_{deferred}.db")
+            resultados.append(
+                rodar(db_path, deferred, args.turns, args.latency, args.think)
+            )
+
+    print("=" * 66)
+    print("⏱️  TEMPO ATÉ A RESPOSTA: manutenção no turno vs adiada")
+    print("=" * 66)
+    print(f"{'modo':<10}{'média ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'máx ms':>10}")
+    for r in resultados:
+        print(
+            f"{r['mode']:<10}{r['mean_s'] * 1000:>10.1f}{r['p50_s'] * 1000:>10.1f}"
+            f"{r['p95_s'] * 1000:>10.1f}{r['max_s'] * 1000:>10.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
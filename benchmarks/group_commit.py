@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script group_commit.py
+======================
+Turnos/s do AsyncChatEngine com e sem group commit, para vários números
+de sessões concorrentes. Cada turno grava alguns checkpoints e writes;
+sem group commit cada um é um COMMIT (fsync) separado.
+
+Use `--dir` num disco real: em tmpfs o fsync é gratuito e a diferença
+fica só no custo do COMMIT em si.
+
+Run
+---
+uv run python -m benchmarks.group_commit --dir .
+uv run python -m benchmarks.group_commit --sessions 1,100,400 --window-ms 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from async_chat_engine import AsyncChatEngine
+from benchmarks.stub_llm import StubChatModel
+from group_commit_saver import AsyncGroupCommitMixin
+
+
+async def medir(db_path: str, sessions: int, group_commit: bool, args) -> dict:
+    async def sessao(engine: AsyncChatEngine, thread_id: str) -> None:
+        for turno in range(args.turns):
+            await engine.send(thread_id, f"mensagem {turno}")
+
+    async with AsyncChatEngine(
+        db_path,
+        chat_llm=StubChatModel(latency=args.latency),
+        group_commit=group_commit,
+    ) as engine:
+        saver = engine.checkpointer
+        while hasattr(saver, "saver"):  # Tira os wrappers (métricas, cache...)
+            saver = saver.saver
+        if isinstance(saver, AsyncGroupCommitMixin):
+            saver.group_commit.window = args.window_ms / 1000
+            saver.group_commit.max_batch = args.max_batch
+        inicio = time.perf_counter()
+        await asyncio.gather(*(sessao(engine, f"s_{i}") for i in range(sessions)))
+        tempo = time.perf_counter() - inicio
+        lotes = saver.group_commit.stats() if group_commit else {}
+
+    return {
+        "group_commit": group_commit,
+        "sessions": sessions,
+        "turns": sessions * args.turns,
+        "turns_per_s": sessions * args.turns / tempo,
+        "mean_batch": lotes.get("mean_batch"),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do group commit")
+    parser.add_argument("--sessions", default="1,50,200")
+    parser.add_argument("--turns", type=int, default=5, help="Turnos por sessão")
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument(
+        "--dir", help="Pasta dos bancos de teste (use um disco real, não tmpfs)"
+    )
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for sessions in [int(n) for n in args.sessions.split(",")]:
+            for group_commit in (False, True):
+                db_path = os.path.join(tmp, f"gc_{sessions}_{group_commit}.db")
+                resultados.append(
+                    asyncio.run(medir(db_path, sessions, group_commit, args))
+                )
+
+    print("=" * 58)
+    print(f"📦 GROUP COMMIT (janela {args.window_ms} ms, lote máx. {args.max_batch})")
+    print("=" * 58)
+    print(f"{'sessões':>8}{'modo':>12}{'turnos/s':>12}{'lote médio':>12}")
+    for r in resultados:
+        modo = "agrupado" if r["group_commit"] else "1 por put"
+        lote = f"{r['mean_batch']:.1f}" if r["mean_batch"] is not None else "-"
+        print(f"{r['sessions']:>8}{modo:>12}{r['turns_per_s']:>12.1f}{lote:>12}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script hedging.py
+=================
+Latência dos turnos com e sem hedged requests, usando um LLM stub de
+cauda pesada: a maioria das chamadas leva `--latency` segundos (com
+dispersão log-normal), mas uma fração `--tail-prob` leva `--tail-latency`.
+
+Mede p50/p95/p99 do turno completo (AsyncChatEngine.send) e a carga extra
+(cópias enviadas / chamadas). Os dois modos usam a mesma semente, então
+veem a mesma sequência de latências do stub.
+
+Run
+---
+uv run python -m benchmarks.hedging
+uv run python -m benchmarks.hedging --tail-prob 0.05 --tail-latency 3 --max-extra 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from async_chat_engine import AsyncChatEngine
+from benchmarks.stub_llm import StubChatModel
+from hedged_llm import Hedger, hedged
+
+
+def percentil(valores: list, p: float) -> float:
+    return statistics.quantiles(valores, n=100, method="inclusive")[int(p) - 1]
+
+
+async def medir(db_path: str, com_hedge: bool, args) -> dict:
+    random.seed(args.seed)
+    stub = StubChatModel(
+        latency=args.latency,
+        latency_sigma=0.3,
+        tail_probability=args.tail_prob,
+        tail_latency=args.tail_latency,
+    )
+    hedger = Hedger(
+        percentile=args.percentile,
+        max_extra=args.max_extra,
+        initial_delay=args.latency * 3,
+    )
+    chat_llm = hedged(stub, hedger) if com_hedge else stub
+    latencias = []
+
+    async def sessao(engine: AsyncChatEngine, thread_id: str) -> None:
+        for turno in range(args.turns):
+            inicio = time.perf_counter()
+            await engine.send(thread_id, f"mensagem {turno}")
+            latencias.append(time.perf_counter() - inicio)
+
+    async with AsyncChatEngine(db_path, chat_llm=chat_llm) as engine:
+        await asyncio.gather(*(sessao(engine, f"s_{i}") for i in range(args.sessions)))
+
+    stats = hedger.stats()
+    return {
+        "hedging": com_hedge,
+        "turns": len(latencias),
+        "p50_ms": 1000 * percentil(latencias, 50),
+        "p95_ms": 1000 * percentil(latencias, 95),
+        "p99_ms": 1000 * percentil(latencias, 99),
+        "extra_load": stats["extra_load"] if com_hedge else 0.0,
+        "hedge_wins": stats["hedge_wins"] if com_hedge else 0,
+        "delay_ms": stats["delay_ms"] if com_hedge else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de hedged requests")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=50, help="Turnos por sessão")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--tail-prob", type=float, default=0.03)
+    parser.add_argument("--tail-latency", type=float, default=1.0)
+    parser.add_argument("--percentile", type=float, default=95)
+    parser.add_argument("--max-extra", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        resultados = [
+            asyncio.run(medir(os.path.join(tmp, f"hedge_{h}.db"), h, args))
+            for h in (False, True)
+        ]
+
+    print("=" * 72)
+    print(
+        f"🪁 HEDGING (cauda: {args.tail_prob:.0%} das chamadas em "
+        f"{args.tail_latency} s; cópia no p{args.percentile:.0f}, "
+        f"extra máx. {args.max_extra:.0%})"
+    )
+    print("=" * 72)
+    print(
+        f"{'modo':>10}{'turnos':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        f"{'extra':>8}{'cópias venceram':>17}"
+    )
+    for r in resultados:
+        modo = "hedging" if r["hedging"] else "simples"
+        print(
+            f"{modo:>10}{r['turns']:>8}{r['p50_ms']:>9.0f}{r['p95_ms']:>9.0f}"
+            f"{r['p99_ms']:>9.0f}{r['extra_load']:>8.1%}{r['hedge_wins']:>17}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
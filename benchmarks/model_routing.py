@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script model_routing.py
+=======================
+Latência média e custo por turno com e sem roteamento de modelos.
+
+Dois LLMs stub fazem o papel do modelo rápido (`--fast-latency`) e do
+grande (`--large-latency`); o custo usa os preços de MODEL_PRICES para
+`llama-3.1-8b-instant` e `llama-3.3-70b-versatile`. Uma fração
+`--simple-share` das mensagens é trivial ("obrigado", "ok"...).
+
+Cenários:
+  só grande       todos os turnos no modelo grande (como hoje)
+  roteado         turnos simples no rápido, o resto no grande
+  rápido lento    o rápido passa a levar `--degraded-latency` s por chamada
+  rápido falhando o rápido falha em 100% das chamadas
+
+Nos dois últimos o ModelRouter deve desviar o tráfego para o grande sem
+perder turnos.
+
+Run
+---
+uv run python -m benchmarks.model_routing
+uv run python -m benchmarks.model_routing --simple-share 0.3 --sessions 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from async_chat_engine import AsyncChatEngine
+from benchmarks.stub_llm import StubChatModel
+from model_router import ModelRouter, Route, routed
+
+FAST = "llama-3.1-8b-instant"
+LARGE = "llama-3.3-70b-versatile"
+
+SIMPLES = ["obrigado", "ok", "valeu!", "bom dia", "sim, pode ser", "entendi"]
+COMPLEXAS = [
+    "Explique passo a passo como o checkpointer do LangGraph salva o estado",
+    "Compare SQLite e Postgres para guardar o histórico de conversas",
+    "Escreva o código de uma função que resume mensagens antigas da conversa "
+    "quando o contexto passa de um limite de tokens",
+    "Por que a latência do p99 importa mais do que a média num chat?",
+]
+
+CENARIOS = ["só grande", "roteado", "rápido lento", "rápido falhando"]
+
+
+def percentil(valores: list, p: float) -> float:
+    return statistics.quantiles(valores, n=100, method="inclusive")[int(p) - 1]
+
+
+async def medir(db_path: str, cenario: str, args) -> dict:
+    random.seed(args.seed)
+    rapido = StubChatModel(latency=args.fast_latency, latency_sigma=0.3)
+    grande = StubChatModel(latency=args.large_latency, latency_sigma=0.3)
+    if cenario == "rápido lento":
+        rapido.tail_probability, rapido.tail_latency = 1.0, args.degraded_latency
+    if cenario == "rápido falhando":
+        rapido.error_probability = 1.0
+    router = ModelRouter(
+        Route(FAST, rapido),
+        Route(LARGE, grande),
+        max_latency=args.max_latency,
+        cooldown=args.cooldown,
+        # Sem roteamento: nenhuma mensagem é "simples", tudo vai para o grande
+        simple_max_words=-1 if cenario == "só grande" else 12,
+    )
+    latencias, falhas = [], 0
+
+    async def sessao(engine: AsyncChatEngine, thread_id: str) -> None:
+        nonlocal falhas
+        for _ in range(args.turns):
+            simples = random.random() < args.simple_share
+            mensagem = random.choice(SIMPLES if simples else COMPLEXAS)
+            inicio = time.perf_counter()
+            try:
+                await engine.send(thread_id, mensagem)
+            except Exception:
+                falhas += 1
+                continue
+            latencias.append(time.perf_counter() - inicio)
+
+    async with AsyncChatEngine(db_path, chat_llm=routed(router)) as engine:
+        await asyncio.gather(*(sessao(engine, f"s_{i}") for i in range(args.sessions)))
+
+    stats = router.stats()
+    custo = sum(r["cost_usd"] for r in stats["routes"].values())
+    return {
+        "scenario": cenario,
+        "turns": len(latencias),
+        "failed": falhas,
+        "mean_ms": 1000 * statistics.mean(latencias),
+        "p95_ms": 1000 * percentil(latencias, 95),
+        "cost_usd_per_1k_turns": 1000 * custo / max(len(latencias), 1),
+        "router": stats,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de roteamento de modelos")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=40, help="Turnos por sessão")
+    parser.add_argument("--simple-share", type=float, default=0.5)
+    parser.add_argument("--fast-latency", type=float, default=0.03)
+    parser.add_argument("--large-latency", type=float, default=0.15)
+    parser.add_argument("--degraded-latency", type=float, default=0.6)
+    parser.add_argument("--max-latency", type=float, default=0.3)
+    parser.add_argument("--cooldown", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        resultados = [
+            asyncio.run(medir(os.path.join(tmp, f"rota_{n}.db"), cenario, args))
+            for n, cenario in enumerate(CENARIOS)
+        ]
+
+    print("=" * 78)
+    print(
+        f"🔀 ROTEAMENTO ({args.simple_share:.0%} de turnos simples; rápido "
+        f"{1000 * args.fast_latency:.0f} ms, grande {1000 * args.large_latency:.0f} ms)"
+    )
+    print("=" * 78)
+    print(
+        f"{'cenário':>16}{'turnos':>8}{'falhas':>8}{'média ms':>10}{'p95 ms':>9}"
+        f"{'US$/1k':>9}{'rápido':>8}{'grande':>8}{'desvios':>9}"
+    )
+    for r in resultados:
+        rotas = r["router"]["routes"]
+        print(
+            f"{r['scenario']:>16}{r['turns']:>8}{r['failed']:>8}"
+            f"{r['mean_ms']:>10.0f}{r['p95_ms']:>9.0f}"
+            f"{r['cost_usd_per_1k_turns']:>9.4f}"
+            f"{rotas[FAST]['calls']:>8}{rotas[LARGE]['calls']:>8}"
+            f"{r['router']['decisions']['fallback']:>9}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script rate_limiter.py
+======================
+Compara, contra o servidor Groq falso (stub_groq_server.py), duas formas
+de várias sessões dividirem a mesma API key:
+
+- "retry cego": ChatGroq(max_retries=2), como no chatbot hoje;
+- "agendador": ChatGroq(max_retries=0) atrás do RateLimiter.
+
+`--sessions` sessões fazem `--calls` chamadas cada, todas ao mesmo tempo.
+Metade das sessões usa prioridade de segundo plano, para mostrar que as
+chamadas de chat passam na frente. Mede chamadas concluídas e falhas,
+quantos 429 o servidor devolveu, chamadas/s e latência p50/p99.
+
+Run
+---
+uv run python -m benchmarks.rate_limiter
+uv run python -m benchmarks.rate_limiter --sessions 100 --rpm 1200 --burst 1
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from langchain_groq import ChatGroq
+
+from benchmarks.stub_groq_server import StubGroqServer
+from llm_rate_limiter import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_CHAT,
+    RateLimiter,
+    rate_limited,
+)
+
+
+def percentil(valores: list, p: float) -> float:
+    if len(valores) < 2:
+        return valores[0] if valores else 0.0
+    return statistics.quantiles(valores, n=100, method="inclusive")[int(p) - 1]
+
+
+async def medir(modo: str, args) -> dict:
+    servidor = StubGroqServer(
+        rpm=args.rpm, tpm=args.tpm, latency=args.latency, burst_seconds=args.burst
+    )
+    limiter = RateLimiter(
+        rpm=args.rpm,
+        tpm=args.tpm,
+        base_delay=0.2,
+        max_delay=5.0,
+        burst_seconds=args.burst,
+    )
+    latencias = {PRIORITY_CHAT: [], PRIORITY_BACKGROUND: []}
+    falhas = 0
+
+    with servidor:
+        llm = ChatGroq(
+            model="stub",
+            api_key="stub",
+            base_url=servidor.url,
+            max_retries=2 if modo == "retry cego" else 0,
+        )
+        modelo = rate_limited(llm, limiter) if modo == "agendador" else llm
+
+        async def sessao(indice: int) -> None:
+            nonlocal falhas
+            prioridade = PRIORITY_BACKGROUND if indice % 2 else PRIORITY_CHAT
+            config = {"metadata": {"llm_priority": prioridade}}
+            for n in range(args.calls):
+                inicio = time.perf_counter()
+                try:
+                    await modelo.ainvoke(f"sessão {indice}, chamada {n}", config)
+                except Exception:
+                    falhas += 1
+                    continue
+                latencias[prioridade].append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(sessao(i) for i in range(args.sessions)))
+        tempo = time.perf_counter() - inicio
+
+    todas = latencias[PRIORITY_CHAT] + latencias[PRIORITY_BACKGROUND]
+    return {
+        "mode": modo,
+        "ok": len(todas),
+        "failed": falhas,
+        "server_429": servidor.counters["rate_limited"],
+        "ok_per_s": len(todas) / tempo,
+        "p50_ms": 1000 * percentil(todas, 50),
+        "p99_ms": 1000 * percentil(todas, 99),
+        "p99_chat_ms": 1000 * percentil(latencias[PRIORITY_CHAT], 99),
+        "p99_background_ms": 1000 * percentil(latencias[PRIORITY_BACKGROUND], 99),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do RateLimiter")
+    parser.add_argument("--sessions", type=int, default=40)
+    parser.add_argument("--calls", type=int, default=5, help="Chamadas por sessão")
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--tpm", type=float, default=100000)
+    parser.add_argument("--burst", type=float, default=2.0, help="Segundos de rajada")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    resultados = [
+        asyncio.run(medir(modo, args)) for modo in ("retry cego", "agendador")
+    ]
+
+    print("=" * 78)
+    print(
+        f"🚦 RATE LIMIT ({args.sessions} sessões × {args.calls} chamadas, "
+        f"{args.rpm:.0f} RPM, {args.tpm:.0f} TPM)"
+    )
+    print("=" * 78)
+    print(
+        f"{'modo':>11}{'ok':>6}{'falhas':>8}{'429':>6}{'ok/s':>8}"
+        f"{'p50 ms':>9}{'p99 ms':>9}{'p99 chat':>10}{'p99 fundo':>11}"
+    )
+    for r in resultados:
+        print(
+            f"{r['mode']:>11}{r['ok']:>6}{r['failed']:>8}{r['server_429']:>6}"
+            f"{r['ok_per_s']:>8.1f}{r['p50_ms']:>9.0f}{r['p99_ms']:>9.0f}"
+            f"{r['p99_chat_ms']:>10.0f}{r['p99_background_ms']:>11.0f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script response_cache.py
+========================
+Chamadas ao LLM e latência do primeiro turno com e sem o ResponseCache.
+
+Cada thread abre com uma pergunta sorteada de `--questions` perguntas
+comuns (distribuição de Zipf, como em produção: poucas perguntas
+respondem pela maioria das aberturas) e depois segue com mensagens
+próprias, que nunca acertam o cache. No máximo `--concurrency` threads
+conversam ao mesmo tempo (as outras chegam depois, como usuários novos).
+
+Modos: sem cache, cache em memória e cache em memória + SQLite. O último
+roda duas vezes sobre o mesmo arquivo para mostrar o nível SQLite
+respondendo depois de um "reinício" (memória vazia).
+
+Run
+---
+uv run python -m benchmarks.response_cache
+uv run python -m benchmarks.response_cache --threads 500 --questions 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from async_chat_engine import AsyncChatEngine
+from benchmarks.stub_llm import StubChatModel
+from response_cache import ResponseCache, cached_llm
+
+
+class ContadorDeChamadas(StubChatModel):
+    """StubChatModel que conta as chamadas que chegam ao "upstream"."""
+
+    calls: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+
+async def medir(db_path: str, modo: str, cache_db: str, args) -> dict:
+    random.seed(args.seed)
+    pesos = [1 / (n + 1) for n in range(args.questions)]
+    stub = ContadorDeChamadas(latency=args.latency)
+    cache = None
+    chat_llm = stub
+    if modo != "sem cache":
+        cache = ResponseCache(
+            "stub",
+            0.0,
+            db_path=cache_db if "SQLite" in modo else None,
+        )
+        chat_llm = cached_llm(stub, cache)
+    primeiros = []
+    vagas = asyncio.Semaphore(args.concurrency)
+
+    async def sessao(engine: AsyncChatEngine, thread_id: str) -> None:
+        pergunta = random.choices(range(args.questions), pesos)[0]
+        async with vagas:
+            inicio = time.perf_counter()
+            await engine.send(thread_id, f"Pergunta frequente número {pergunta}?")
+            primeiros.append(time.perf_counter() - inicio)
+            for turno in range(args.turns - 1):
+                # Mensagens próprias de cada execução: nunca estão no cache
+                await engine.send(thread_id, f"{modo}/{thread_id}: mensagem {turno}")
+
+    async with AsyncChatEngine(db_path, chat_llm=chat_llm) as engine:
+        await asyncio.gather(*(sessao(engine, f"t_{i}") for i in range(args.threads)))
+
+    stats = cache.stats() if cache else {}
+    if cache:
+        cache.close()
+    return {
+        "mode": modo,
+        "llm_calls": stub.calls,
+        "turns": args.threads * args.turns,
+        "first_turn_mean_ms": 1000 * statistics.mean(primeiros),
+        "hit_rate": stats.get("hit_rate", 0.0),
+        "memory_hits": stats.get("memory_hits", 0),
+        "sqlite_hits": stats.get("sqlite_hits", 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do cache de respostas")
+    parser.add_argument("--threads", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=3, help="Turnos por thread")
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    modos = [
+        "sem cache",
+        "memória",
+        "memória + SQLite",
+        "memória + SQLite (reinício)",
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_db = os.path.join(tmp, "llm_cache.db")
+        resultados = [
+            asyncio.run(medir(os.path.join(tmp, f"cache_{n}.db"), modo, cache_db, args))
+            for n, modo in enumerate(modos)
+        ]
+
+    print("=" * 76)
+    print(
+        f"🗃️  CACHE DE RESPOSTAS ({args.threads} threads x {args.turns} turnos, "
+        f"{args.questions} perguntas de abertura, LLM {1000 * args.latency:.0f} ms)"
+    )
+    print("=" * 76)
+    print(
+        f"{'modo':>28}{'chamadas LLM':>14}{'1º turno ms':>13}{'acertos':>9}"
+        f"{'SQLite':>8}"
+    )
+    for r in resultados:
+        print(
+            f"{r['mode']:>28}{r['llm_calls']:>14}{r['first_turn_mean_ms']:>13.0f}"
+            f"{r['hit_rate']:>9.0%}{r['sqlite_hits']:>8}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
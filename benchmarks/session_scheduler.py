@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script session_scheduler.py
+===========================
+Teste de estresse do SessionScheduler com o LLM stub.
+
+1. Perdas: `--threads` conversas recebem `--burst` mensagens cada, todas
+   disparadas ao mesmo tempo. Sem o agendador (`graph.ainvoke` direto)
+   os turnos da mesma thread leem o mesmo checkpoint e mensagens somem;
+   com o AsyncChatEngine (que usa o agendador) todas devem estar no
+   histórico, na ordem em que foram enviadas.
+2. Escala: turnos/s para vários números de sessões e limites globais de
+   concorrência (`max_concurrent_turns`).
+
+Sai com código 1 se o agendador perder alguma mensagem.
+
+Run
+---
+uv run python -m benchmarks.session_scheduler
+uv run python -m benchmarks.session_scheduler --sessions 1,10,100,400 --limits 16,512
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+# O teste de perdas conta as mensagens do histórico: nada pode ser recortado
+os.environ.setdefault("MAX_CONTEXT_TOKENS", "1000000")
+
+from langchain_core.messages import HumanMessage
+
+from async_chat_engine import AsyncChatEngine
+from benchmarks.stub_llm import StubChatModel
+
+
+async def medir_perdas(db_path: str, agendado: bool, args) -> dict:
+    async with AsyncChatEngine(
+        db_path, chat_llm=StubChatModel(latency=args.latency)
+    ) as engine:
+
+        async def enviar(thread_id: str, texto: str) -> None:
+            if agendado:
+                await engine.send(thread_id, texto)
+            else:
+                await engine.graph.ainvoke(
+                    {"messages": [texto]}, config=engine.config_for(thread_id)
+                )
+
+        enviadas = {
+            f"t_{i}": [f"t_{i} mensagem {j}" for j in range(args.burst)]
+            for i in range(args.threads)
+        }
+        await asyncio.gather(
+            *(
+                enviar(thread_id, texto)
+                for thread_id, textos in enviadas.items()
+                for texto in textos
+            )
+        )
+
+        perdidas = fora_de_ordem = 0
+        for thread_id, textos in enviadas.items():
+            historico = [
+                m.content
+                for m in await engine.history(thread_id)
+                if isinstance(m, HumanMessage)
+            ]
+            perdidas += len(set(textos) - set(historico))
+            fora_de_ordem += historico != textos
+        stats = engine.scheduler.stats()
+
+    return {
+        "scheduler": agendado,
+        "sent": args.threads * args.burst,
+        "lost": perdidas,
+        "threads_out_of_order": fora_de_ordem,
+        "peak_depth": stats["peak_depth"] if agendado else None,
+    }
+
+
+async def medir_vazao(db_path: str, sessions: int, limite: int, args) -> dict:
+    async def sessao(engine: AsyncChatEngine, thread_id: str) -> None:
+        for turno in range(args.turns):
+            await engine.send(thread_id, f"mensagem {turno}")
+
+    async with AsyncChatEngine(
+        db_path,
+        chat_llm=StubChatModel(latency=args.latency),
+        max_concurrent_turns=limite,
+    ) as engine:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(sessao(engine, f"s_{i}") for i in range(sessions)))
+        tempo = time.perf_counter() - inicio
+        stats = engine.scheduler.stats()
+
+    return {
+        "sessions": sessions,
+        "limit": limite,
+        "turns": sessions * args.turns,
+        "turns_per_s": sessions * args.turns / tempo,
+        "mean_wait_ms": stats["mean_wait_ms"],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Estresse do SessionScheduler")
+    parser.add_argument("--threads", type=int, default=20)
+    parser.add_argument("--burst", type=int, default=10, help="Mensagens simultâneas")
+    parser.add_argument("--sessions", default="1,10,50,200")
+    parser.add_argument("--limits", default="8,64,512")
+    parser.add_argument("--turns", type=int, default=3, help="Turnos por sessão")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--dir", help="Pasta dos bancos de teste")
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        perdas = [
+            asyncio.run(medir_perdas(os.path.join(tmp, f"perdas_{a}.db"), a, args))
+            for a in (False, True)
+        ]
+        vazao = [
+            asyncio.run(
+                medir_vazao(os.path.join(tmp, f"vazao_{s}_{lim}.db"), s, lim, args)
+            )
+            for lim in [int(n) for n in args.limits.split(",")]
+            for s in [int(n) for n in args.sessions.split(",")]
+        ]
+
+    print("=" * 60)
+    print(f"🔒 PERDAS ({args.threads} threads × {args.burst} mensagens simultâneas)")
+    print("=" * 60)
+    print(f"{'modo':>14}{'enviadas':>10}{'perdidas':>10}{'fora de ordem':>16}")
+    for r in perdas:
+        modo = "agendador" if r["scheduler"] else "ainvoke direto"
+        print(
+            f"{modo:>14}{r['sent']:>10}{r['lost']:>10}"
+            f"{r['threads_out_of_order']:>16}"
+        )
+
+    print("\n" + "=" * 60)
+    print(f"📈 ESCALA ({args.turns} turnos por sessão, latência {args.latency} s)")
+    print("=" * 60)
+    print(f"{'limite':>8}{'sessões':>10}{'turnos/s':>12}{'espera média':>16}")
+    for r in vazao:
+        print(
+            f"{r['limit']:>8}{r['sessions']:>10}{r['turns_per_s']:>12.1f}"
+            f"{r['mean_wait_ms']:>13.1f} ms"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"losses": perdas, "throughput": vazao}, f, indent=2)
+
+    if perdas[1]["lost"] or perdas[1]["threads_out_of_order"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
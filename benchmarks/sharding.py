@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script sharding.py
+==================
+Mede a vazão de escrita de checkpoints (puts/s) com o
+ShardedCheckpointSaver para 1, 2, 4 e 8 shards. `--writers` threads
+gravam checkpoints de `--kb` KB, cada uma na sua própria conversa, como
+várias sessões do chatbot terminando turnos ao mesmo tempo.
+
+Com um só arquivo todas as escritas passam pelo mesmo lock (e pelo mesmo
+fsync); com N shards até N commits acontecem em paralelo. Use `--dir`
+num disco real: em tmpfs o fsync é gratuito e a diferença some.
+
+Run
+---
+uv run python -m benchmarks.sharding --dir .
+uv run python -m benchmarks.sharding --shards 1,4,16 --writers 32 --profile fast
+"""
+import argparse
+import json
+import os
+import tempfile
+import threading
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from shard_layout import shard_paths
+from sharded_saver import ShardedCheckpointSaver
+from storage_profiles import connect
+
+
+def rodar(db_path: str, shards: int, args) -> dict:
+    savers = [
+        SqliteSaver(connect(path, args.profile, check_same_thread=False))
+        for path in shard_paths(db_path, shards)
+    ]
+    for saver in savers:
+        saver.setup()
+    memory = ShardedCheckpointSaver(savers)
+
+    texto = "palavra " * (args.kb * 64)
+    mensagens = [HumanMessage(texto), AIMessage(texto)]
+
+    def escrever(indice: int) -> None:
+        config = {
+            "configurable": {"thread_id": f"thread_{indice}", "checkpoint_ns": ""}
+        }
+        for _ in range(args.puts):
+            checkpoint = empty_checkpoint()
+            checkpoint["channel_values"] = {"messages": mensagens}
+            config = memory.put(config, checkpoint, {"source": "loop", "step": 0}, {})
+
+    threads = [
+        threading.Thread(target=escrever, args=(i,)) for i in range(args.writers)
+    ]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    tempo = time.perf_counter() - inicio
+
+    for saver in savers:
+        saver.conn.close()
+    return {
+        "shards": shards,
+        "writers": args.writers,
+        "puts": args.writers * args.puts,
+        "puts_per_s": args.writers * args.puts / tempo,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de shards do SQLite")
+    parser.add_argument("--shards", default="1,2,4,8")
+    parser.add_argument("--writers", type=int, default=16)
+    parser.add_argument("--puts", type=int, default=50, help="Checkpoints por thread")
+    parser.add_argument("--kb", type=int, default=16, help="Tamanho do checkpoint")
+    parser.add_argument("--profile", default="durable")
+    parser.add_argument(
+        "--dir", help="Pasta dos bancos de teste (use um disco real, não tmpfs)"
+    )
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for shards in [int(n) for n in args.shards.split(",")]:
+            db_path = os.path.join(tmp, f"shards_{shards}.db")
+            resultados.append(rodar(db_path, shards, args))
+
+    print("=" * 50)
+    print(f"🧩 SHARDS ({args.writers} escritores, perfil {args.profile})")
+    print("=" * 50)
+    print(f"{'shards':>8}{'puts':>10}{'puts/s':>12}{'ganho':>10}")
+    base = resultados[0]["puts_per_s"]
+    for r in resultados:
+        print(
+            f"{r['shards']:>8}{r['puts']:>10}{r['puts_per_s']:>12.0f}"
+            f"{r['puts_per_s'] / base:>9.2f}x"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script startup.py
+=================
+Mede o tempo de partida (interpretador novo → pronto) de cada ponto de
+entrada do projeto e se ele carregou langchain/langgraph.
+
+Cada medição roda num subprocesso novo, num diretório temporário com um
+`chatbot_memory.db` pequeno (algumas threads gravadas com o LLM stub e o
+ledger de uso ligado), então o tempo inclui a partida do Python, os
+imports e o que o módulo faz ao ser importado. Os visualizadores rodam
+como scripts (`--stats`, `--list`, `--usage`), com a saída descartada.
+
+Run
+---
+uv run python -m benchmarks.startup
+uv run python -m benchmarks.startup --repeat 15 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Nome → código executado no subprocesso
+ENTRY_POINTS = {
+    "chatbot (import)": "import chatbot_with_memory_checkpoints",
+    "chatbot (graph pronto)": (
+        "import chatbot_with_memory_checkpoints as chatbot; chatbot.graph"
+    ),
+    "async_chat_engine": "import async_chat_engine",
+    "chat_server": "import chat_server",
+    "batch_runner": "import batch_runner",
+    "viewer --stats": "viewing_conversation_history.py --stats",
+    "viewer --list": "viewing_conversation_history.py --list",
+    "viewer --usage": "viewing_conversation_history.py --usage",
+    "sqlite_database_visualization": "import sqlite_database_visualization",
+}
+
+# Depois do código medido, informa o que ficou carregado
+_RELATORIO = (
+    "import sys, json; print('\\n@@' + json.dumps({"
+    "'modules': len(sys.modules), "
+    "'langgraph': 'langgraph' in sys.modules, "
+    "'langchain': any(m.startswith('langchain') for m in sys.modules)}))"
+)
+
+# Banco de exemplo: 3 threads x 5 turnos com o LLM stub e o ledger ligado
+_SETUP = """
+import chatbot_with_memory_checkpoints as chatbot
+from benchmarks.stub_llm import StubChatModel
+
+graph = chatbot.build_graph(
+    chatbot.memory, StubChatModel(latency=0), ledger=chatbot.usage_ledger
+)
+for turno in range(5):
+    for i in range(3):
+        config = {"configurable": {"thread_id": f"usuario_{i}"}}
+        graph.invoke({"messages": [f"mensagem {turno}"]}, config=config)
+chatbot.usage_ledger.close()
+"""
+
+
+def _codigo(alvo: str) -> str:
+    """Código Python de um ponto de entrada (import ou script com argumentos)."""
+    if alvo.startswith("import "):
+        return alvo
+    script, *argv = alvo.split()
+    return (
+        "import contextlib, io, runpy, sys\n"
+        f"sys.argv = {[script, *argv]!r}\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        f"    runpy.run_path({os.path.join(RAIZ, script)!r}, run_name='__main__')"
+    )
+
+
+def _ambiente() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (RAIZ, env.get("PYTHONPATH")) if p)
+    env.setdefault("GROQ_API_KEY", "stub-offline")  # Nada aqui chama a API
+    env["USAGE_LEDGER"] = "1"
+    return env
+
+
+def medir(alvo: str, cwd: str, repeat: int) -> dict:
+    """Mediana/mínimo do tempo de partida e os módulos carregados."""
+    codigo = f"{_codigo(alvo)}\n{_RELATORIO}"
+    tempos, relatorio = [], {}
+    for i in range(repeat + 1):  # A primeira rodada só aquece o cache do SO
+        inicio = time.perf_counter()
+        processo = subprocess.run(
+            [sys.executable, "-c", codigo],
+            cwd=cwd,
+            env=_ambiente(),
+            capture_output=True,
+            text=True,
+        )
+        tempo = time.perf_counter() - inicio
+        if processo.returncode != 0:
+            raise RuntimeError(f"{alvo!r} falhou:\n{processo.stderr}")
+        relatorio = json.loads(processo.stdout.rsplit("\n@@", 1)[1])
+        if i:
+            tempos.append(tempo)
+    return {
+        "median_ms": 1000 * statistics.median(tempos),
+        "min_ms": 1000 * min(tempos),
+        **relatorio,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de tempo de partida")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument(
+        "--entry-points",
+        default=",".join(ENTRY_POINTS),
+        help="Pontos de entrada separados por vírgula",
+    )
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    resultados = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        subprocess.run(
+            [sys.executable, "-c", _SETUP], cwd=tmp, env=_ambiente(), check=True
+        )
+        for nome in args.entry_points.split(","):
+            resultados[nome] = medir(ENTRY_POINTS[nome], tmp, args.repeat)
+
+    print("=" * 80)
+    print(f"🚀 TEMPO DE PARTIDA (mediana de {args.repeat} processos novos)")
+    print("=" * 80)
+    print(
+        f"{'ponto de entrada':<32}{'mediana ms':>11}{'mín ms':>9}"
+        f"{'módulos':>9}{'langgraph':>11}{'langchain':>11}"
+    )
+    for nome, r in resultados.items():
+        print(
+            f"{nome:<32}{r['median_ms']:>11.0f}{r['min_ms']:>9.0f}{r['modules']:>9}"
+            f"{'sim' if r['langgraph'] else 'não':>11}"
+            f"{'sim' if r['langchain'] else 'não':>11}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
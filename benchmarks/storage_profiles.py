@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script storage_profiles.py
+==========================
+Compara os perfis de armazenamento (storage_profiles.py) em duas medidas:
+
+- latência de commit: `SqliteSaver.put` de checkpoints com `--kb` KB de
+  mensagens, um por transação, como no fim de cada turno;
+- vazão de leitura concorrente: `--readers` threads, cada uma com sua
+  conexão, lendo o último checkpoint (`get_tuple`) enquanto um escritor
+  continua gravando.
+
+O perfil "default" (sem PRAGMAs, como antes dos perfis) entra como referência.
+
+Run
+---
+uv run python -m benchmarks.storage_profiles
+uv run python -m benchmarks.storage_profiles --readers 8 --seconds 5 --dir .
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from storage_profiles import PROFILES, connect
+
+
+def percentil(valores: list, p: float) -> float:
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(p / 100 * len(ordenados)))]
+
+
+def abrir(db_path: str, profile: str) -> sqlite3.Connection:
+    return connect(db_path, profile, check_same_thread=False)
+
+
+def gravar(saver: SqliteSaver, config: dict, mensagens: list) -> dict:
+    checkpoint = empty_checkpoint()
+    checkpoint["channel_values"] = {"messages": mensagens}
+    return saver.put(config, checkpoint, {"source": "loop", "step": 0}, {})
+
+
+def rodar(db_path: str, profile: str, args) -> dict:
+    texto = "palavra " * (args.kb * 128)
+    mensagens = [
+        HumanMessage(texto[: len(texto) // 2]),
+        AIMessage(texto[: len(texto) // 2]),
+    ]
+    config = {"configurable": {"thread_id": "bench", "checkpoint_ns": ""}}
+
+    escritor = SqliteSaver(abrir(db_path, profile))
+    escritor.setup()
+
+    commits = []
+    for _ in range(args.commits):
+        inicio = time.perf_counter()
+        gravar(escritor, config, mensagens)
+        commits.append(time.perf_counter() - inicio)
+
+    parar = threading.Event()
+    leituras = [0] * args.readers
+
+    def ler(indice: int) -> None:
+        leitor = SqliteSaver(abrir(db_path, profile))
+        while not parar.is_set():
+            try:
+                leitor.get_tuple(config)
+                leituras[indice] += 1
+            except sqlite3.OperationalError:
+                pass  # "database is locked" no modo DELETE
+        leitor.conn.close()
+
+    def escrever() -> None:
+        while not parar.is_set():
+            try:
+                gravar(escritor, config, mensagens)
+            except sqlite3.OperationalError:
+                pass
+
+    threads = [threading.Thread(target=ler, args=(i,)) for i in range(args.readers)]
+    threads.append(threading.Thread(target=escrever))
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    parar.set()
+    for t in threads:
+        t.join()
+    escritor.conn.close()
+
+    return {
+        "profile": profile,
+        "commit_mean_ms": statistics.mean(commits) * 1000,
+        "commit_p95_ms": percentil(commits, 95) * 1000,
+        "reads_per_s": sum(leituras) / args.seconds,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark dos perfis do SQLite")
+    parser.add_argument("--commits", type=int, default=300)
+    parser.add_argument("--kb", type=int, default=32, help="Tamanho do checkpoint")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument(
+        "--dir", help="Pasta dos bancos de teste (use um disco real, não tmpfs)"
+    )
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    resultados = []
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for profile in PROFILES:
+            db_path = os.path.join(tmp, f"{profile}.db")
+            resultados.append(rodar(db_path, profile, args))
+
+    print("=" * 62)
+    print(
+        f"💾 PERFIS DE ARMAZENAMENTO ({args.kb} KB/checkpoint, {args.readers} leitores)"
+    )
+    print("=" * 62)
+    print(f"{'perfil':<12}{'commit ms':>12}{'p95 ms':>10}{'leituras/s':>14}")
+    for r in resultados:
+        print(
+            f"{r['profile']:<12}{r['commit_mean_ms']:>12.2f}"
+            f"{r['commit_p95_ms']:>10.2f}{r['reads_per_s']:>14.0f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
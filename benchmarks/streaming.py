@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script streaming.py
+===================
+Mede o tempo até o primeiro token (TTFT) e o tempo total do turno com
+`graph.invoke` (a resposta só aparece no fim) e com `stream_response`
+(tokens impressos à medida que chegam), usando um LLM stub que gera
+`--tps` tokens por segundo. Também confere que os dois modos gravam o
+mesmo número de checkpoints por turno.
+
+Run
+---
+uv run python -m benchmarks.streaming
+uv run python -m benchmarks.streaming --words 400 --tps 80 --latency 0.3
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+import chatbot_with_memory_checkpoints as chatbot
+from benchmarks.stub_llm import StubChatModel
+
+
+class _PrimeiroToken(io.StringIO):
+    """Stdout falso que registra o instante da primeira escrita."""
+
+    def __init__(self):
+        super().__init__()
+        self.instante = None
+
+    def write(self, texto: str) -> int:
+        if self.instante is None and texto.strip():
+            self.instante = time.perf_counter()
+        return super().write(texto)
+
+
+def rodar(db_path: str, stream: bool, turns: int, stub: StubChatModel) -> dict:
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    graph = chatbot.build_graph(SqliteSaver(conn), stub)
+    config = {"configurable": {"thread_id": "bench"}}
+
+    ttfts, totais = [], []
+    for turno in range(turns):
+        input_state = {"messages": [f"mensagem número {turno}"]}
+        saida = _PrimeiroToken()
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(saida):
+            if stream:
+                chatbot.stream_response(graph, input_state, config)
+            else:
+                estado = graph.invoke(input_state, config=config)
+                print(estado["messages"][-1].content)
+        fim = time.perf_counter()
+        ttfts.append(saida.instante - inicio)
+        totais.append(fim - inicio)
+
+    (checkpoints,) = conn.execute("SELECT COUNT(*) FROM checkpoints").fetchone()
+    conn.close()
+
+    return {
+        "mode": "stream" if stream else "invoke",
+        "turns": turns,
+        "ttft_mean_s": statistics.mean(ttfts),
+        "total_mean_s": statistics.mean(totais),
+        "checkpoints_per_turn": checkpoints / turns,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de streaming")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--words", type=int, default=200)
+    parser.add_argument("--tps", type=float, default=100.0)
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    stub = StubChatModel(
+        latency=args.latency, response_words=args.words, tokens_per_second=args.tps
+    )
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for stream in (False, True):
+            db_path = os.path.join(tmp, f"stream_{stream}.db")
+            resultados.append(rodar(db_path, stream, args.turns, stub))
+
+    print("=" * 62)
+    print(f"🌊 STREAMING ({args.words} tokens a {args.tps:.0f} tokens/s)")
+    print("=" * 62)
+    print(f"{'modo':<8}{'TTFT ms':>12}{'total ms':>12}{'checkpoints/turno':>20}")
+    for r in resultados:
+        print(
+            f"{r['mode']:<8}{r['ttft_mean_s'] * 1000:>12.1f}"
+            f"{r['total_mean_s'] * 1000:>12.1f}{r['checkpoints_per_turn']:>20.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script stub_groq_server.py
+==========================
+Servidor HTTP local que imita o endpoint de chat da Groq
+(`POST /openai/v1/chat/completions`) com limites de RPM e TPM.
+
+Acima do limite responde 429 com `retry-after` e os cabeçalhos
+`x-ratelimit-*` da Groq, como a API real. Serve para testar o
+RateLimiter (llm_rate_limiter.py) com o próprio ChatGroq, sem rede:
+
+    llm = ChatGroq(model="stub", api_key="stub", base_url=server.url)
+
+Exemplo
+-------
+with StubGroqServer(rpm=600, tpm=60000) as server:
+    ChatGroq(model="stub", api_key="stub", base_url=server.url).invoke("Olá")
+
+Run
+---
+uv run python -m benchmarks.stub_groq_server --port 8081 --rpm 60
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_rate_limiter import TokenBucket
+
+
+class StubGroqServer:
+    """
+    Servidor em segundo plano com os limites informados.
+
+    Args:
+        rpm: Requisições por minuto aceitas
+        tpm: Tokens por minuto aceitos (prompt + resposta)
+        latency: Segundos por resposta
+        response_tokens: Tokens de cada resposta
+        burst_seconds: Segundos de limite liberados de uma vez
+        port: Porta (0 = qualquer porta livre)
+    """
+
+    def __init__(
+        self,
+        rpm: float = 600,
+        tpm: float = 60000,
+        latency: float = 0.05,
+        response_tokens: int = 40,
+        burst_seconds: float = 60.0,
+        port: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.response_tokens = response_tokens
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds)
+        self._lock = threading.Lock()
+        self.counters = {"ok": 0, "rate_limited": 0}
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self.httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self) -> "StubGroqServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def admit(self, prompt_tokens: int) -> float:
+        """0 se a requisição cabe nos limites, senão segundos até caber."""
+        total = prompt_tokens + self.response_tokens
+        with self._lock:
+            agora = time.monotonic()
+            espera = max(
+                self.requests.wait_time(1, agora),
+                self.tokens.wait_time(total, agora),
+            )
+            if espera > 0:
+                self.counters["rate_limited"] += 1
+                return espera
+            self.requests.take(1, agora)
+            self.tokens.take(total, agora)
+            self.counters["ok"] += 1
+            return 0.0
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args) -> None:
+                pass
+
+            def _responder(self, status: int, corpo: dict, headers=()) -> None:
+                dados = json.dumps(corpo).encode("utf-8")
+                self.send_response(status)
+                self.send_header("content-type", "application/json")
+                self.send_header("content-length", str(len(dados)))
+                for nome, valor in headers:
+                    self.send_header(nome, valor)
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def _stream(self, pedido: dict, texto: str, prompt_tokens: int) -> None:
+                """Resposta em Server-Sent Events (`stream: true`)."""
+                self.send_response(200)
+                self.send_header("content-type", "text/event-stream")
+                self.end_headers()
+                base = {
+                    "id": "chatcmpl-stub",
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": pedido.get("model", "stub"),
+                }
+                for n, palavra in enumerate(texto.split(" ")):
+                    delta = {"content": palavra if n == 0 else f" {palavra}"}
+                    if n == 0:
+                        delta["role"] = "assistant"
+                    chunk = {
+                        **base,
+                        "choices": [
+                            {"index": 0, "delta": delta, "finish_reason": None}
+                        ],
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                fim = {
+                    **base,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                    "x_groq": {
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": servidor.response_tokens,
+                            "total_tokens": prompt_tokens + servidor.response_tokens,
+                        }
+                    },
+                }
+                self.wfile.write(
+                    f"data: {json.dumps(fim)}\n\ndata: [DONE]\n\n".encode()
+                )
+
+            def do_POST(self) -> None:
+                pedido = json.loads(
+                    self.rfile.read(int(self.headers["content-length"]))
+                )
+                prompt = sum(len(str(m.get("content", ""))) for m in pedido["messages"])
+                prompt_tokens = prompt // 4 + 1
+
+                espera = servidor.admit(prompt_tokens)
+                if espera > 0:
+                    self._responder(
+                        429,
+                        {
+                            "error": {
+                                "message": "Rate limit reached (stub)",
+                                "type": "tokens",
+                                "code": "rate_limit_exceeded",
+                            }
+                        },
+                        [
+                            ("retry-after", f"{espera:.3f}"),
+                            ("x-ratelimit-reset-requests", f"{espera:.3f}s"),
+                        ],
+                    )
+                    return
+
+                time.sleep(servidor.latency)
+                texto = " ".join(["stub"] * servidor.response_tokens)
+                if pedido.get("stream"):
+                    self._stream(pedido, texto, prompt_tokens)
+                    return
+                self._responder(
+                    200,
+                    {
+                        "id": "chatcmpl-stub",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": pedido.get("model", "stub"),
+                        "choices": [
+                            {
+                                "index": 0,
+                                "message": {"role": "assistant", "content": texto},
+                                "finish_reason": "stop",
+                            }
+                        ],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": servidor.response_tokens,
+                            "total_tokens": prompt_tokens + servidor.response_tokens,
+                        },
+                    },
+                )
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor Groq falso com 429")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rpm", type=float, default=60)
+    parser.add_argument("--tpm", type=float, default=12000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with StubGroqServer(args.rpm, args.tpm, args.latency, port=args.port) as server:
+        print(f"🧪 Groq falso em {server.url} (Ctrl+C para sair)")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
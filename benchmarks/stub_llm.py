@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script stub_llm.py
+==================
+Modelo de chat determinístico que substitui o ChatGroq em benchmarks
+e testes de carga locais. Simula a latência da rede com `sleep` e gera
+respostas reprodutíveis a partir da última mensagem do usuário.
+
+Também suporta streaming: com `tokens_per_second > 0` o primeiro token
+chega após `latency` segundos e os demais no ritmo configurado.
+
+Exemplo
+-------
+from benchmarks.stub_llm import StubChatModel
+graph = build_graph(checkpointer, chat_llm=StubChatModel(latency=0.05))
+"""
+import asyncio
+import hashlib
+import random
+import time
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+class StubChatModel(BaseChatModel):
+    """
+    LLM falso: espera `latency` segundos e responde `response_words` palavras.
+
+    Com `tokens_per_second > 0` cada palavra ("token") leva 1/tokens_per_second
+    segundos para ser gerada, tanto no `invoke` quanto no streaming.
+
+    A latência pode variar: `latency_sigma > 0` multiplica `latency` por um
+    fator log-normal e, com probabilidade `tail_probability`, a chamada
+    leva `tail_latency` segundos (cauda pesada, como um upstream lento).
+    Use `random.seed` para repetir a mesma sequência de latências.
+    Com `error_probability > 0` a chamada falha (RuntimeError) após a
+    latência, como um backend instável.
+
+    A resposta depende apenas do conteúdo da última mensagem, então duas
+    execuções do mesmo cenário produzem exatamente o mesmo histórico.
+    """
+
+    latency: float = 0.05  # Segundos por chamada (simula rede + geração)
+    response_words: int = 40  # Tamanho da resposta em palavras
+    tokens_per_second: float = 0.0  # Ritmo de geração (0 = instantâneo)
+    latency_sigma: float = 0.0  # Dispersão log-normal da latência (0 = fixa)
+    tail_probability: float = 0.0  # Chance de uma chamada lenta
+    tail_latency: float = 2.0  # Latência das chamadas lentas
+    error_probability: float = 0.0  # Chance de a chamada falhar
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub-chat"
+
+    def _build_message(self, messages: List[BaseMessage]) -> AIMessage:
+        ultima = str(messages[-1].content) if messages else ""
+        semente = hashlib.sha256(ultima.encode("utf-8")).hexdigest()
+        palavras = [
+            f"palavra{int(semente[i % 64], 16)}" for i in range(self.response_words)
+        ]
+        conteudo = f"[stub] {' '.join(palavras)}"
+        tokens_entrada = sum(len(str(m.content).split()) for m in messages)
+        return AIMessage(
+            content=conteudo,
+            usage_metadata={
+                "input_tokens": tokens_entrada,
+                "output_tokens": self.response_words,
+                "total_tokens": tokens_entrada + self.response_words,
+            },
+        )
+
+    def _latency(self) -> float:
+        """Latência até o primeiro token desta chamada."""
+        if self.tail_probability and random.random() < self.tail_probability:
+            return self.tail_latency
+        if self.latency_sigma > 0:
+            return self.latency * random.lognormvariate(0, self.latency_sigma)
+        return self.latency
+
+    def _falhar(self) -> None:
+        if self.error_probability and random.random() < self.error_probability:
+            raise RuntimeError("stub: falha simulada do backend")
+
+    def _generation_time(self) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return self.response_words / self.tokens_per_second
+
+    def _chunks(self, messages: List[BaseMessage]) -> List[ChatGenerationChunk]:
+        """Resposta completa quebrada em pedaços de uma palavra."""
+        message = self._build_message(messages)
+        palavras = message.content.split(" ")
+        chunks = [
+            ChatGenerationChunk(
+                message=AIMessageChunk(content=p if i == 0 else f" {p}")
+            )
+            for i, p in enumerate(palavras)
+        ]
+        # O uso de tokens vai no último pedaço, como nos provedores reais
+        chunks[-1].message.usage_metadata = message.usage_metadata
+        return chunks
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self._latency() + self._generation_time())
+        self._falhar()
+        return ChatResult(
+            generations=[ChatGeneration(message=self._build_message(messages))]
+        )
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self._latency() + self._generation_time())
+        self._falhar()
+        return ChatResult(
+            generations=[ChatGeneration(message=self._build_message(messages))]
+        )
+
+    def _stream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self._latency())
+        self._falhar()
+        intervalo = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for i, chunk in enumerate(self._chunks(messages)):
+            if i and intervalo:
+                time.sleep(intervalo)
+            yield chunk
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self._latency())
+        self._falhar()
+        intervalo = 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0
+        for i, chunk in enumerate(self._chunks(messages)):
+            if i and intervalo:
+                await asyncio.sleep(intervalo)
+            yield chunk
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script suite.py
+===============
+Suíte reprodutível de benchmarks offline, para comparar commits.
+
+Roda o graph de verdade (StateGraph, filter_node e o checkpointer do
+chatbot, montado por `checkpointer_components` com as variáveis de
+ambiente: saver, shards, cache, ledger e métricas) com o LLM stub no
+lugar do ChatGroq, em três cenários:
+
+  long_thread    uma única thread com `--long-turns` turnos (padrão 10k)
+  many_threads   `--threads` threads curtas de `--short-turns` turnos
+  concurrent     `--sessions` sessões simultâneas no AsyncChatEngine
+
+Cada cenário roda num processo próprio (o pico de RSS é do cenário, não
+da suíte) com `random.seed(--seed)`, e gera:
+
+  turns_per_second, latency_p50_ms, latency_p99_ms   (latência por turno)
+  db_bytes, db_bytes_per_turn                        (banco + WAL no fim)
+  peak_rss_mb, baseline_rss_mb                       (pico e após os imports)
+
+O JSON (`--output`) inclui o commit do git, a configuração do stub e as
+variáveis de ambiente relevantes; `--compare base.json` imprime a
+variação de cada métrica em relação a outra execução.
+
+Run
+---
+uv run python -m benchmarks.suite --output bench.json
+uv run python -m benchmarks.suite --long-turns 1000 --threads 200 --sessions 50
+uv run python -m benchmarks.suite --latency 0.2 --latency-sigma 0.5 --scenarios concurrent
+uv run python -m benchmarks.suite --output novo.json --compare bench.json
+"""
+import argparse
+import asyncio
+import glob
+import importlib
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+SCENARIOS = ("long_thread", "many_threads", "concurrent")
+
+# Variáveis de ambiente que mudam o resultado (gravadas no JSON)
+ENV_FLAGS = (
+    "SQLITE_PROFILE",
+    "CHECKPOINT_COMPRESSION",
+    "CHECKPOINT_CACHE_ENTRIES",
+    "CHECKPOINT_SHARDS",
+    "CHECKPOINT_GROUP_COMMIT",
+    "DEDUP_MESSAGES",
+    "DEFER_MAINTENANCE",
+    "MAX_CONTEXT_TOKENS",
+    "CONTEXT_LOW_WATERMARK_TOKENS",
+    "METRICS",
+    "USAGE_LEDGER",
+)
+
+# Métricas comparadas por --compare (True = maior é melhor)
+COMPARED = {
+    "turns_per_second": True,
+    "latency_p50_ms": False,
+    "latency_p99_ms": False,
+    "db_bytes_per_turn": False,
+    "peak_rss_mb": False,
+}
+
+
+def percentil(valores: List[float], q: float) -> float:
+    """Percentil pelo posto mais próximo."""
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, max(0, round(q * len(ordenados)) - 1))]
+
+
+def rss_mb() -> float:
+    """Pico de memória residente do processo até agora, em MB."""
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def db_bytes(db_path: str) -> int:
+    """Banco + WAL (+ shards), como fica no disco."""
+    raiz, _ = os.path.splitext(db_path)
+    return sum(os.path.getsize(p) for p in glob.glob(glob.escape(raiz) + "*"))
+
+
+def mensagem(thread: int, turno: int, palavras: int) -> str:
+    return f"thread {thread} turno {turno}: " + " ".join(
+        f"palavra{(thread + turno + i) % 97}" for i in range(palavras)
+    )
+
+
+# ---------------------------------------------------------------------- cenários
+def _graph_sincrono(db_path: str, stub):
+    """
+    Graph com o checkpointer do chatbot (mesma fábrica e flags de ambiente).
+
+    Com DEFER_MAINTENANCE=1 o graph só tem o chatnode; o recorte/resumo
+    roda no DeferredMaintenance, como no chatbot interativo.
+    """
+    from chatbot_with_memory_checkpoints import (
+        DEFER_MAINTENANCE,
+        DeferredMaintenance,
+        build_graph,
+        checkpointer_components,
+    )
+
+    recursos = checkpointer_components(db_path)
+    graph = build_graph(
+        recursos["memory"],
+        stub,
+        deferred_maintenance=DEFER_MAINTENANCE,
+        ledger=recursos["usage_ledger"],
+    )
+    recursos["maintenance"] = (
+        DeferredMaintenance(graph, stub) if DEFER_MAINTENANCE else None
+    )
+    return graph, recursos
+
+
+def _turnos_sincronos(
+    db_path: str, stub, threads: int, turns: int, palavras: int
+) -> List[float]:
+    graph, recursos = _graph_sincrono(db_path, stub)
+    maintenance = recursos["maintenance"]
+    latencias = []
+    for t in range(threads):
+        config = {"configurable": {"thread_id": f"bench_{t}"}}
+        for i in range(turns):
+            inicio = time.perf_counter()
+            # Sem intervalo entre os turnos: a espera pela manutenção do
+            # turno anterior entra na latência, como entraria para o usuário
+            if maintenance is not None:
+                maintenance.wait(config)
+            graph.invoke({"messages": [mensagem(t, i, palavras)]}, config)
+            latencias.append(time.perf_counter() - inicio)
+            if maintenance is not None:
+                maintenance.schedule(config)
+    if maintenance is not None:
+        maintenance.shutdown()
+    if recursos["usage_ledger"] is not None:
+        recursos["usage_ledger"].close()
+    for conn in recursos["conns"]:
+        conn.close()
+    return latencias
+
+
+def long_thread(db_path: str, stub, args) -> dict:
+    latencias = _turnos_sincronos(db_path, stub, 1, args.long_turns, args.message_words)
+    return {"threads": 1, "latencies": latencias}
+
+
+def many_threads(db_path: str, stub, args) -> dict:
+    latencias = _turnos_sincronos(
+        db_path, stub, args.threads, args.short_turns, args.message_words
+    )
+    return {"threads": args.threads, "latencies": latencias}
+
+
+def concurrent(db_path: str, stub, args) -> dict:
+    from async_chat_engine import AsyncChatEngine
+
+    async def rodar() -> List[float]:
+        latencias: List[float] = []
+
+        async def sessao(engine: AsyncChatEngine, t: int) -> None:
+            for i in range(args.concurrent_turns):
+                inicio = time.perf_counter()
+                await engine.send(f"bench_{t}", mensagem(t, i, args.message_words))
+                latencias.append(time.perf_counter() - inicio)
+
+        async with AsyncChatEngine(
+            db_path, chat_llm=stub, max_concurrent_turns=args.sessions
+        ) as engine:
+            await asyncio.gather(*(sessao(engine, t) for t in range(args.sessions)))
+        return latencias
+
+    return {"threads": args.sessions, "latencies": asyncio.run(rodar())}
+
+
+RUNNERS: Dict[str, Callable] = {
+    "long_thread": long_thread,
+    "many_threads": many_threads,
+    "concurrent": concurrent,
+}
+
+
+def run_scenario(nome: str, args) -> dict:
+    """Executa um cenário neste processo e devolve as métricas."""
+    os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+    from benchmarks.stub_llm import StubChatModel
+
+    # Os imports do graph entram no baseline, não no pico do cenário
+    importlib.import_module("async_chat_engine")
+    random.seed(args.seed)
+    stub = StubChatModel(
+        latency=args.latency,
+        latency_sigma=args.latency_sigma,
+        tail_probability=args.tail_probability,
+        tail_latency=args.tail_latency,
+        tokens_per_second=args.tokens_per_second,
+        response_words=args.response_words,
+    )
+    baseline = rss_mb()
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, f"{nome}.db")
+        inicio = time.perf_counter()
+        resultado = RUNNERS[nome](db_path, stub, args)
+        tempo = time.perf_counter() - inicio
+        tamanho = db_bytes(db_path)
+
+    latencias = resultado.pop("latencies")
+    return {
+        **resultado,
+        "turns": len(latencias),
+        "seconds": tempo,
+        "turns_per_second": len(latencias) / tempo,
+        "latency_mean_ms": 1000 * sum(latencias) / len(latencias),
+        "latency_p50_ms": 1000 * percentil(latencias, 0.50),
+        "latency_p99_ms": 1000 * percentil(latencias, 0.99),
+        "db_bytes": tamanho,
+        "db_bytes_per_turn": tamanho / len(latencias),
+        "peak_rss_mb": rss_mb(),
+        "baseline_rss_mb": baseline,
+    }
+
+
+# ---------------------------------------------------------------------- suíte
+def git_commit() -> Optional[dict]:
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=raiz, capture_output=True, text=True, check=True,
+        ).stdout.strip()  # fmt: skip
+        sujo = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=raiz, capture_output=True, text=True, check=True,
+        ).stdout.strip()  # fmt: skip
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return {"commit": commit, "dirty": bool(sujo)}
+
+
+def _argv_cenario(argv: List[str]) -> List[str]:
+    """Argumentos da suíte repassados aos cenários (sem --output/--compare)."""
+    filho, pular = [], False
+    for arg in argv:
+        if pular:
+            pular = False
+        elif arg in ("--output", "--compare"):
+            pular = True
+        elif not arg.startswith(("--output=", "--compare=")):
+            filho.append(arg)
+    return filho
+
+
+def run_suite(args, argv: List[str]) -> dict:
+    """Cada cenário num subprocesso (`--run-scenario`), com os mesmos argumentos."""
+    resultados = {}
+    for nome in args.scenarios.split(","):
+        print(f"▶️  {nome} ...", flush=True)
+        processo = subprocess.run(
+            [sys.executable, "-m", "benchmarks.suite", *argv, "--run-scenario", nome],
+            capture_output=True,
+            text=True,
+        )
+        if processo.returncode != 0:
+            sys.stderr.write(processo.stderr)
+            raise SystemExit(f"❌ Cenário '{nome}' falhou")
+        resultados[nome] = json.loads(processo.stdout.strip().splitlines()[-1])
+    return {
+        "suite": "chatbot-offline",
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "stub": {
+                "latency": args.latency,
+                "latency_sigma": args.latency_sigma,
+                "tail_probability": args.tail_probability,
+                "tail_latency": args.tail_latency,
+                "tokens_per_second": args.tokens_per_second,
+                "response_words": args.response_words,
+            },
+            "seed": args.seed,
+            "message_words": args.message_words,
+            "env": {k: os.environ[k] for k in ENV_FLAGS if k in os.environ},
+        },
+        "scenarios": resultados,
+    }
+
+
+def print_report(relatorio: dict, base: Optional[dict] = None) -> None:
+    git = relatorio["git"] or {}
+    print("=" * 96)
+    print(
+        f"🧪 SUÍTE OFFLINE (commit {git.get('commit', '?')}"
+        f"{' + alterações' if git.get('dirty') else ''}, "
+        f"stub {1000 * relatorio['config']['stub']['latency']:.0f} ms)"
+    )
+    print("=" * 96)
+    print(
+        f"{'cenário':<14}{'turnos':>8}{'turnos/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+        f"{'B/turno':>10}{'RSS MB':>9}"
+    )
+    for nome, r in relatorio["scenarios"].items():
+        print(
+            f"{nome:<14}{r['turns']:>8}{r['turns_per_second']:>10.1f}"
+            f"{r['latency_p50_ms']:>9.1f}{r['latency_p99_ms']:>9.1f}"
+            f"{r['db_bytes_per_turn']:>10.0f}{r['peak_rss_mb']:>9.0f}"
+        )
+
+    if base is None:
+        return
+    base_git = (base.get("git") or {}).get("commit", "?")
+    print(f"\n📊 Variação em relação a {base_git} (✅ melhor, ⚠️ pior que 5%):")
+    for nome, r in relatorio["scenarios"].items():
+        anterior = base["scenarios"].get(nome)
+        if anterior is None:
+            continue
+        partes = []
+        for metrica, maior_melhor in COMPARED.items():
+            if not anterior.get(metrica):
+                continue
+            delta = r[metrica] / anterior[metrica] - 1
+            melhor = delta > 0 if maior_melhor else delta < 0
+            marca = "" if abs(delta) < 0.05 else (" ✅" if melhor else " ⚠️")
+            partes.append(f"{metrica} {100 * delta:+.1f}%{marca}")
+        print(f"  {nome:<14}" + " | ".join(partes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Suíte de benchmarks offline")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--long-turns", type=int, default=10_000)
+    parser.add_argument("--threads", type=int, default=1000)
+    parser.add_argument("--short-turns", type=int, default=5)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--concurrent-turns", type=int, default=10)
+    parser.add_argument("--message-words", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--latency-sigma", type=float, default=0.0)
+    parser.add_argument("--tail-probability", type=float, default=0.0)
+    parser.add_argument("--tail-latency", type=float, default=2.0)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--response-words", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Arquivo JSON com os resultados")
+    parser.add_argument("--compare", help="JSON de uma execução anterior")
+    parser.add_argument("--run-scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_scenario:
+        print(json.dumps(run_scenario(args.run_scenario, args)))
+        return
+
+    relatorio = run_suite(args, _argv_cenario(sys.argv[1:]))
+
+    base = None
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+    print_report(relatorio, base)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(relatorio, f, indent=2)
+        print(f"\n💾 Resultados em '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script trim_watermarks.py
+=========================
+Conta linhas e bytes gravados nas tabelas `checkpoints` e `writes` a cada
+1.000 turnos, comparando três políticas do filter_node:
+
+- legado: recorte por número de mensagens a cada turno (comportamento antigo)
+- por_turno: orçamento de tokens sem histerese (marca baixa = marca alta)
+- histerese: marca alta / marca baixa (recorte em lote, padrão atual)
+
+As três políticas usam o MESMO orçamento de contexto: nenhuma envia ao LLM
+mais que `--high` tokens de histórico. O legado guarda as N mensagens que
+cabem nesse orçamento (N = high / tamanho médio das mensagens), a não ser
+que `--legacy-messages` fixe N (o filter_node original usava 50). Além das
+linhas e bytes, a tabela mostra quantos RemoveMessage cada política
+emitiu, em quantos turnos houve recorte e o contexto médio/máximo enviado
+ao LLM, para conferir que a comparação é justa.
+
+Run
+---
+uv run python -m benchmarks.trim_watermarks
+uv run python -m benchmarks.trim_watermarks --turns 1000 --high 3000 --low 1800
+uv run python -m benchmarks.trim_watermarks --legacy-messages 50
+"""
+import argparse
+import json
+import os
+import sqlite3
+import tempfile
+import statistics
+import time
+from typing import Optional
+from unittest import mock
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.graph.message import RemoveMessage
+
+import chatbot_with_memory_checkpoints as chatbot
+from benchmarks.stub_llm import StubChatModel
+
+
+def filtro_legado(max_messages: Optional[int], high: int):
+    """
+    filter_node original (últimas N mensagens, a cada turno). Sem
+    `max_messages`, N é o número de mensagens que cabe em `high` tokens.
+    """
+
+    def filtro(state):
+        messages = state["messages"]
+        limite = max_messages
+        if not limite:
+            tokens = sum(chatbot.message_tokens(m) for m in messages)
+            limite = max(1, high * len(messages) // max(tokens, 1))
+        if len(messages) > limite:
+            return {"messages": [RemoveMessage(id=m.id) for m in messages[:-limite]]}
+        return state
+
+    return filtro
+
+
+def contando(filtro, contagem: dict):
+    """Envolve o filtro registrando os RemoveMessage e o contexto que sobra."""
+
+    def filtro_contado(state):
+        saida = filtro(state)
+        removidas = {
+            m.id
+            for m in (saida or {}).get("messages", [])
+            if isinstance(m, RemoveMessage)
+        }
+        contagem["remove_messages"] += len(removidas)
+        contagem["trim_turns"] += bool(removidas)
+        contagem["context_tokens"].append(
+            sum(
+                chatbot.message_tokens(m)
+                for m in state["messages"]
+                if m.id not in removidas
+            )
+        )
+        return saida
+
+    return filtro_contado
+
+
+def medir_armazenamento(db_path: str) -> dict:
+    """Linhas e bytes das tabelas de checkpoints e writes."""
+    conn = sqlite3.connect(db_path)
+    cp_rows, cp_bytes = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0) "
+        "FROM checkpoints"
+    ).fetchone()
+    wr_rows, wr_bytes = conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM writes"
+    ).fetchone()
+    conn.close()
+    return {
+        "checkpoint_rows": cp_rows,
+        "checkpoint_bytes": cp_bytes,
+        "write_rows": wr_rows,
+        "write_bytes": wr_bytes,
+        "file_bytes": os.path.getsize(db_path),
+    }
+
+
+def rodar_cenario(
+    nome: str,
+    db_path: str,
+    turns: int,
+    high: int,
+    low: int,
+    legado: bool,
+    legacy_messages: Optional[int] = None,
+) -> dict:
+    chatbot.MAX_CONTEXT_TOKENS = high
+    chatbot.CONTEXT_LOW_WATERMARK_TOKENS = low
+    filtro = filtro_legado(legacy_messages, high) if legado else chatbot.filter_node
+    contagem = {"remove_messages": 0, "trim_turns": 0, "context_tokens": []}
+
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    with mock.patch.object(chatbot, "filter_node", contando(filtro, contagem)):
+        graph = chatbot.build_graph(
+            SqliteSaver(conn), StubChatModel(latency=0.0, response_words=60)
+        )
+    config = {"configurable": {"thread_id": nome}}
+
+    inicio = time.perf_counter()
+    for turno in range(turns):
+        graph.invoke({"messages": [f"mensagem número {turno}"]}, config=config)
+    tempo = time.perf_counter() - inicio
+    conn.close()
+
+    contexto = contagem.pop("context_tokens")
+    resultado = {"scenario": nome, "turns": turns, "seconds": tempo, **contagem}
+    resultado["context_tokens_mean"] = statistics.fmean(contexto)
+    resultado["context_tokens_max"] = max(contexto)
+    resultado.update(medir_armazenamento(db_path))
+    return resultado
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de recorte com histerese")
+    parser.add_argument("--turns", type=int, default=1000)
+    parser.add_argument("--high", type=int, default=chatbot.MAX_CONTEXT_TOKENS)
+    parser.add_argument("--low", type=int, default=chatbot.CONTEXT_LOW_WATERMARK_TOKENS)
+    parser.add_argument(
+        "--legacy-messages",
+        type=int,
+        help="Mensagens mantidas pelo legado (padrão: as que cabem em --high)",
+    )
+    parser.add_argument("--json", help="Arquivo onde salvar os resultados")
+    args = parser.parse_args()
+
+    cenarios = [
+        ("legado", args.high, args.high, True),
+        ("por_turno", args.high, args.high, False),
+        ("histerese", args.high, args.low, False),
+    ]
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for nome, high, low, legado in cenarios:
+            db_path = os.path.join(tmp, f"{nome}.db")
+            resultados.append(
+                rodar_cenario(
+                    nome, db_path, args.turns, high, low, legado, args.legacy_messages
+                )
+            )
+
+    escala = 1000 / args.turns
+    print("=" * 108)
+    print(f"💾 ARMAZENAMENTO POR 1.000 TURNOS (alta={args.high}, baixa={args.low})")
+    print("=" * 108)
+    print(
+        f"{'cenário':<12}{'ckpt linhas':>12}{'ckpt KB':>10}"
+        f"{'writes linhas':>15}{'writes KB':>11}{'arquivo KB':>12}"
+        f"{'RemoveMsg':>11}{'recortes':>10}{'ctx médio':>11}{'ctx máx':>9}"
+        f"{'tempo s':>9}"
+    )
+    for r in resultados:
+        print(
+            f"{r['scenario']:<12}{r['checkpoint_rows'] * escala:>12.0f}"
+            f"{r['checkpoint_bytes'] * escala / 1024:>10.0f}"
+            f"{r['write_rows'] * escala:>15.0f}"
+            f"{r['write_bytes'] * escala / 1024:>11.0f}"
+            f"{r['file_bytes'] * escala / 1024:>12.0f}"
+            f"{r['remove_messages'] * escala:>11.0f}"
+            f"{r['trim_turns'] * escala:>10.0f}"
+            f"{r['context_tokens_mean']:>11.0f}{r['context_tokens_max']:>9}"
+            f"{r['seconds']:>9.1f}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
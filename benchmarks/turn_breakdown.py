@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script turn_breakdown.py
+========================
+Para onde vai o tempo de um turno: roda `--turns` turnos com o LLM stub
+e a instrumentação ligada (METRICS=1) e imprime, a partir do REGISTRY,
+a duração de cada nó, das leituras/escritas de checkpoint e do LLM, além
+dos bytes por operação e dos tokens.
+
+Run
+---
+uv run python -m benchmarks.turn_breakdown
+uv run python -m benchmarks.turn_breakdown --turns 500 --prometheus metrics.prom
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+
+os.environ.setdefault("GROQ_API_KEY", "stub-offline")  # O stub não usa a API
+os.environ["METRICS"] = "1"
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from benchmarks.stub_llm import StubChatModel
+from chatbot_with_memory_checkpoints import build_graph
+from checkpoint_cache import cached_saver
+from compressed_serializer import make_serializer
+from metrics import REGISTRY, instrumented_saver
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tempo de cada etapa do turno")
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--stream", action="store_true", help="Usa graph.stream")
+    parser.add_argument(
+        "--prometheus", help="Arquivo onde gravar o texto do Prometheus"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(
+            os.path.join(tmp, "breakdown.db"), check_same_thread=False
+        )
+        memory = instrumented_saver(
+            cached_saver(SqliteSaver(conn, serde=make_serializer()))
+        )
+        graph = build_graph(
+            memory,
+            StubChatModel(
+                latency=args.latency, tokens_per_second=args.tokens_per_second
+            ),
+        )
+        config = {"configurable": {"thread_id": "breakdown"}}
+        for turno in range(args.turns):
+            entrada = {"messages": [f"mensagem {turno}: " + "texto " * 30]}
+            if args.stream:
+                for _ in graph.stream(entrada, config, stream_mode="messages"):
+                    pass
+            else:
+                graph.invoke(entrada, config)
+        conn.close()
+
+    print("=" * 72)
+    print(
+        f"⏱️  ONDE VAI O TEMPO ({args.turns} turnos, LLM stub {1000 * args.latency:.0f} ms)"
+    )
+    print("=" * 72)
+    print(f"{'métrica':>44}{'n':>7}{'média':>11}{'p95 ≤':>10}")
+    for nome, valor in REGISTRY.snapshot().items():
+        if not isinstance(valor, dict):
+            print(f"{nome:>44}{valor:>28.0f}")
+            continue
+        if "bytes" in nome:
+            media, p95 = f"{valor['mean']:.0f} B", f"{valor['p95']:.0f} B"
+        else:
+            media, p95 = f"{1000 * valor['mean']:.2f} ms", f"{1000 * valor['p95']:g} ms"
+        print(f"{nome:>44}{valor['count']:>7}{media:>11}{p95:>10}")
+
+    if args.prometheus:
+        REGISTRY.write(args.prometheus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,400 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script chat_server.py
+=====================
+Serviço HTTP (ASGI) de chat sobre o AsyncChatEngine: o mesmo graph do
+chatbot (filternode → chatnode), com os mesmos checkpoints em SQLite.
+
+Endpoints
+---------
+POST /threads/{thread_id}/messages   {"message": "..."} → {"reply": "..."}
+POST /threads/{thread_id}/stream     {"message": "..."} → text/event-stream
+GET  /threads/{thread_id}/history    → {"messages": [{"role", "content"}]}
+GET  /health                         → contadores do serviço e do agendador
+GET  /metrics                        → métricas no formato do Prometheus (METRICS=1)
+
+Com orçamentos de tokens (TOKEN_BUDGET/TOKEN_BUDGETS, ver usage_ledger.py)
+uma thread que já gastou o seu orçamento recebe 429.
+
+Erros do turno viram respostas JSON: orçamento esgotado → 429, LLM
+sobrecarregado ou fora do ar (incluindo o RateLimiter desistindo) → 503
+com `Retry-After` quando a API informa, outra falha do LLM → 502, o resto
+→ 500. No /stream, um erro depois do primeiro pedaço vira um evento
+`event: error` antes de fechar a resposta.
+
+Contrapressão: no máximo `max_in_flight` turnos rodam ao mesmo tempo (o
+SessionScheduler do motor) e até `max_queue` esperam na fila. Acima disso
+o serviço responde 429 com `Retry-After`, em vez de acumular pedidos sem
+limite.
+
+Desligamento: no `lifespan.shutdown` (Ctrl+C no uvicorn) novos pedidos
+recebem 503, os que já estão em andamento terminam (até
+`shutdown_timeout` segundos), a manutenção adiada é concluída e as
+conexões SQLite são fechadas. Como cada `put` só retorna depois do
+COMMIT, todo turno respondido já está no disco.
+
+O app é ASGI puro (sem framework); para servir, use qualquer servidor
+ASGI, por exemplo o uvicorn.
+
+Configuração por variáveis de ambiente:
+  CHAT_SERVER_MAX_IN_FLIGHT=64   (turnos em execução ao mesmo tempo)
+  CHAT_SERVER_MAX_QUEUE=256      (pedidos esperando antes do 429)
+  CHAT_SERVER_DB=chatbot_memory.db
+
+Run
+---
+uv run --with uvicorn chat_server.py --port 8000
+uv run --with uvicorn chat_server.py --stub --max-in-flight 32
+curl -X POST localhost:8000/threads/usuario_1/messages -d '{"message": "Olá!"}'
+"""
+import argparse
+import asyncio
+import json
+import os
+import math
+import re
+import traceback
+from typing import Any, List, Optional, Tuple
+
+import groq
+from langchain_core.language_models import BaseChatModel
+
+from async_chat_engine import AsyncChatEngine
+from llm_rate_limiter import is_retryable, retry_after
+from metrics import REGISTRY
+from usage_ledger import TokenBudgetExceeded
+
+MAX_IN_FLIGHT = int(os.getenv("CHAT_SERVER_MAX_IN_FLIGHT", "64"))
+MAX_QUEUE = int(os.getenv("CHAT_SERVER_MAX_QUEUE", "256"))
+DB_PATH = os.getenv("CHAT_SERVER_DB", "chatbot_memory.db")
+
+ROTA = re.compile(r"^/threads/(?P<thread_id>[^/]+)/(?P<acao>messages|stream|history)$")
+
+
+class ChatService:
+    """
+    App ASGI com os endpoints de chat.
+
+    Args:
+        db_path: Arquivo SQLite dos checkpoints
+        chat_llm: Modelo alternativo (ex.: StubChatModel para testes de carga)
+        max_in_flight: Turnos executando ao mesmo tempo
+        max_queue: Pedidos aguardando vaga antes de responder 429
+        shutdown_timeout: Segundos de espera pelos pedidos em andamento
+        profile_every: Perfila um a cada N turnos de cada thread (ver
+            turn_profiler.py). Por padrão segue PROFILE_TURNS.
+    """
+
+    def __init__(
+        self,
+        db_path: str = DB_PATH,
+        chat_llm: Optional[BaseChatModel] = None,
+        max_in_flight: int = MAX_IN_FLIGHT,
+        max_queue: int = MAX_QUEUE,
+        shutdown_timeout: float = 30.0,
+        profile_every: Optional[int] = None,
+    ):
+        self.db_path = db_path
+        self.chat_llm = chat_llm
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.shutdown_timeout = shutdown_timeout
+        self.profile_every = profile_every
+        self.engine: Optional[AsyncChatEngine] = None
+        self.pending = 0
+        self.rejected = 0
+        self.closing = False
+        self._drained: Optional[asyncio.Event] = None
+
+    # ------------------------------------------------------------------ ciclo de vida
+    async def startup(self) -> None:
+        self.engine = await AsyncChatEngine(
+            self.db_path,
+            chat_llm=self.chat_llm,
+            max_concurrent_turns=self.max_in_flight,
+            profile_every=self.profile_every,
+        ).start()
+        self._drained = asyncio.Event()
+        self._drained.set()
+        self.closing = False
+
+    async def shutdown(self) -> None:
+        """Recusa novos pedidos, espera os atuais e fecha o banco."""
+        self.closing = True
+        try:
+            await asyncio.wait_for(self._drained.wait(), self.shutdown_timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Encerrando com {self.pending} pedido(s) ainda em andamento")
+        await self.engine.close()
+
+    async def _lifespan(self, receive, send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                try:
+                    await self.startup()
+                except Exception as e:
+                    traceback.print_exc()
+                    await send({"type": "lifespan.startup.failed", "message": repr(e)})
+                    return
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                try:
+                    await self.shutdown()
+                except Exception as e:
+                    traceback.print_exc()
+                    await send({"type": "lifespan.shutdown.failed", "message": repr(e)})
+                    return
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # ------------------------------------------------------------------ ASGI
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        if scope["path"] == "/health":
+            await _json(send, 200, self.stats())
+            return
+        if scope["path"] == "/metrics":
+            await _text(send, 200, REGISTRY.to_prometheus())
+            return
+        rota = ROTA.match(scope["path"])
+        if rota is None:
+            await _json(send, 404, {"error": "rota não encontrada"})
+            return
+        metodo = "GET" if rota["acao"] == "history" else "POST"
+        if scope["method"] != metodo:
+            await _json(send, 405, {"error": f"use {metodo}"}, [(b"allow", metodo)])
+            return
+
+        if self.closing:
+            await _json(send, 503, {"error": "serviço encerrando"})
+            return
+        if self.pending >= self.max_in_flight + self.max_queue:
+            self.rejected += 1
+            await _json(
+                send, 429, {"error": "serviço saturado"}, [(b"retry-after", "1")]
+            )
+            return
+
+        self.pending += 1
+        self._drained.clear()
+        try:
+            await self._handle(rota["acao"], rota["thread_id"], receive, send)
+        finally:
+            self.pending -= 1
+            if self.pending == 0:
+                self._drained.set()
+
+    async def _handle(self, acao: str, thread_id: str, receive, send) -> None:
+        if acao == "history":
+            try:
+                mensagens = await self.engine.history(thread_id)
+            except Exception as e:
+                await _json(send, *_error_response(thread_id, e))
+                return
+            await _json(
+                send,
+                200,
+                {
+                    "thread_id": thread_id,
+                    "messages": [
+                        {"role": m.type, "content": m.content} for m in mensagens
+                    ],
+                },
+            )
+            return
+
+        try:
+            texto = json.loads(await _read_body(receive))["message"]
+        except (ValueError, KeyError, TypeError):
+            await _json(send, 400, {"error": 'envie {"message": "..."}'})
+            return
+
+        # Orçamento esgotado: recusa antes de abrir a resposta (o chatnode
+        # confere de novo antes de chamar o LLM)
+        if self.engine.ledger is not None:
+            try:
+                self.engine.ledger.check_budget(thread_id)
+            except TokenBudgetExceeded as e:
+                await _json(send, 429, {"error": str(e)})
+                return
+
+        if acao == "messages":
+            try:
+                resposta = await self.engine.send(thread_id, texto)
+            except Exception as e:
+                await _json(send, *_error_response(thread_id, e))
+                return
+            await _json(send, 200, {"thread_id": thread_id, "reply": resposta.content})
+            return
+
+        # Server-Sent Events: um evento por pedaço da resposta. O cabeçalho
+        # só sai com o primeiro pedaço, então um erro antes dele (orçamento,
+        # LLM fora do ar) ainda vira uma resposta com o status certo.
+        tokens = self.engine.stream(thread_id, texto)
+        try:
+            try:
+                token = await anext(tokens, None)
+            except Exception as e:
+                await _json(send, *_error_response(thread_id, e))
+                return
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream; charset=utf-8"),
+                        (b"cache-control", b"no-cache"),
+                    ],
+                }
+            )
+            while token is not None:
+                evento = f"data: {json.dumps(token, ensure_ascii=False)}\n\n"
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": evento.encode("utf-8"),
+                        "more_body": True,
+                    }
+                )
+                try:
+                    token = await anext(tokens, None)
+                except Exception as e:
+                    # Cabeçalho já enviado: o erro vai como evento do stream
+                    status, payload, _ = _error_response(thread_id, e)
+                    dados = json.dumps(
+                        {"status": status, **payload}, ensure_ascii=False
+                    )
+                    evento = f"event: error\ndata: {dados}\n\n"
+                    await send(
+                        {"type": "http.response.body", "body": evento.encode("utf-8")}
+                    )
+                    return
+            await send(
+                {"type": "http.response.body", "body": b"event: end\ndata: {}\n\n"}
+            )
+        finally:
+            await tokens.aclose()
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "closing": self.closing,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "scheduler": self.engine.scheduler.stats() if self.engine else None,
+            "profiler": (
+                self.engine.profiler.stats()
+                if self.engine and self.engine.profiler
+                else None
+            ),
+        }
+
+
+def _error_response(
+    thread_id: str, e: Exception
+) -> Tuple[int, dict, List[Tuple[bytes, str]]]:
+    """Status HTTP, corpo JSON e cabeçalhos de um turno que falhou."""
+    if isinstance(e, TokenBudgetExceeded):
+        return 429, {"error": str(e)}, []
+    if isinstance(e, groq.APIError) or is_retryable(e):
+        print(f"[ERRO] LLM no turno de {thread_id}: {e!r}")
+        # 429/5xx/timeout que sobraram depois das tentativas: a API está
+        # sobrecarregada ou fora do ar; outros erros são respostas inválidas
+        if not is_retryable(e):
+            return 502, {"error": f"falha no LLM: {type(e).__name__}"}, []
+        espera = retry_after(e)
+        headers = [] if espera is None else [(b"retry-after", str(math.ceil(espera)))]
+        return 503, {"error": f"LLM indisponível: {type(e).__name__}"}, headers
+    print(f"[ERRO] Turno de {thread_id}:")
+    traceback.print_exc()
+    return 500, {"error": "erro interno"}, []
+
+
+async def _read_body(receive) -> bytes:
+    corpo = b""
+    while True:
+        message = await receive()
+        corpo += message.get("body", b"")
+        if not message.get("more_body"):
+            return corpo
+
+
+async def _json(send, status: int, payload: Any, headers=()) -> None:
+    corpo = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json; charset=utf-8"),
+                (b"content-length", str(len(corpo)).encode()),
+                *[(nome, valor.encode()) for nome, valor in headers],
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": corpo})
+
+
+async def _text(send, status: int, texto: str) -> None:
+    corpo = texto.encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"text/plain; version=0.0.4; charset=utf-8"),
+                (b"content-length", str(len(corpo)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": corpo})
+
+
+# Para `uvicorn chat_server:app` (configurado pelas variáveis de ambiente)
+app = ChatService()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serviço HTTP de chat")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", default=DB_PATH)
+    parser.add_argument("--max-in-flight", type=int, default=MAX_IN_FLIGHT)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    parser.add_argument("--stub", action="store_true", help="Usa o LLM stub (sem rede)")
+    parser.add_argument(
+        "--profile-every", type=int, help="Perfila um a cada N turnos de cada thread"
+    )
+    args = parser.parse_args()
+
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit(
+            "❌ Servidor ASGI não encontrado: rode com `uv run --with uvicorn "
+            "chat_server.py` (ou instale o uvicorn)"
+        )
+
+    chat_llm = None
+    if args.stub:
+        from benchmarks.stub_llm import StubChatModel
+
+        chat_llm = StubChatModel()
+
+    servico = ChatService(
+        args.db,
+        chat_llm=chat_llm,
+        max_in_flight=args.max_in_flight,
+        max_queue=args.max_queue,
+        profile_every=args.profile_every,
+    )
+    uvicorn.run(servico, host=args.host, port=args.port, lifespan="on")
@@ -15,43 +15,92 @@ uv run chatbot_with_memory_checkpoints.py
 """
 from langgraph.checkpoint.sqlite import SqliteSaver  # Persistência em disco
 from langgraph.graph.message import RemoveMessage
-from langchain_groq import ChatGroq
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import get_buffer_string
+from langchain_core.messages.utils import count_tokens_approximately
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.runnables import Runnable, RunnableLambda
+from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import AnyMessage, add_messages
-from typing import Annotated, List
-from typing_extensions import TypedDict
-import sqlite3
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import cache, partial
+from typing import Annotated, Dict, List, Optional
+from typing_extensions import NotRequired, TypedDict
+
+from checkpoint_cache import cached_saver
+from checkpoint_retention import RetentionWorker, load_policies
+from compressed_serializer import make_serializer
+from group_commit_saver import (
+    GROUP_COMMIT,
+    GroupCommitDedupSaver,
+    GroupCommitSqliteSaver,
+)
+from hedged_llm import LLM_HEDGE, Hedger, hedged
+from llm_rate_limiter import (
+    GROQ_RATE_LIMIT,
+    PRIORITY_BACKGROUND,
+    RateLimiter,
+    rate_limited,
+)
+from message_dedup_saver import DedupSqliteSaver
+from metrics import (
+    METRICS,
+    atimed,
+    instrumented_llm,
+    instrumented_saver,
+    timed,
+    write_metrics_file,
+)
+from model_router import FAST_MODEL, LLM_ROUTING, ModelRouter, Route, routed
+from response_cache import RESPONSE_CACHE, ResponseCache, cached_llm
+from shard_layout import check_layout, shard_paths
+from sharded_saver import ShardedCheckpointSaver
+from storage_profiles import connect
+from turn_profiler import profiled, turn_profiler
+from usage_ledger import (
+    USAGE_LEDGER,
+    UsageLedger,
+    abudget_checked,
+    budget_checked,
+)
+from usage_ledger_saver import ledger_saver
 
 import os
 from dotenv import load_dotenv, find_dotenv
 
 _ = load_dotenv(find_dotenv())  # read local .env file
-GROQ_API_KEY = os.environ["GROQ_API_KEY"]
+
+# Nada é construído no import: o ChatGroq, as conexões com o banco e o graph
+# compilado saem das fábricas abaixo (llm_components, runtime_components)
+# no primeiro uso. Quem só importa build_graph, os flags ou as funções de
+# recorte (o motor assíncrono, os benchmarks) não abre o banco nem precisa
+# de GROQ_API_KEY. Os nomes antigos (llm, llm_model, memory, graph...)
+# continuam acessíveis como atributos do módulo (ver __getattr__ no fim).
 
 
 class State(TypedDict):
     messages: Annotated[List[AnyMessage], add_messages]
+    summary: NotRequired[str]  # Resumo acumulado das mensagens já recortadas
 
 
-llm = ChatGroq(
-    model="llama-3.3-70b-versatile",
-    api_key=GROQ_API_KEY,
-    temperature=0.0,
-    timeout=30.0,  # Timeout de 30 segundos
-    max_retries=2,  # Tenta até 2 vezes em caso de erro
-)
+def groq_api_key() -> str:
+    """GROQ_API_KEY do ambiente (ou do .env), lida só quando o LLM é criado."""
+    try:
+        return os.environ["GROQ_API_KEY"]
+    except KeyError:
+        raise RuntimeError(
+            "GROQ_API_KEY não definida: exporte a variável ou crie um .env "
+            "(ver README)"
+        ) from None
+
 
 prompt_template = ChatPromptTemplate.from_messages(
     [("system", "{system_message}"), MessagesPlaceholder("messages")]
 )
 
-llm_model = prompt_template | llm
-
-
-def ChatNode(state: State) -> State:
-
-    system_message = """Você é um assistente de IA com memória de conversa.
+SYSTEM_MESSAGE = """Você é um assistente de IA com memória de conversa.
 
 INSTRUÇÕES IMPORTANTES:
 1. Você TEM acesso ao histórico completo desta conversa
@@ -63,73 +112,718 @@ INSTRUÇÕES IMPORTANTES:
 Responda de forma clara, concisa e factual, SEMPRE considerando
 o contexto completo da conversa."""
 
+# Resumo das mensagens antigas (já removidas do histórico), anexado ao
+# system message quando a sumarização está ativa:
+SUMMARY_SECTION = """
+
+RESUMO DA CONVERSA ANTERIOR (mensagens que já saíram do histórico):
+{summary}"""
+
+
+def system_message_for(state: State) -> str:
+    """System message do ChatNode, com o resumo acumulado se houver."""
+    summary = state.get("summary")
+    if not summary:
+        return SYSTEM_MESSAGE
+    return SYSTEM_MESSAGE + SUMMARY_SECTION.format(summary=summary)
+
+
+def ChatNode(state: State, modelo: Optional[Runnable] = None) -> State:
+    """
+    Gera a resposta do assistente a partir do histórico da thread.
+
+    Args:
+        state: Estado atual do graph
+        modelo: Runnable (prompt | LLM) a usar. Por padrão usa `llm_model`
+    """
+    modelo = modelo or llm_components()["llm_model"]
+
     try:
-        result = llm_model.invoke(
-            {"system_message": system_message, "messages": state["messages"]}
+        result = modelo.invoke(
+            {"system_message": system_message_for(state), "messages": state["messages"]}
         )
 
-        state["messages"] = result
-        return state
+        return {"messages": result}
     except Exception as e:
         print(f"[ERRO] ChatNode: {e}")
         raise
 
 
+async def aChatNode(state: State, modelo: Optional[Runnable] = None) -> State:
+    """
+    Versão assíncrona do ChatNode, usada por `graph.ainvoke`/`graph.astream`.
+
+    Não bloqueia o event loop enquanto espera a resposta do LLM, o que
+    permite atender muitas threads concorrentes no mesmo processo.
+    """
+    modelo = modelo or llm_components()["llm_model"]
+
+    try:
+        result = await modelo.ainvoke(
+            {"system_message": system_message_for(state), "messages": state["messages"]}
+        )
+
+        return {"messages": result}
+    except Exception as e:
+        print(f"[ERRO] ChatNode: {e}")
+        raise
+
+
+# Orçamento de tokens do histórico enviado ao LLM (sem contar o system message).
+# Funciona como marca d'água ALTA: nada é recortado até o histórico passar
+# deste valor. Ajustável pela variável de ambiente MAX_CONTEXT_TOKENS.
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "6000"))
+
+# Marca d'água BAIXA: quando o recorte acontece, o histórico é reduzido de uma
+# só vez até caber neste valor. Assim o RemoveMessage sai em lotes, em vez de
+# apagar 1-2 mensagens em todo turno (menos writes e checkpoints no SQLite).
+# Com o mesmo valor de MAX_CONTEXT_TOKENS volta ao recorte a cada turno.
+CONTEXT_LOW_WATERMARK_TOKENS = int(
+    os.getenv("CONTEXT_LOW_WATERMARK_TOKENS", str(MAX_CONTEXT_TOKENS * 6 // 10))
+)
+
+# Cache de contagem de tokens por id de mensagem: cada mensagem é tokenizada
+# uma única vez, então um turno só conta as mensagens novas.
+TOKEN_CACHE_SIZE = 100_000
+_token_cache: "OrderedDict[str, int]" = OrderedDict()
+
+
+def message_tokens(message: AnyMessage) -> int:
+    """
+    Número (aproximado) de tokens de uma mensagem, com cache pelo `message.id`.
+
+    Args:
+        message: Mensagem do histórico
+
+    Returns:
+        Quantidade de tokens da mensagem
+    """
+    msg_id = message.id
+    if msg_id is not None:
+        try:
+            _token_cache.move_to_end(msg_id)
+            return _token_cache[msg_id]
+        except KeyError:
+            pass
+
+    tokens = count_tokens_approximately([message])
+
+    if msg_id is not None:
+        _token_cache[msg_id] = tokens
+        if len(_token_cache) > TOKEN_CACHE_SIZE:
+            _token_cache.popitem(last=False)
+    return tokens
+
+
+def messages_to_evict(messages: List[AnyMessage]) -> List[AnyMessage]:
+    """
+    Mensagens mais antigas que devem sair do histórico neste turno.
+
+    Regra de histerese: lista vazia enquanto o histórico couber em
+    MAX_CONTEXT_TOKENS (marca alta); acima disso, as mais antigas até o
+    histórico caber em CONTEXT_LOW_WATERMARK_TOKENS (marca baixa), sempre
+    mantendo a mensagem mais recente.
+    """
+    low_watermark = min(CONTEXT_LOW_WATERMARK_TOKENS, MAX_CONTEXT_TOKENS)
+
+    tokens = [message_tokens(m) for m in messages]
+    total_tokens = sum(tokens)
+
+    # Abaixo da marca alta: não remove nada
+    if total_tokens <= MAX_CONTEXT_TOKENS:
+        return []
+
+    # Remove as mais antigas até caber na marca baixa (mantendo a última)
+    corte = 0
+    while corte < len(messages) - 1 and total_tokens > low_watermark:
+        total_tokens -= tokens[corte]
+        corte += 1
+
+    return messages[:corte]
+
+
 def filter_node(state: State) -> State:
     """
     Filtra o histórico para manter memória de curto prazo gerenciável.
 
     CONFIGURAÇÃO ATUAL:
-      Mantém últimas 25 interações (50 mensagens)
-    - Isso permite que o bot lembre de muito mais contexto
-    - Mantém informações importantes por mais tempo
-    - Previne que o histórico cresça infinitamente
-    - Ajustável conforme necessidade
+      Recorte em lote com histerese por tokens
+    - Enquanto o histórico couber em MAX_CONTEXT_TOKENS (marca alta),
+      nada é removido e o nó não escreve nada no checkpoint
+    - Ao passar da marca alta, remove de uma vez as mensagens mais antigas
+      até o histórico caber em CONTEXT_LOW_WATERMARK_TOKENS (marca baixa)
+    - O tamanho do prompt (e a latência) fica limitado por tokens
+    - A mensagem mais recente é sempre mantida
 
-    Para mudar: Altere MAX_INTERACTIONS abaixo
+    Para mudar: Altere MAX_CONTEXT_TOKENS / CONTEXT_LOW_WATERMARK_TOKENS
     """
-    MAX_INTERACTIONS = 25  # Ajustar para mais ou menos memória
-    MAX_MESSAGES = (
-        MAX_INTERACTIONS * 2
-    )  # Cada interação tem 2 mensagens (user + assistant)
+    messages_to_remove = messages_to_evict(state["messages"])
 
-    messages = state["messages"]
-    num_messages = len(messages)
+    # Abaixo da marca alta: não remove nada e não gera writes
+    if not messages_to_remove:
+        return {}
 
-    # Só filtra se houver mais mensagens que o limite (MAX_MESSAGES)
-    if num_messages > MAX_MESSAGES:
-        # Remove todas as mensagens antigas, mantendo apenas as últimas MAX_MESSAGES
-        messages_to_remove = messages[:-MAX_MESSAGES]
-        delete_messages = [RemoveMessage(id=m.id) for m in messages_to_remove]
+    delete_messages = [RemoveMessage(id=m.id) for m in messages_to_remove]
 
-        return {"messages": delete_messages}
+    return {"messages": delete_messages}
 
-    # Se estiver dentro do limite, não remove nada. Retorna o estado atual.
-    return state
 
+# Sumarização incremental (opcional): antes do filtro remover mensagens,
+# elas são "dobradas" no resumo acumulado em State["summary"]. Só as
+# mensagens recém-removidas vão para o LLM, nunca o histórico inteiro.
+# Ativar com ENABLE_SUMMARY=1 ou build_graph_builder(summarize=True).
+ENABLE_SUMMARY = os.getenv("ENABLE_SUMMARY", "0") == "1"
+
+SUMMARY_SYSTEM_MESSAGE = """Você mantém o resumo de uma conversa entre um usuário e um assistente.
+Atualize o resumo atual incorporando os novos trechos da conversa.
+Preserve fatos concretos (nomes, preferências, números, decisões) e
+descarte cumprimentos e repetições. Responda apenas com o resumo atualizado,
+em texto corrido e conciso."""
+
+summary_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", SUMMARY_SYSTEM_MESSAGE),
+        (
+            "human",
+            "Resumo atual:\n{summary}\n\nNovos trechos da conversa:\n{transcript}",
+        ),
+    ]
+)
+
+
+@cache
+def llm_components() -> Dict[str, object]:
+    """
+    Cria (uma vez por processo) o ChatGroq e o que é montado em volta dele.
+
+    Returns:
+        {"llm", "groq_limiter", "chat_hedger", "chat_router", "response_cache",
+        "chat_llm_groq", "llm_model", "summary_model"}: o modelo base, os
+        componentes opcionais (None quando desligados), o modelo de chat já
+        embrulhado, e os Runnables (prompt | LLM) de chat e de resumo
+    """
+    from langchain_groq import ChatGroq  # Só quem chama a API paga o import
+
+    llm = ChatGroq(
+        model="llama-3.3-70b-versatile",
+        api_key=groq_api_key(),
+        temperature=0.0,
+        timeout=30.0,  # Timeout de 30 segundos
+        # Tenta até 2 vezes em caso de erro (com GROQ_RATE_LIMIT=1 quem repete
+        # é o RateLimiter, que respeita os limites da API key)
+        max_retries=0 if GROQ_RATE_LIMIT else 2,
+    )
+
+    # Todas as sessões do processo dividem a mesma API key: com GROQ_RATE_LIMIT=1
+    # as chamadas passam por uma fila com buckets de RPM/TPM (ver llm_rate_limiter.py)
+    groq_limiter = RateLimiter() if GROQ_RATE_LIMIT else None
+    chat_llm_groq = rate_limited(llm, groq_limiter) if GROQ_RATE_LIMIT else llm
+
+    # Com LLM_HEDGE=1 uma resposta mais lenta que o p95 recente ganha uma cópia
+    # da requisição e vale a que chegar primeiro (ver hedged_llm.py)
+    chat_hedger = Hedger() if LLM_HEDGE else None
+    if LLM_HEDGE:
+        chat_llm_groq = hedged(chat_llm_groq, chat_hedger)
+
+    # Com LLM_ROUTING=1 turnos curtos e simples ("obrigado", "ok") vão para um
+    # modelo menor e mais barato; se uma rota ficar lenta ou falhar, a outra
+    # assume (ver model_router.py). Os limites da Groq são por modelo, então o
+    # modelo rápido tem a sua própria fila.
+    chat_router = None
+    if LLM_ROUTING:
+        fast_llm = ChatGroq(
+            model=FAST_MODEL,
+            api_key=groq_api_key(),
+            temperature=0.0,
+            timeout=30.0,
+            max_retries=0 if GROQ_RATE_LIMIT else 2,
+        )
+        chat_router = ModelRouter(
+            fast=Route(
+                FAST_MODEL,
+                rate_limited(fast_llm, RateLimiter()) if GROQ_RATE_LIMIT else fast_llm,
+            ),
+            large=Route(llm.model_name, chat_llm_groq),
+        )
+        chat_llm_groq = routed(chat_router)
 
-graph_builder = StateGraph(State)
-graph_builder.add_node("filternode", filter_node)
-graph_builder.add_node("chatnode", ChatNode)
+    # Com RESPONSE_CACHE=1 prompts idênticos (mesmo system message e mesma
+    # janela de mensagens) são respondidos do cache, sem chamar a Groq
+    # (ver response_cache.py). Só vale com temperature=0.0.
+    response_cache = None
+    if RESPONSE_CACHE:
+        response_cache = ResponseCache(
+            f"{llm.model_name}|{FAST_MODEL}" if LLM_ROUTING else llm.model_name,
+            llm.temperature,
+        )
+        chat_llm_groq = cached_llm(chat_llm_groq, response_cache)
+
+    return {
+        "llm": llm,
+        "groq_limiter": groq_limiter,
+        "chat_hedger": chat_hedger,
+        "chat_router": chat_router,
+        "response_cache": response_cache,
+        "chat_llm_groq": chat_llm_groq,
+        "llm_model": prompt_template | chat_llm_groq,
+        "summary_model": summary_prompt_template
+        | (
+            rate_limited(llm, groq_limiter, PRIORITY_BACKGROUND)
+            if GROQ_RATE_LIMIT
+            else llm
+        ),
+    }
+
+
+def _summary_input(state: State, evicted: List[AnyMessage]) -> dict:
+    transcript = get_buffer_string(
+        evicted, human_prefix="Usuário", ai_prefix="Assistente"
+    )
+    return {"summary": state.get("summary") or "(vazio)", "transcript": transcript}
+
+
+def summarize_node(state: State, modelo: Optional[Runnable] = None) -> State:
+    """
+    Incorpora ao resumo as mensagens que o filter_node vai remover neste turno.
+
+    Com a histerese do filtro, isso só acontece quando a marca alta é
+    ultrapassada, então o custo extra de LLM é amortizado em lotes.
+
+    Args:
+        state: Estado atual do graph
+        modelo: Runnable (prompt | LLM) de resumo. Por padrão `summary_model`
+    """
+    evicted = messages_to_evict(state["messages"])
+    if not evicted:
+        return {}
+
+    modelo = modelo or llm_components()["summary_model"]
+    result = modelo.invoke(_summary_input(state, evicted))
+    return {"summary": result.content}
+
+
+async def aSummarizeNode(state: State, modelo: Optional[Runnable] = None) -> State:
+    """Versão assíncrona do summarize_node."""
+    evicted = messages_to_evict(state["messages"])
+    if not evicted:
+        return {}
+
+    modelo = modelo or llm_components()["summary_model"]
+    result = await modelo.ainvoke(_summary_input(state, evicted))
+    return {"summary": result.content}
+
+
+def summary_runnable(chat_llm: Optional[BaseChatModel] = None) -> Runnable:
+    """Runnable (prompt | LLM) de resumo para o modelo de chat informado."""
+    if chat_llm is None:
+        return llm_components()["summary_model"]
+    return summary_prompt_template | chat_llm
+
+
+# Manutenção adiada (opcional): em vez de rodar summarize/filter ANTES do
+# chatnode, o turno só executa o chatnode e a manutenção roda DEPOIS que a
+# resposta já foi devolvida, em segundo plano. O próximo turno da mesma
+# thread espera a manutenção pendente terminar, então sempre vê um estado
+# consistente. Ativar com DEFER_MAINTENANCE=1.
+DEFER_MAINTENANCE = os.getenv("DEFER_MAINTENANCE", "0") == "1"
+
+
+def maintenance_update(
+    state: State, summarize: bool = False, modelo: Optional[Runnable] = None
+) -> dict:
+    """
+    Atualização de manutenção (resumo + recorte) para o estado informado.
+
+    Equivale a rodar summarize_node e filter_node em sequência; retorna {}
+    quando não há nada a recortar.
+    """
+    evicted = messages_to_evict(state.get("messages", []))
+    if not evicted:
+        return {}
+
+    update = {"messages": [RemoveMessage(id=m.id) for m in evicted]}
+    if summarize:
+        modelo = modelo or llm_components()["summary_model"]
+        update["summary"] = modelo.invoke(_summary_input(state, evicted)).content
+    return update
+
+
+async def amaintenance_update(
+    state: State, summarize: bool = False, modelo: Optional[Runnable] = None
+) -> dict:
+    """Versão assíncrona de maintenance_update."""
+    evicted = messages_to_evict(state.get("messages", []))
+    if not evicted:
+        return {}
+
+    update = {"messages": [RemoveMessage(id=m.id) for m in evicted]}
+    if summarize:
+        modelo = modelo or llm_components()["summary_model"]
+        result = await modelo.ainvoke(_summary_input(state, evicted))
+        update["summary"] = result.content
+    return update
+
+
+class DeferredMaintenance:
+    """
+    Executa a manutenção da memória fora do caminho crítico do turno.
+
+    Uso (graph compilado com deferred_maintenance=True):
+        maintenance.wait(config)      # antes de invocar o graph
+        graph.invoke(...)             # só o chatnode
+        maintenance.schedule(config)  # recorte/resumo em segundo plano
+
+    Args:
+        graph: Graph compilado (com checkpointer)
+        chat_llm: Modelo usado no resumo (o mesmo do chatnode)
+        summarize: Também atualiza o resumo. Por padrão segue ENABLE_SUMMARY
+    """
+
+    def __init__(
+        self,
+        graph,
+        chat_llm: Optional[BaseChatModel] = None,
+        summarize: Optional[bool] = None,
+    ):
+        self.graph = graph
+        self.summarize = ENABLE_SUMMARY if summarize is None else summarize
+        self.modelo = summary_runnable(chat_llm)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="memory-maintenance"
+        )
+        self._pending: Dict[str, Future] = {}
+
+    def run(self, config: dict) -> None:
+        """Aplica a manutenção agora, no checkpoint mais recente da thread."""
+        state = self.graph.get_state(config).values
+        update = maintenance_update(state, self.summarize, self.modelo)
+        if update:
+            self.graph.update_state(config, update, as_node="chatnode")
+
+    def schedule(self, config: dict) -> Future:
+        """Agenda a manutenção da thread em segundo plano."""
+        thread_id = config["configurable"]["thread_id"]
+        future = self._executor.submit(self.run, config)
+        self._pending[thread_id] = future
+        return future
+
+    def wait(self, config: dict) -> None:
+        """
+        Espera a manutenção pendente da thread (se houver) terminar.
+
+        Uma falha da manutenção só é registrada: o turno segue com o
+        checkpoint sem recorte/resumo, e a próxima manutenção tenta de novo.
+        """
+        thread_id = config["configurable"]["thread_id"]
+        future = self._pending.pop(thread_id, None)
+        if future is not None:
+            report_maintenance_error(thread_id, future.exception())
+
+    def shutdown(self) -> None:
+        """Espera todas as manutenções pendentes e encerra o executor."""
+        self._executor.shutdown(wait=True)
+        for thread_id, future in self._pending.items():
+            report_maintenance_error(thread_id, future.exception())
+        self._pending.clear()
+
+
+def report_maintenance_error(thread_id: str, erro: Optional[BaseException]) -> None:
+    """Registra a falha de uma manutenção adiada (None = não falhou)."""
+    if erro is not None:
+        print(f"[ERRO] Manutenção da thread {thread_id}: {erro!r}")
+
+
+def _node(
+    nome: str, func, afunc=None, ledger: Optional[UsageLedger] = None
+) -> RunnableLambda:
+    """
+    Nó do graph; com METRICS=1 a duração vai para chatbot_node_seconds.
+
+    Com um `ledger` com orçamentos, o orçamento de tokens da thread é
+    conferido antes de o nó rodar (ver usage_ledger.py).
+    """
+    if ledger is not None and ledger.budgets:
+        func = budget_checked(func, ledger)
+        afunc = abudget_checked(afunc, ledger) if afunc else None
+    if METRICS:
+        func = timed(func, nome)
+        afunc = atimed(afunc, nome) if afunc else None
+    return RunnableLambda(func, afunc=afunc, name=nome)
+
+
+def build_graph_builder(
+    chat_llm: Optional[BaseChatModel] = None,
+    summarize: Optional[bool] = None,
+    deferred_maintenance: bool = False,
+    ledger: Optional[UsageLedger] = None,
+) -> StateGraph:
+    """
+    Monta o StateGraph START → [summarizenode →] filternode → chatnode → END.
+
+    Com manutenção adiada o graph é só START → chatnode → END; o recorte e
+    o resumo ficam a cargo de DeferredMaintenance (ou do AsyncChatEngine).
+
+    Os nós que chamam o LLM têm implementação síncrona e assíncrona, então o
+    mesmo graph funciona com `invoke`/`stream` e com `ainvoke`/`astream`.
+
+    Args:
+        chat_llm: Modelo de chat alternativo (ex.: um stub para benchmarks).
+            Por padrão usa o ChatGroq configurado neste módulo.
+        summarize: Inclui o nó de resumo incremental. Por padrão segue
+            ENABLE_SUMMARY.
+        deferred_maintenance: Tira summarize/filter do caminho crítico. Quem
+            liga precisa agendar a manutenção (DeferredMaintenance ou
+            AsyncChatEngine); sem ela o histórico nunca é recortado.
+        ledger: UsageLedger cujos orçamentos de tokens o chatnode confere
+            antes de chamar o LLM (opcional)
+
+    Returns:
+        StateGraph ainda não compilado
+    """
+    if summarize is None:
+        summarize = ENABLE_SUMMARY
+    if chat_llm is None:
+        modelo = llm_components()["llm_model"]
+    else:
+        modelo = prompt_template | chat_llm
+    if METRICS:
+        # TTFT, duração e tokens de cada chamada (ver metrics.py)
+        modelo = instrumented_llm(modelo)
+
+    builder = StateGraph(State)
+    builder.add_node(
+        "chatnode",
+        _node(
+            "chatnode",
+            partial(ChatNode, modelo=modelo),
+            partial(aChatNode, modelo=modelo),
+            ledger,
+        ),
+    )
+
+    if deferred_maintenance:
+        builder.add_edge(START, "chatnode")
+        builder.add_edge("chatnode", END)
+        return builder
+
+    builder.add_node("filternode", _node("filternode", filter_node))
+
+    # IMPORTANTE: O fluxo correto é START → filternode → chatnode → END
+    # Isso garante que o filtro seja aplicado ANTES de processar a nova mensagem
+    if summarize:
+        # O resumo precisa ver as mensagens ANTES de o filtro removê-las
+        resumo = summary_runnable(chat_llm)
+        builder.add_node(
+            "summarizenode",
+            _node(
+                "summarizenode",
+                partial(summarize_node, modelo=resumo),
+                partial(aSummarizeNode, modelo=resumo),
+            ),
+        )
+        builder.add_edge(START, "summarizenode")
+        builder.add_edge("summarizenode", "filternode")
+    else:
+        builder.add_edge(START, "filternode")
+    builder.add_edge("filternode", "chatnode")
+    builder.add_edge("chatnode", END)
+    return builder
+
+
+def build_graph(
+    checkpointer: BaseCheckpointSaver,
+    chat_llm: Optional[BaseChatModel] = None,
+    summarize: Optional[bool] = None,
+    deferred_maintenance: bool = False,
+    ledger: Optional[UsageLedger] = None,
+):
+    """
+    Compila o graph do chatbot com o checkpointer informado.
+
+    Args:
+        checkpointer: SqliteSaver, AsyncSqliteSaver ou qualquer outro checkpointer
+        chat_llm: Modelo de chat alternativo (ver `build_graph_builder`)
+        summarize: Inclui o nó de resumo incremental (ver `build_graph_builder`)
+        deferred_maintenance: Manutenção fora do turno (ver `build_graph_builder`)
+        ledger: Orçamentos de tokens por thread (ver `build_graph_builder`)
+    """
+    return build_graph_builder(
+        chat_llm, summarize, deferred_maintenance, ledger
+    ).compile(checkpointer=checkpointer)
 
-# IMPORTANTE: O fluxo correto é START → filternode → chatnode → END
-# Isso garante que o filtro seja aplicado ANTES de processar a nova mensagem
-graph_builder.add_edge(START, "filternode")
-graph_builder.add_edge("filternode", "chatnode")
-graph_builder.add_edge("chatnode", END)
 
 # SqliteSaver: Persiste checkpoints em disco (arquivo SQLite)
 # A memória agora sobrevive entre execuções do script!
 # O arquivo 'chatbot_memory.db' será criado automaticamente na primeira execução
-# Criamos uma conexão SQLite persistente
-conn = sqlite3.connect("chatbot_memory.db", check_same_thread=False)
-memory = SqliteSaver(conn)
-graph = graph_builder.compile(checkpointer=memory)
+# Criamos uma conexão SQLite persistente, com os PRAGMAs do perfil de
+# armazenamento (SQLITE_PROFILE=default|durable|fast|read-heavy, ver
+# storage_profiles.py)
+# Com CHECKPOINT_SHARDS=N as threads são distribuídas entre N arquivos, cada
+# um com sua conexão e seu lock de escrita (ver sharded_saver.py)
+DB_PATH = "chatbot_memory.db"
+CHECKPOINT_SHARDS = int(os.getenv("CHECKPOINT_SHARDS", "1"))
+db_paths = shard_paths(DB_PATH, CHECKPOINT_SHARDS)
+
+# Com DEDUP_MESSAGES=1 cada mensagem é gravada uma única vez e os checkpoints
+# guardam só referências (ver message_dedup_saver.py)
+DEDUP_MESSAGES = os.getenv("DEDUP_MESSAGES", "0") == "1"
+
+
+def checkpointer_components(
+    db_path: str = DB_PATH, shards: Optional[int] = None
+) -> Dict[str, object]:
+    """
+    Abre os bancos de `db_path` e monta o checkpointer do chatbot.
+
+    Escolhe o saver pelas flags de ambiente e aplica os mesmos envoltórios
+    do chat interativo (shards, cache, ledger e métricas). Cada chamada
+    abre conexões novas: quem chama fecha `conns` e `usage_ledger`.
+
+    Args:
+        db_path: Arquivo SQLite (o primeiro shard)
+        shards: Número de arquivos. Por padrão segue CHECKPOINT_SHARDS.
+
+    Returns:
+        {"conns", "conn", "serde", "saver_class", "savers", "memory",
+        "usage_ledger"}
+
+    Raises:
+        ValueError: Há conversas gravadas com outro número de shards (ver
+            shard_layout.check_layout)
+    """
+    shards = CHECKPOINT_SHARDS if shards is None else shards
+    # Antes de `connect`, que cria os arquivos que faltam
+    check_layout(db_path, shards)
+    conns = [
+        connect(path, check_same_thread=False) for path in shard_paths(db_path, shards)
+    ]
+
+    # Serializador com compressão opcional (CHECKPOINT_COMPRESSION=zlib|lzma, ver
+    # compressed_serializer.py). Sempre lê as linhas antigas, sem compressão.
+    serde = make_serializer()
+
+    # Com CHECKPOINT_GROUP_COMMIT=1 as escritas de sessões concorrentes dividem
+    # um único COMMIT (ver group_commit_saver.py)
+    if GROUP_COMMIT:
+        saver_class = (
+            GroupCommitDedupSaver if DEDUP_MESSAGES else GroupCommitSqliteSaver
+        )
+    else:
+        saver_class = DedupSqliteSaver if DEDUP_MESSAGES else SqliteSaver
+    savers = [saver_class(c, serde=serde) for c in conns]
+    memory = savers[0] if len(savers) == 1 else ShardedCheckpointSaver(savers)
+
+    # Cache LRU do último checkpoint de cada thread (write-through): o início de
+    # cada turno não precisa reler e desserializar o histórico. Opcional, ver
+    # checkpoint_cache.py (CHECKPOINT_CACHE_ENTRIES=128 liga).
+    memory = cached_saver(memory)
+    # Com USAGE_LEDGER=1 (ou um orçamento de tokens) cada turno vira uma linha
+    # em `turn_ledger` (latência, tokens, mensagens e bytes) e o chatnode
+    # confere o orçamento da thread antes de chamar o LLM (ver usage_ledger.py)
+    usage_ledger = UsageLedger(db_path, shards) if USAGE_LEDGER else None
+    memory = ledger_saver(memory, usage_ledger)
+    # Com METRICS=1 cada leitura/escrita de checkpoint tem o tempo e os bytes
+    # medidos (ver metrics.py)
+    memory = instrumented_saver(memory)
+
+    return {
+        "conns": conns,
+        "conn": conns[0],
+        "serde": serde,
+        "saver_class": saver_class,
+        "savers": savers,
+        "memory": memory,
+        "usage_ledger": usage_ledger,
+    }
+
+
+@cache
+def runtime_components(db_path: str = DB_PATH) -> Dict[str, object]:
+    """
+    Abre (uma vez por processo) os bancos e compila o graph do chat interativo.
+
+    Returns:
+        O dicionário de checkpointer_components mais {"graph_builder",
+        "graph", "maintenance"}
+    """
+    recursos = checkpointer_components(db_path)
+    graph_builder = build_graph_builder(
+        deferred_maintenance=DEFER_MAINTENANCE, ledger=recursos["usage_ledger"]
+    )
+    graph = graph_builder.compile(checkpointer=recursos["memory"])
+
+    return {
+        **recursos,
+        "graph_builder": graph_builder,
+        "graph": graph,
+        # Manutenção da memória em segundo plano (apenas com DEFER_MAINTENANCE=1)
+        "maintenance": DeferredMaintenance(graph) if DEFER_MAINTENANCE else None,
+    }
+
+
+def get_graph():
+    """Graph compilado do chat interativo (com o checkpointer em chatbot_memory.db)."""
+    return runtime_components()["graph"]
+
+
+# Retenção de checkpoints (opcional): poda checkpoints antigos em segundo
+# plano enquanto o chat está ativo. Ver checkpoint_retention.py.
+#   CHECKPOINT_KEEP_LAST=20          → mantém os 20 mais recentes por thread
+#   CHECKPOINT_MAX_AGE_HOURS=72      → apaga os mais velhos que 72 h
+#   CHECKPOINT_RETENTION_POLICY=x.json → política por thread_id
+retention_policies = load_policies(
+    os.getenv("CHECKPOINT_RETENTION_POLICY"),
+    int(os.environ["CHECKPOINT_KEEP_LAST"])
+    if os.getenv("CHECKPOINT_KEEP_LAST")
+    else None,
+    float(os.environ["CHECKPOINT_MAX_AGE_HOURS"])
+    if os.getenv("CHECKPOINT_MAX_AGE_HOURS")
+    else None,
+)
 
 # Configuração da thread (cada usuário teria seu próprio thread_id)
 # IMPORTANTE: Usar o mesmo thread_id em execuções diferentes mantém o histórico!
 config = {"configurable": {"thread_id": "usuario_1"}}
 
+# Com PROFILE_TURNS=N um a cada N turnos é perfilado (cProfile ou amostragem)
+# e o perfil vai para PROFILE_DIR; `uv run turn_profiler.py summary` lista
+# as funções mais quentes (ver turn_profiler.py)
+profiler = turn_profiler()
+
+# Streaming: imprime os tokens do ChatNode à medida que chegam, em vez de
+# esperar o turno inteiro. Ativar com STREAM_RESPONSES=1.
+STREAM_RESPONSES = os.getenv("STREAM_RESPONSES", "0") == "1"
+
+
+def stream_response(graph, input_state: dict, config: dict) -> dict:
+    """
+    Executa um turno imprimindo a resposta do ChatNode token a token.
+
+    Usa `stream_mode="messages"` para os tokens e `"values"` para obter o
+    estado final sem reler o banco. O checkpoint continua sendo gravado uma
+    única vez, ao fim do turno, como no `graph.invoke`.
+
+    Args:
+        graph: Graph compilado
+        input_state: Estado de entrada com a mensagem do usuário
+        config: Configuração da thread
+
+    Returns:
+        Estado final do turno (o mesmo que `graph.invoke` retornaria)
+    """
+    response_state = {}
+    for mode, chunk in graph.stream(
+        input_state, config=config, stream_mode=["messages", "values"]
+    ):
+        if mode == "values":
+            response_state = chunk
+            continue
+        message_chunk, metadata = chunk
+        if metadata.get("langgraph_node") == "chatnode" and message_chunk.content:
+            print(message_chunk.content, end="", flush=True)
+    print()
+    return response_state
+
 
 def print_new_messages(old_count: int, new_state: dict) -> int:
     """
@@ -152,7 +846,6 @@ def print_new_messages(old_count: int, new_state: dict) -> int:
     # Se o filtro removeu mensagens, old_count pode ser maior que total
     # Nesse caso, imprimimos apenas as últimas 2 (user + assistant)
     if old_count >= total_messages:
-
         for message in messages[-2:]:
             message.pretty_print()
     else:
@@ -177,14 +870,26 @@ def chat_interativo():
     print("✅ Lembro de toda nossa conversa")
     print("✅ Minha memória persiste entre execuções do programa")
     print("✅ Você pode fechar e reabrir o script - eu lembro de você!")
-    print("\n💡 Dica: A memória está salva em 'chatbot_memory.db'")
+    print(f"\n💡 Dica: A memória está salva em '{', '.join(db_paths)}'")
     print("\nDigite 'sair', 'quit' ou 'exit' para encerrar.")
     print("Digite 'limpar' ou 'reset' para apagar minha memória.\n")
     print("=" * 70)
 
+    # Abre o banco e compila o graph (no primeiro uso, não no import)
+    recursos = runtime_components()
+    graph, maintenance = recursos["graph"], recursos["maintenance"]
+    usage_ledger, conns = recursos["usage_ledger"], recursos["conns"]
+
     # Contador para rastrear quantas mensagens já foram impressas
     message_count = 0
 
+    # Poda de checkpoints antigos em segundo plano (se configurada):
+    retention = []
+    if retention_policies:
+        retention = [
+            RetentionWorker(path, retention_policies).start() for path in db_paths
+        ]
+
     # Verifica se há histórico prévio ao iniciar:
     try:
         state_snapshot = graph.get_state(config)
@@ -213,11 +918,22 @@ def chat_interativo():
             if user_input.lower() in ["limpar", "reset", "apagar"]:
                 try:
                     # Fechar a conexão antes de deletar
-                    conn.close()
+                    for worker in retention:
+                        worker.stop()
+                    if maintenance is not None:
+                        maintenance.shutdown()
+                    if usage_ledger is not None:
+                        usage_ledger.close()
+                    for c in conns:
+                        c.close()
                     import os
 
-                    if os.path.exists("chatbot_memory.db"):
-                        os.remove("chatbot_memory.db")
+                    if os.path.exists(db_paths[0]):
+                        for path in db_paths:
+                            # O banco e os arquivos auxiliares do modo WAL
+                            for ext in ["", "-wal", "-shm"]:
+                                if os.path.exists(path + ext):
+                                    os.remove(path + ext)
                         print("\n🗑️  Memória apagada com sucesso!")
                         print("⚠️  Reinicie o script para começar uma nova conversa.")
                         print("=" * 70)
@@ -241,14 +957,35 @@ def chat_interativo():
             print("\n⏳ Processando ...")
 
             try:
+                # Com manutenção adiada, garante que o recorte do turno
+                # anterior já foi aplicado antes de ler o checkpoint
+                if maintenance is not None:
+                    maintenance.wait(config)
 
-                # Invoca o graph com a configuração de thread
-                # O checkpoint mantém todo o histórico automaticamente
-                response_state = graph.invoke(input_state, config=config)
+                thread_id = config["configurable"]["thread_id"]
+                if STREAM_RESPONSES:
+                    # Tokens impressos à medida que chegam; o checkpoint é
+                    # gravado ao fim do turno, como no invoke
+                    print("\n🤖 Assistente:")
+                    with profiled(profiler, thread_id):
+                        response_state = stream_response(graph, input_state, config)
+                    message_count = len(response_state["messages"])
+                else:
+                    # Invoca o graph com a configuração de thread
+                    # O checkpoint mantém todo o histórico automaticamente
+                    with profiled(profiler, thread_id):
+                        response_state = graph.invoke(input_state, config=config)
 
-                # Imprime apenas as mensagens novas (evita duplicação):
-                print("\n🤖 Assistente:")
-                message_count = print_new_messages(message_count, response_state)
+                    # Imprime apenas as mensagens novas (evita duplicação):
+                    print("\n🤖 Assistente:")
+                    message_count = print_new_messages(message_count, response_state)
+
+                # Recorte/resumo depois que a resposta já foi exibida
+                if maintenance is not None:
+                    maintenance.schedule(config)
+
+                # Métricas do processo até aqui (METRICS=1 e METRICS_FILE)
+                write_metrics_file()
 
             except Exception as e:
                 print(f"\n❌ Erro ao processar mensagem: {e}")
@@ -278,11 +1015,60 @@ def chat_interativo():
 
     # Fecha a conexão ao terminar:
     try:
-        conn.close()
+        for worker in retention:
+            worker.stop()
+        if maintenance is not None:
+            maintenance.shutdown()
+        if usage_ledger is not None:
+            usage_ledger.close()
+        for c in conns:
+            c.close()
     except Exception:
         pass
 
 
+# Nomes que eram globais do módulo e agora saem das fábricas no primeiro acesso
+_LAZY_GLOBALS = {
+    **dict.fromkeys(
+        (
+            "llm",
+            "groq_limiter",
+            "chat_hedger",
+            "chat_router",
+            "response_cache",
+            "chat_llm_groq",
+            "llm_model",
+            "summary_model",
+        ),
+        llm_components,
+    ),
+    **dict.fromkeys(
+        (
+            "conns",
+            "conn",
+            "serde",
+            "saver_class",
+            "savers",
+            "memory",
+            "usage_ledger",
+            "graph_builder",
+            "graph",
+            "maintenance",
+        ),
+        runtime_components,
+    ),
+}
+
+
+def __getattr__(nome: str):
+    """`chatbot.graph`, `chatbot.llm`... construídos só quando acessados (PEP 562)."""
+    if nome == "GROQ_API_KEY":
+        return groq_api_key()
+    if nome in _LAZY_GLOBALS:
+        return _LAZY_GLOBALS[nome]()[nome]
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
+
 # Executa o chat interativo:
 if __name__ == "__main__":
     chat_interativo()
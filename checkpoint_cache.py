@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script checkpoint_cache.py
+==========================
+Cache LRU, em memória, do último checkpoint de cada thread.
+
+Todo `graph.invoke` começa lendo o checkpoint mais recente da thread no
+SQLite e desserializando a lista inteira de mensagens. O
+CachedCheckpointSaver embrulha qualquer checkpointer (SqliteSaver,
+DedupSqliteSaver, AsyncSqliteSaver, ...) e guarda, já desserializado, o
+último checkpoint das threads ativas:
+
+- escrita "write-through": `put` grava no SQLite e depois atualiza o cache;
+- leitura do último checkpoint (sem `checkpoint_id`) sai do cache;
+- despejo LRU por número de entradas e por bytes aproximados;
+- contadores de acertos/faltas em `stats()`.
+
+O cache supõe que só este processo escreve nessas threads (é o caso do
+chatbot e do motor assíncrono). A retenção pode rodar em paralelo, porque
+nunca apaga o checkpoint mais recente. Quem lê recebe listas novas, mas
+os objetos de mensagem são os mesmos do cache: não os altere no lugar.
+Por isso o cache é opcional (desligado por padrão).
+
+Configuração por variáveis de ambiente (usadas por `cached_saver`):
+  CHECKPOINT_CACHE_ENTRIES=128   (padrão: 0, sem cache)
+  CHECKPOINT_CACHE_MB=64
+
+Exemplo
+-------
+memory = CachedCheckpointSaver(SqliteSaver(conn), max_entries=128)
+graph = build_graph(memory)
+print(memory.stats())
+"""
+import copy
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+
+# Bytes estimados por mensagem além do texto (ids, tipo, metadados)
+MESSAGE_OVERHEAD = 256
+
+
+def approximate_size(value: Any) -> int:
+    """Tamanho aproximado, em bytes, dos valores de um checkpoint."""
+    if isinstance(value, BaseMessage):
+        return approximate_size(value.content) + MESSAGE_OVERHEAD
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(approximate_size(k) + approximate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(approximate_size(v) for v in value)
+    return 16
+
+
+def _copy(checkpoint: Checkpoint) -> Checkpoint:
+    """
+    Cópia dos dicts e das listas (ex.: `messages`): quem recebe pode trocar
+    ou acrescentar valores sem afetar o cache. As mensagens não são copiadas.
+    """
+    return {
+        **checkpoint,
+        "channel_values": {
+            k: list(v) if isinstance(v, list) else v
+            for k, v in checkpoint["channel_values"].items()
+        },
+        "channel_versions": dict(checkpoint["channel_versions"]),
+        "versions_seen": {k: dict(v) for k, v in checkpoint["versions_seen"].items()},
+    }
+
+
+class CachedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Checkpointer com cache LRU do último checkpoint de cada thread.
+
+    Args:
+        saver: Checkpointer que persiste de fato (ex.: SqliteSaver)
+        max_entries: Máximo de threads (thread_id, checkpoint_ns) em cache
+        max_bytes: Limite aproximado de memória ocupada pelo cache
+    """
+
+    def __init__(
+        self,
+        saver: BaseCheckpointSaver,
+        max_entries: int = 128,
+        max_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[CheckpointTuple, int]]" = OrderedDict()
+        # Contadores num dict para serem compartilhados com os clones de
+        # `with_allowlist`
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "bytes": 0}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------ cache
+    @staticmethod
+    def _key(config: RunnableConfig) -> tuple:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    def _lookup(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        checkpoint_id = get_checkpoint_id(config)
+        with self._lock:
+            entrada = self._entries.get(self._key(config))
+            if entrada is not None and checkpoint_id in (
+                None,
+                entrada[0].checkpoint["id"],
+            ):
+                self._entries.move_to_end(self._key(config))
+                self._counters["hits"] += 1
+                tupla = entrada[0]
+                return tupla._replace(checkpoint=_copy(tupla.checkpoint))
+            self._counters["misses"] += 1
+            return None
+
+    def _store(self, tupla: CheckpointTuple) -> None:
+        key = self._key(tupla.config)
+        tamanho = approximate_size(tupla.checkpoint["channel_values"])
+        with self._lock:
+            antiga = self._entries.pop(key, None)
+            if antiga is not None:
+                self._counters["bytes"] -= antiga[1]
+            if tamanho > self.max_bytes or self.max_entries <= 0:
+                return  # Não cabe: fica só no SQLite
+            self._entries[key] = (tupla, tamanho)
+            self._counters["bytes"] += tamanho
+            while (
+                len(self._entries) > self.max_entries
+                or self._counters["bytes"] > self.max_bytes
+            ):
+                _, (_, liberado) = self._entries.popitem(last=False)
+                self._counters["bytes"] -= liberado
+                self._counters["evictions"] += 1
+
+    def _invalidate(self, config: RunnableConfig) -> None:
+        """Descarta a entrada se ela for o checkpoint de `config`."""
+        with self._lock:
+            entrada = self._entries.get(self._key(config))
+            if entrada is not None and entrada[0].checkpoint["id"] == get_checkpoint_id(
+                config
+            ):
+                del self._entries[self._key(config)]
+                self._counters["bytes"] -= entrada[1]
+
+    def _forget_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == str(thread_id)]:
+                self._counters["bytes"] -= self._entries.pop(key)[1]
+
+    def _saved(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        next_config: RunnableConfig,
+    ) -> None:
+        """Atualiza o cache com o checkpoint que acabou de ser gravado."""
+        parent_id = config["configurable"].get("checkpoint_id")
+        parent_config = (
+            {
+                "configurable": {
+                    **next_config["configurable"],
+                    "checkpoint_id": parent_id,
+                }
+            }
+            if parent_id
+            else None
+        )
+        # Mesmo formato que a leitura do SQLite devolveria
+        metadata = json.loads(json.dumps(get_checkpoint_metadata(config, metadata)))
+        self._store(
+            CheckpointTuple(next_config, _copy(checkpoint), metadata, parent_config, [])
+        )
+
+    def stats(self) -> dict:
+        """Acertos, faltas e ocupação do cache."""
+        with self._lock:
+            hits, misses = self._counters["hits"], self._counters["misses"]
+            return {
+                "hits": hits,
+                "misses": misses,
+                "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+                "evictions": self._counters["evictions"],
+                "entries": len(self._entries),
+                "approx_bytes": self._counters["bytes"],
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._counters["bytes"] = 0
+
+    # ------------------------------------------------------------------ síncrono
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        tupla = self._lookup(config)
+        if tupla is not None:
+            return tupla
+        tupla = self.saver.get_tuple(config)
+        if tupla is not None and get_checkpoint_id(config) is None:
+            self._store(tupla)
+        return tupla
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._saved(config, checkpoint, metadata, next_config)
+        return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.saver.put_writes(config, writes, task_id, task_path)
+        # Writes pendentes mudam o CheckpointTuple; a próxima leitura vai ao banco
+        self._invalidate(config)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+        self._forget_thread(thread_id)
+
+    # ------------------------------------------------------------------ assíncrono
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        tupla = self._lookup(config)
+        if tupla is not None:
+            return tupla
+        tupla = await self.saver.aget_tuple(config)
+        if tupla is not None and get_checkpoint_id(config) is None:
+            self._store(tupla)
+        return tupla
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for tupla in self.saver.alist(
+            config, filter=filter, before=before, limit=limit
+        ):
+            yield tupla
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        self._saved(config, checkpoint, metadata, next_config)
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self.saver.aput_writes(config, writes, task_id, task_path)
+        self._invalidate(config)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.saver.adelete_thread(thread_id)
+        self._forget_thread(thread_id)
+
+    # ------------------------------------------------------------------ delegação
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.saver.get_next_version(current, channel)
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def with_allowlist(self, extra_allowlist) -> "CachedCheckpointSaver":
+        saver = self.saver.with_allowlist(extra_allowlist)
+        if saver is self.saver:
+            return self
+        # O clone (cópia rasa) compartilha as entradas e os contadores
+        clone = copy.copy(self)
+        clone.saver, clone.serde = saver, saver.serde
+        return clone
+
+
+def cached_saver(
+    saver: BaseCheckpointSaver,
+    max_entries: Optional[int] = None,
+    max_mb: Optional[float] = None,
+) -> BaseCheckpointSaver:
+    """
+    Embrulha `saver` no cache, com limites lidos do ambiente se ausentes.
+
+    Com CHECKPOINT_CACHE_ENTRIES=0 (o padrão) devolve o próprio `saver`.
+    """
+    if max_entries is None:
+        max_entries = int(os.getenv("CHECKPOINT_CACHE_ENTRIES", "0"))
+    if max_mb is None:
+        max_mb = float(os.getenv("CHECKPOINT_CACHE_MB", "64"))
+    if max_entries <= 0:
+        return saver
+    return CachedCheckpointSaver(saver, max_entries, int(max_mb * 1024 * 1024))
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script checkpoint_retention.py
+==============================
+Política de retenção e compactação para o `chatbot_memory.db`.
+
+Cada turno grava checkpoints completos que nunca são apagados. Aqui
+definimos, por thread, quantos checkpoints manter ("últimos N") e/ou por
+quanto tempo ("mais novos que T horas"). A poda apaga os checkpoints
+antigos e as linhas de `writes` correspondentes, em lotes pequenos, e
+depois devolve o espaço ao sistema com `PRAGMA incremental_vacuum`, sem
+travar o banco como um VACUUM completo.
+
+O checkpoint mais recente de cada thread NUNCA é apagado, então o
+`graph.get_state` continua vendo a conversa atual.
+
+Política (JSON, "*" é o padrão para as threads não listadas):
+{
+    "*": {"keep_last": 20},
+    "usuario_1": {"keep_last": 100, "max_age_hours": 72}
+}
+
+Run
+---
+uv run checkpoint_retention.py --keep-last 20
+uv run checkpoint_retention.py --policy retention_policy.json --loop 60
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from storage_profiles import connect
+
+# Época do UUID (15/10/1582) em unidades de 100 ns, relativa à época Unix
+_UUID_EPOCH_OFFSET = 0x01B21DD213814000
+
+# Quantos checkpoints apagar por transação (mantém o lock de escrita curto
+# enquanto o chatbot está rodando)
+DELETE_BATCH_SIZE = 200
+
+# Páginas liberadas por chamada de incremental_vacuum
+VACUUM_PAGES = 1000
+
+
+def checkpoint_timestamp(checkpoint_id: str) -> float:
+    """
+    Instante (epoch Unix, segundos) em que o checkpoint foi criado.
+
+    Os ids de checkpoint do LangGraph são UUID v6, que carregam o horário
+    de criação, então não é preciso desserializar o checkpoint.
+    """
+    h = uuid.UUID(checkpoint_id).hex
+    ticks = int(h[0:12] + h[13:16], 16)
+    return (ticks - _UUID_EPOCH_OFFSET) / 1e7
+
+
+def policy_for(policies: Dict[str, dict], thread_id: str) -> dict:
+    """Política da thread (ou a padrão "*"; {} significa manter tudo)."""
+    return policies.get(thread_id, policies.get("*", {}))
+
+
+def checkpoints_to_prune(
+    conn: sqlite3.Connection,
+    thread_id: str,
+    keep_last: Optional[int] = None,
+    max_age_hours: Optional[float] = None,
+    now: Optional[float] = None,
+) -> List[tuple]:
+    """
+    (checkpoint_ns, checkpoint_id) que a política manda apagar numa thread.
+
+    Um checkpoint é mantido se estiver entre os `keep_last` mais recentes E
+    for mais novo que `max_age_hours` (limites ausentes não se aplicam). O
+    mais recente de cada namespace é sempre mantido.
+    """
+    if keep_last is None and max_age_hours is None:
+        return []
+
+    cutoff = None
+    if max_age_hours is not None:
+        cutoff = (now if now is not None else time.time()) - max_age_hours * 3600
+
+    rows = conn.execute(
+        "SELECT checkpoint_ns, checkpoint_id FROM checkpoints "
+        "WHERE thread_id = ? ORDER BY checkpoint_ns, checkpoint_id DESC",
+        (thread_id,),
+    ).fetchall()
+
+    prune = []
+    posicao = 0
+    namespace = None
+    for checkpoint_ns, checkpoint_id in rows:
+        if checkpoint_ns != namespace:
+            namespace, posicao = checkpoint_ns, 0
+        else:
+            posicao += 1
+        if posicao == 0:
+            continue  # O mais recente fica sempre
+        if keep_last is not None and posicao >= keep_last:
+            prune.append((checkpoint_ns, checkpoint_id))
+        elif cutoff is not None and checkpoint_timestamp(checkpoint_id) < cutoff:
+            prune.append((checkpoint_ns, checkpoint_id))
+    return prune
+
+
+def prune_thread(
+    conn: sqlite3.Connection,
+    thread_id: str,
+    keep_last: Optional[int] = None,
+    max_age_hours: Optional[float] = None,
+) -> int:
+    """
+    Apaga os checkpoints (e seus writes) fora da política de uma thread.
+
+    Returns:
+        Número de checkpoints apagados
+    """
+    prune = checkpoints_to_prune(conn, thread_id, keep_last, max_age_hours)
+
+    for inicio in range(0, len(prune), DELETE_BATCH_SIZE):
+        lote = [
+            (thread_id, ns, cp_id)
+            for ns, cp_id in prune[inicio : inicio + DELETE_BATCH_SIZE]
+        ]
+        with conn:  # Uma transação curta por lote
+            conn.executemany(
+                "DELETE FROM writes "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                lote,
+            )
+            conn.executemany(
+                "DELETE FROM checkpoints "
+                "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                lote,
+            )
+    return len(prune)
+
+
+def _banco_vazio(conn: sqlite3.Connection) -> bool:
+    """Nenhuma linha em nenhuma tabela (arquivo novo ou recém-criado)."""
+    tabelas = [
+        t
+        for (t,) in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%'"
+        )
+    ]
+    return not any(
+        conn.execute(f'SELECT 1 FROM "{t}" LIMIT 1').fetchone() for t in tabelas
+    )
+
+
+def enable_incremental_vacuum(
+    conn: sqlite3.Connection, allow_vacuum: bool = False
+) -> bool:
+    """
+    Liga `auto_vacuum=INCREMENTAL` no banco (uma única vez).
+
+    Bancos criados sem essa opção precisam de um VACUUM completo para que
+    ela passe a valer. O VACUUM reescreve o arquivo inteiro e trava as
+    escritas enquanto isso, então só roda num banco vazio ou com
+    `allow_vacuum=True` (a linha de comando); o RetentionWorker do chatbot
+    nunca o executa.
+
+    Returns:
+        True se o banco está (agora) em auto_vacuum=INCREMENTAL
+    """
+    (modo,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+    if modo == 2:  # 0 = NONE, 1 = FULL, 2 = INCREMENTAL
+        return True
+    if not (allow_vacuum or _banco_vazio(conn)):
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def incremental_vacuum(conn: sqlite3.Connection, pages: int = VACUUM_PAGES) -> int:
+    """
+    Devolve ao sistema até `pages` páginas livres do arquivo.
+
+    Returns:
+        Páginas livres restantes
+    """
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    (livres,) = conn.execute("PRAGMA freelist_count").fetchone()
+    return livres
+
+
+def apply_retention(conn: sqlite3.Connection, policies: Dict[str, dict]) -> dict:
+    """
+    Aplica a política em todas as threads e compacta o arquivo.
+
+    Args:
+        conn: Conexão com o banco de checkpoints
+        policies: Política por thread_id ("*" = padrão)
+
+    Returns:
+        {thread_id: checkpoints apagados} das threads que foram podadas
+    """
+    existe = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoints'"
+    ).fetchone()
+    if not existe:  # Banco novo: o chatbot ainda não gravou nada
+        return {}
+
+    threads = [t for (t,) in conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+    dedup = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'message_blobs'"
+    ).fetchone()
+
+    apagados = {}
+    for thread_id in threads:
+        policy = policy_for(policies, thread_id)
+        n = prune_thread(
+            conn, thread_id, policy.get("keep_last"), policy.get("max_age_hours")
+        )
+        if n:
+            apagados[thread_id] = n
+            if dedup:
+                # Mensagens deduplicadas que só os checkpoints podados usavam
+                from message_dedup_saver import collect_unreferenced_messages
+
+                collect_unreferenced_messages(conn, thread_id)
+
+    if apagados:
+        # Libera as páginas em pedaços até a freelist zerar (ou parar de cair,
+        # caso o banco ainda não esteja em auto_vacuum=INCREMENTAL)
+        livres = None
+        while True:
+            restantes = incremental_vacuum(conn)
+            if restantes == 0 or restantes == livres:
+                break
+            livres = restantes
+    return apagados
+
+
+class RetentionWorker:
+    """
+    Aplica a política periodicamente numa thread em segundo plano.
+
+    Usa uma conexão própria, então pode rodar com o chatbot ativo (no modo
+    WAL as leituras do chatbot não são bloqueadas; as escritas esperam no
+    máximo um lote de DELETE_BATCH_SIZE checkpoints).
+
+    Args:
+        db_path: Arquivo do banco de checkpoints
+        policies: Política por thread_id ("*" = padrão)
+        interval: Segundos entre duas passadas
+        allow_vacuum: Permite o VACUUM completo que liga auto_vacuum=INCREMENTAL
+            num banco que já tem dados (só a linha de comando usa)
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        policies: Dict[str, dict],
+        interval: float = 60.0,
+        allow_vacuum: bool = False,
+    ):
+        self.db_path = db_path
+        self.policies = policies
+        self.interval = interval
+        self.allow_vacuum = allow_vacuum
+        self._avisado = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def run_once(self) -> dict:
+        conn = connect(self.db_path, timeout=30.0)  # Perfil de SQLITE_PROFILE
+        try:
+            if not enable_incremental_vacuum(conn, self.allow_vacuum):
+                if not self._avisado:
+                    # A poda continua; só o espaço não volta ao sistema
+                    print(
+                        f"⚠️  {self.db_path} sem auto_vacuum=INCREMENTAL: rode "
+                        "`uv run checkpoint_retention.py` uma vez (com o chatbot "
+                        "parado) para converter o banco"
+                    )
+                    self._avisado = True
+            return apply_retention(conn, self.policies)
+        finally:
+            conn.close()
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                # Uma passada que falha não derruba a thread: tenta de novo
+                # no próximo intervalo
+                print(f"[ERRO] RetentionWorker: {e!r}")
+            self._stop.wait(self.interval)
+
+    def start(self) -> "RetentionWorker":
+        self._thread = threading.Thread(
+            target=self._loop, name="checkpoint-retention", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def load_policies(
+    policy_path: Optional[str] = None,
+    keep_last: Optional[int] = None,
+    max_age_hours: Optional[float] = None,
+) -> Dict[str, dict]:
+    """Política a partir de um arquivo JSON e/ou dos limites padrão."""
+    policies: Dict[str, dict] = {}
+    if policy_path:
+        with open(policy_path) as f:
+            policies = json.load(f)
+    padrao = dict(policies.get("*", {}))
+    if keep_last is not None:
+        padrao["keep_last"] = keep_last
+    if max_age_hours is not None:
+        padrao["max_age_hours"] = max_age_hours
+    if padrao:
+        policies["*"] = padrao
+    return policies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Retenção de checkpoints")
+    parser.add_argument("--db", default="chatbot_memory.db")
+    parser.add_argument("--policy", help="Arquivo JSON com a política por thread")
+    parser.add_argument("--keep-last", type=int)
+    parser.add_argument("--max-age-hours", type=float)
+    parser.add_argument(
+        "--loop", type=float, help="Repete a cada N segundos (Ctrl+C para parar)"
+    )
+    args = parser.parse_args()
+
+    policies = load_policies(args.policy, args.keep_last, args.max_age_hours)
+    if not policies:
+        print("⚠️  Informe --keep-last, --max-age-hours ou --policy.")
+        raise SystemExit(1)
+
+    # Pela linha de comando a conversão para auto_vacuum=INCREMENTAL (VACUUM
+    # completo) é permitida: rode com o chatbot parado
+    worker = RetentionWorker(args.db, policies, args.loop or 0, allow_vacuum=True)
+    try:
+        while True:
+            antes = os.path.getsize(args.db) / 1024
+            apagados = worker.run_once()
+            depois = os.path.getsize(args.db) / 1024
+            print(
+                f"🧹 {sum(apagados.values())} checkpoints apagados em "
+                f"{len(apagados)} threads | arquivo: {antes:.1f} KB → {depois:.1f} KB"
+            )
+            if not args.loop:
+                break
+            time.sleep(args.loop)
+    except KeyboardInterrupt:
+        print("\n👋 Interrompido pelo usuário.")
@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script compressed_serializer.py
+===============================
+Serialização comprimida para os blobs de `checkpoints` e `writes`.
+
+Em conversas longas os checkpoints são, na maior parte, texto em
+linguagem natural repetido. Aqui o serializador padrão do LangGraph
+(JsonPlusSerializer/msgpack) é embrulhado no `EncryptedSerializer` do
+próprio LangGraph, com uma "cifra" que apenas comprime (zlib ou lzma da
+biblioteca padrão). O algoritmo fica registrado na coluna `type`
+(ex.: "msgpack+zlib"), então:
+
+- linhas antigas, sem sufixo, continuam legíveis;
+- o mesmo banco pode misturar linhas comprimidas e não comprimidas.
+
+Opcionalmente, o zlib usa um dicionário treinado a partir de checkpoints
+existentes (`--train`), o que ajuda muito nos blobs pequenos (writes).
+
+Configuração por variáveis de ambiente:
+  CHECKPOINT_COMPRESSION=none|zlib|lzma   (padrão: none)
+  CHECKPOINT_COMPRESSION_LEVEL=6
+  CHECKPOINT_ZDICT=checkpoint.zdict      (dicionário do zlib, opcional)
+
+Run
+---
+uv run compressed_serializer.py --train chatbot_memory.db --out checkpoint.zdict
+"""
+import argparse
+import lzma
+import os
+import re
+import sqlite3
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from langgraph.checkpoint.serde.base import CipherProtocol
+from langgraph.checkpoint.serde.encrypted import EncryptedSerializer
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from metrics import count_bytes
+
+ALGORITHMS = ("none", "zlib", "lzma")
+
+# Blobs menores que isso não compensam o custo de comprimir
+MIN_COMPRESS_SIZE = 128
+
+# Tamanho máximo útil de um dicionário do zlib (janela de 32 KB)
+ZDICT_SIZE = 32 * 1024
+
+
+def dictionary_id(zdict: bytes) -> str:
+    """Identificador curto do dicionário, gravado junto com cada linha."""
+    return f"{zlib.crc32(zdict):08x}"
+
+
+class CompressionCipher(CipherProtocol):
+    """
+    "Cifra" do EncryptedSerializer que comprime em vez de criptografar.
+
+    Nomes gravados na coluna `type` (depois do "+"):
+      raw          → não comprimido (blob pequeno ou algorithm="none"; o
+                     CompressedSerializer grava esses blobs sem sufixo)
+      zlib / lzma  → comprimido com o algoritmo
+      zlibd-<id>   → zlib com o dicionário <id>
+
+    Args:
+        algorithm: "none", "zlib" ou "lzma"
+        level: Nível de compressão (zlib 1-9, lzma 0-9)
+        zdict: Dicionário treinado para o zlib (opcional)
+        min_size: Blobs menores são gravados sem compressão
+    """
+
+    def __init__(
+        self,
+        algorithm: str = "zlib",
+        level: int = 6,
+        zdict: Optional[bytes] = None,
+        min_size: int = MIN_COMPRESS_SIZE,
+    ):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Algoritmo de compressão inválido: {algorithm}")
+        self.algorithm = algorithm
+        self.level = level
+        self.zdict = zdict
+        self.min_size = min_size
+        self._dictionaries: Dict[str, bytes] = {}
+        if zdict:
+            self._dictionaries[dictionary_id(zdict)] = zdict
+
+    def encrypt(self, plaintext: bytes) -> tuple:
+        if self.algorithm == "none" or len(plaintext) < self.min_size:
+            return "raw", plaintext
+        if self.algorithm == "lzma":
+            return "lzma", lzma.compress(plaintext, preset=self.level)
+        if self.zdict:
+            comp = zlib.compressobj(self.level, zdict=self.zdict)
+            dados = comp.compress(plaintext) + comp.flush()
+            return f"zlibd-{dictionary_id(self.zdict)}", dados
+        return "zlib", zlib.compress(plaintext, self.level)
+
+    def decrypt(self, ciphername: str, ciphertext: bytes) -> bytes:
+        if ciphername == "raw":
+            return ciphertext
+        if ciphername == "zlib":
+            return zlib.decompress(ciphertext)
+        if ciphername == "lzma":
+            return lzma.decompress(ciphertext)
+        if ciphername.startswith("zlibd-"):
+            zdict = self._dictionaries.get(ciphername[len("zlibd-") :])
+            if zdict is None:
+                raise ValueError(
+                    f"Linha comprimida com o dicionário '{ciphername}', que não "
+                    "foi carregado. Defina CHECKPOINT_ZDICT com o arquivo certo."
+                )
+            decomp = zlib.decompressobj(zdict=zdict)
+            return decomp.decompress(ciphertext) + decomp.flush()
+        raise ValueError(f"Compressão desconhecida: {ciphername}")
+
+
+class CompressedSerializer(EncryptedSerializer):
+    """
+    EncryptedSerializer com CompressionCipher.
+
+    Blobs que não foram comprimidos são gravados exatamente como o
+    serializador padrão faria (sem sufixo na coluna `type`), então o banco
+    continua legível por um SqliteSaver comum enquanto a compressão estiver
+    desligada.
+    """
+
+    def dumps_typed(self, obj: Any) -> tuple:
+        typ, data = self.serde.dumps_typed(obj)
+        ciphername, dados = self.cipher.encrypt(data)
+        if ciphername == "raw":
+            count_bytes(len(data))
+            return typ, data
+        count_bytes(len(dados))
+        return f"{typ}+{ciphername}", dados
+
+    def loads_typed(self, data: tuple) -> Any:
+        count_bytes(len(data[1]) if data[1] else 0)
+        return super().loads_typed(data)
+
+
+def make_serializer(
+    algorithm: Optional[str] = None,
+    level: Optional[int] = None,
+    zdict_path: Optional[str] = None,
+) -> CompressedSerializer:
+    """
+    Serializador comprimido para usar em `SqliteSaver(conn, serde=...)`.
+
+    Parâmetros ausentes são lidos das variáveis de ambiente. Mesmo com
+    algorithm="none" o serializador lê linhas comprimidas (e as antigas).
+    """
+    algorithm = algorithm or os.getenv("CHECKPOINT_COMPRESSION", "none")
+    if level is None:
+        level = int(os.getenv("CHECKPOINT_COMPRESSION_LEVEL", "6"))
+    zdict_path = zdict_path or os.getenv("CHECKPOINT_ZDICT")
+
+    zdict = None
+    if zdict_path:
+        with open(zdict_path, "rb") as f:
+            zdict = f.read()
+
+    return CompressedSerializer(
+        CompressionCipher(algorithm, level, zdict), JsonPlusSerializer()
+    )
+
+
+def train_dictionary(samples: List[bytes], size: int = ZDICT_SIZE) -> bytes:
+    """
+    Monta um dicionário do zlib com os trechos mais frequentes das amostras.
+
+    Heurística simples: conta palavras e sequências de bytes recorrentes,
+    escolhe as que mais economizam (frequência × tamanho) e as coloca em
+    ordem crescente de frequência, porque o zlib alcança melhor o final
+    do dicionário.
+    """
+    contagem: Counter = Counter()
+    for amostra in samples:
+        for trecho in set(re.findall(rb"[\w\-.,:;!?' ]{4,64}", amostra)):
+            contagem[trecho] += 1
+
+    candidatos = sorted(
+        (t for t, n in contagem.items() if n > 1),
+        key=lambda t: contagem[t] * len(t),
+        reverse=True,
+    )
+
+    escolhidos, total = [], 0
+    for trecho in candidatos:
+        if total + len(trecho) > size:
+            continue
+        escolhidos.append(trecho)
+        total += len(trecho)
+
+    escolhidos.sort(key=lambda t: contagem[t])
+    return b"".join(escolhidos)
+
+
+def raw_samples(db_path: str, limit: int = 500) -> List[bytes]:
+    """Blobs (descomprimidos) de checkpoints e writes para o treino."""
+    cipher = CompressionCipher("none")
+    conn = sqlite3.connect(db_path)
+    linhas = conn.execute(
+        "SELECT type, checkpoint FROM checkpoints ORDER BY checkpoint_id DESC LIMIT ?",
+        (limit,),
+    ).fetchall()
+    linhas += conn.execute(
+        "SELECT type, value FROM writes ORDER BY checkpoint_id DESC LIMIT ?", (limit,)
+    ).fetchall()
+    conn.close()
+
+    amostras = []
+    for tipo, dados in linhas:
+        if not dados:
+            continue
+        if tipo and "+" in tipo:
+            try:
+                dados = cipher.decrypt(tipo.split("+", 1)[1], dados)
+            except ValueError:
+                continue  # Comprimido com outro dicionário
+        amostras.append(dados)
+    return amostras
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Dicionário de compressão")
+    parser.add_argument("--train", required=True, help="Banco usado como amostra")
+    parser.add_argument("--out", default="checkpoint.zdict")
+    parser.add_argument("--size", type=int, default=ZDICT_SIZE)
+    args = parser.parse_args()
+
+    amostras = raw_samples(args.train)
+    if not amostras:
+        print("⚠️  Nenhum checkpoint encontrado para treinar o dicionário.")
+        raise SystemExit(1)
+
+    zdict = train_dictionary(amostras, args.size)
+    with open(args.out, "wb") as f:
+        f.write(zdict)
+    print(
+        f"✅ Dicionário {dictionary_id(zdict)} ({len(zdict)} bytes, "
+        f"{len(amostras)} amostras) salvo em '{args.out}'"
+    )
+    print(f"   Use: CHECKPOINT_COMPRESSION=zlib CHECKPOINT_ZDICT={args.out}")
@@ -0,0 +1,415 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script group_commit_saver.py
+============================
+"Group commit" das escritas de checkpoints entre sessões concorrentes.
+
+No SqliteSaver cada `put`/`put_writes` é uma transação com seu próprio
+COMMIT (e fsync). Aqui as escritas continuam sendo executadas na hora,
+mas o COMMIT é compartilhado: a primeira escrita de um lote vira a
+"líder", espera até `window` segundos (ou até o lote ter `max_batch`
+escritas) e faz um único COMMIT para todas. Cada chamada só retorna
+depois do COMMIT do seu lote, então o graph vê exatamente o mesmo
+comportamento de antes: quando `put` retorna, o checkpoint está no disco
+(com a durabilidade do perfil em uso, ver storage_profiles.py).
+
+Se o COMMIT falhar, o lote inteiro é desfeito e todas as chamadas do
+lote recebem a exceção. O mesmo vale, no SqliteSaver, para uma escrita
+que falha no meio do lote: a transação compartilhada já tem parte dela,
+então o lote é desfeito e ninguém fica esperando um COMMIT que não vem.
+
+Configuração por variáveis de ambiente:
+  CHECKPOINT_GROUP_COMMIT=1          (padrão: 0, um COMMIT por escrita)
+  CHECKPOINT_GROUP_COMMIT_MS=2       (janela de espera da líder)
+  CHECKPOINT_GROUP_COMMIT_MAX=64     (máximo de escritas por COMMIT)
+
+Exemplo
+-------
+memory = GroupCommitSqliteSaver(conn, window=0.002, max_batch=64)
+graph = build_graph(memory)
+"""
+import asyncio
+import contextvars
+import os
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Iterator, Optional, Sequence, Tuple
+
+import aiosqlite
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from message_dedup_saver import DedupAsyncSqliteSaver, DedupSqliteSaver
+
+GROUP_COMMIT = os.getenv("CHECKPOINT_GROUP_COMMIT", "0") == "1"
+GROUP_COMMIT_WINDOW = float(os.getenv("CHECKPOINT_GROUP_COMMIT_MS", "2")) / 1000
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("CHECKPOINT_GROUP_COMMIT_MAX", "64"))
+
+
+class GroupCommit:
+    """
+    Lotes de COMMIT para uma conexão sqlite3 usada por várias threads.
+
+    Args:
+        conn: Conexão compartilhada
+        lock: Lock que protege a conexão (o mesmo do SqliteSaver)
+        window: Segundos que a líder espera por mais escritas
+        max_batch: Escritas que fecham o lote antes do fim da janela
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        lock: threading.Lock,
+        window: float = GROUP_COMMIT_WINDOW,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ):
+        self.conn = conn
+        self.lock = lock
+        self.window = window
+        self.max_batch = max_batch
+        self._novo_lote()
+        self.commits = 0
+        self.records = 0
+
+    def _novo_lote(self) -> None:
+        self._future: Future = Future()
+        self._fechado = threading.Event()
+        self._pendentes = 0
+
+    def enlist(self) -> Tuple[Future, Optional[threading.Event]]:
+        """
+        Registra uma escrita já executada (chamar com `lock` adquirido).
+
+        Returns:
+            Future do COMMIT do lote e, se esta for a líder, o evento que
+            avisa que o lote já foi fechado
+        """
+        lote = self._future, self._fechado if self._pendentes == 0 else None
+        self._pendentes += 1
+        self.records += 1
+        if self._pendentes >= self.max_batch:
+            self._commit()  # Lote cheio: fecha agora, sem esperar a janela
+        return lote
+
+    def wait(self, future: Future, fechado: Optional[threading.Event]) -> None:
+        """Espera o COMMIT do lote (a líder é quem o executa)."""
+        if fechado is not None:
+            fechado.wait(self.window)
+            with self.lock:
+                if self._future is future:
+                    self._commit()
+        future.result()
+
+    def _commit(self) -> None:
+        """COMMIT do lote aberto (chamar com `lock` adquirido)."""
+        try:
+            self.conn.commit()
+        except sqlite3.Error as e:
+            self.abort(e)
+            return
+        future, fechado = self._future, self._fechado
+        self._novo_lote()
+        self.commits += 1
+        future.set_result(None)
+        fechado.set()
+
+    def abort(self, erro: BaseException) -> None:
+        """
+        Desfaz o lote aberto e repassa `erro` a todas as escritas dele
+        (chamar com `lock` adquirido).
+        """
+        future, fechado = self._future, self._fechado
+        self._novo_lote()
+        self.conn.rollback()
+        future.set_exception(erro)
+        fechado.set()
+
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "records": self.records,
+            "mean_batch": self.records / self.commits if self.commits else 0.0,
+        }
+
+
+class GroupCommitMixin:
+    """Troca o COMMIT de cada `cursor()` de escrita pelo COMMIT do lote."""
+
+    def _init_group_commit(self, window: float, max_batch: int) -> None:
+        self.group_commit = GroupCommit(self.conn, self.lock, window, max_batch)
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        if not transaction:
+            with super().cursor(transaction=False) as cur:
+                yield cur
+            return
+        with self.lock:
+            self.setup()
+            cur = self.conn.cursor()
+            try:
+                yield cur
+            except BaseException as e:
+                # Parte da escrita já está na transação do lote: desfaz o
+                # lote inteiro e acorda a líder e as outras sessões com o erro
+                self.group_commit.abort(e)
+                raise
+            else:
+                lote = self.group_commit.enlist()
+            finally:
+                cur.close()
+        # Fora do lock: as outras sessões continuam escrevendo no mesmo lote
+        self.group_commit.wait(*lote)
+
+
+class GroupCommitSqliteSaver(GroupCommitMixin, SqliteSaver):
+    """
+    SqliteSaver com group commit.
+
+    Args:
+        conn: Conexão SQLite (check_same_thread=False)
+        window: Segundos que a primeira escrita do lote espera pelas outras
+        max_batch: Máximo de escritas por COMMIT
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        serde=None,
+        window: float = GROUP_COMMIT_WINDOW,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ) -> None:
+        super().__init__(conn, serde=serde)
+        self._init_group_commit(window, max_batch)
+
+
+class GroupCommitDedupSaver(GroupCommitMixin, DedupSqliteSaver):
+    """
+    DedupSqliteSaver com group commit (mesmos argumentos).
+
+    As mensagens e o checkpoint de um `put` entram no lote uma única vez.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        serde=None,
+        window: float = GROUP_COMMIT_WINDOW,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ) -> None:
+        super().__init__(conn, serde=serde)
+        self._init_group_commit(window, max_batch)
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        aberto = getattr(self._local, "cursor", None)
+        if aberto is not None:
+            yield aberto  # Dentro do `put`: o COMMIT é o do cursor externo
+            return
+        with super().cursor(transaction) as cur:
+            yield cur
+
+
+class AsyncGroupCommit:
+    """Versão do GroupCommit para uma conexão do aiosqlite."""
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        lock: asyncio.Lock,
+        window: float = GROUP_COMMIT_WINDOW,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ):
+        self.conn = conn
+        self.lock = lock
+        self.window = window
+        self.max_batch = max_batch
+        self._future: Optional[asyncio.Future] = None
+        self._fechado: Optional[asyncio.Event] = None
+        self._pendentes = 0
+        self.commits = 0
+        self.records = 0
+
+    async def enlist(self) -> Tuple[asyncio.Future, Optional[asyncio.Event]]:
+        """Registra uma escrita já executada (chamar com `lock` adquirido)."""
+        if self._future is None:
+            self._future = asyncio.get_running_loop().create_future()
+            self._fechado = asyncio.Event()
+            self._pendentes = 0
+        lote = self._future, self._fechado if self._pendentes == 0 else None
+        self._pendentes += 1
+        self.records += 1
+        if self._pendentes >= self.max_batch:
+            await self._commit()  # Lote cheio: fecha agora, sem esperar a janela
+        return lote
+
+    async def wait(
+        self, future: asyncio.Future, fechado: Optional[asyncio.Event]
+    ) -> None:
+        """Espera o COMMIT do lote (a líder é quem o executa)."""
+        if fechado is not None:
+            try:
+                await asyncio.wait_for(fechado.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+            async with self.lock:
+                if self._future is future:
+                    await self._commit()
+        await future
+
+    async def _commit(self) -> None:
+        """COMMIT do lote aberto (chamar com `lock` adquirido)."""
+        future, fechado = self._future, self._fechado
+        self._future = self._fechado = None
+        try:
+            await self.conn.commit()
+            self.commits += 1
+            future.set_result(None)
+        except sqlite3.Error as e:
+            await self.conn.rollback()
+            future.set_exception(e)
+        fechado.set()
+
+    def stats(self) -> dict:
+        return {
+            "commits": self.commits,
+            "records": self.records,
+            "mean_batch": self.records / self.commits if self.commits else 0.0,
+        }
+
+
+# Escritas (e callbacks pós-COMMIT) do `aput`/`aput_writes` em andamento
+# na task atual; None fora deles
+_LOTE: contextvars.ContextVar[Optional[Tuple[list, list]]] = contextvars.ContextVar(
+    "group_commit_lote", default=None
+)
+
+
+class _BatchedConnection:
+    """
+    Conexão do aiosqlite cujo `commit()`, dentro de `aput`/`aput_writes`,
+    só registra a escrita no lote aberto; o COMMIT de verdade é o do lote.
+
+    Fora deles (setup, adelete_thread) o `commit()` é o da conexão.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, group_commit: "AsyncGroupCommit"):
+        self._conn = conn
+        self._group_commit = group_commit
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self._conn, nome)
+
+    def __await__(self):
+        return self._conn.__await__()
+
+    async def commit(self) -> None:
+        lote = _LOTE.get()
+        if lote is None:
+            await self._conn.commit()
+            return
+        # Chamado pelo AsyncSqliteSaver com o lock adquirido, como pede o enlist
+        lote[0].append(await self._group_commit.enlist())
+
+
+class AsyncGroupCommitMixin:
+    """
+    Troca o COMMIT de `aput`/`aput_writes` do AsyncSqliteSaver pelo COMMIT
+    do lote. As consultas continuam sendo as da biblioteca.
+    """
+
+    def _init_group_commit(self, window: float, max_batch: int) -> None:
+        self.group_commit = AsyncGroupCommit(self.conn, self.lock, window, max_batch)
+        self.conn = _BatchedConnection(self.conn, self.group_commit)
+
+    @asynccontextmanager
+    async def _batched(self) -> AsyncIterator[None]:
+        lote = ([], [])  # (escritas registradas, callbacks pós-COMMIT)
+        token = _LOTE.set(lote)
+        try:
+            yield
+        finally:
+            _LOTE.reset(token)
+            # Fora do lock: as outras sessões continuam escrevendo no mesmo
+            # lote. Sempre espera, para a líder nunca abandonar um lote.
+            for pendente in lote[0]:
+                await self.group_commit.wait(*pendente)
+        for callback in lote[1]:
+            callback()
+
+    def _after_commit(self, callback) -> None:
+        """Roda `callback` depois que o COMMIT do lote atual der certo."""
+        lote = _LOTE.get()
+        if lote is None:
+            callback()
+        else:
+            lote[1].append(callback)
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        async with self._batched():
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        async with self._batched():
+            await super().aput_writes(config, writes, task_id, task_path)
+
+
+class AsyncGroupCommitSqliteSaver(AsyncGroupCommitMixin, AsyncSqliteSaver):
+    """
+    AsyncSqliteSaver com group commit (usado pelo AsyncChatEngine).
+
+    As consultas de `aput`/`aput_writes` são as do AsyncSqliteSaver; só o
+    COMMIT sai do lock e passa a ser compartilhado.
+    """
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        *,
+        serde=None,
+        window: float = GROUP_COMMIT_WINDOW,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ):
+        super().__init__(conn, serde=serde)
+        self._init_group_commit(window, max_batch)
+
+
+class AsyncGroupCommitDedupSaver(AsyncGroupCommitMixin, DedupAsyncSqliteSaver):
+    """
+    DedupAsyncSqliteSaver com group commit (mesmos argumentos).
+
+    As mensagens e o checkpoint de um `aput` entram no lote uma única vez, e
+    os hashes só viram "conhecidos" depois do COMMIT do lote.
+    """
+
+    def __init__(
+        self,
+        conn: aiosqlite.Connection,
+        *,
+        serde=None,
+        window: float = GROUP_COMMIT_WINDOW,
+        max_batch: int = GROUP_COMMIT_MAX_BATCH,
+    ):
+        super().__init__(conn, serde=serde)
+        self._init_group_commit(window, max_batch)
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script hedged_llm.py
+====================
+"Hedged requests" para cortar a cauda de latência do ChatNode.
+
+Uma resposta lenta do upstream segura o turno inteiro (até o timeout de
+30 s do ChatGroq). Com hedging, se a chamada ainda não respondeu depois
+do percentil `percentile` das latências recentes (p95 por padrão), uma
+cópia idêntica é enviada; a primeira resposta que chegar vence e a outra
+é cancelada.
+
+A carga extra é limitada: no máximo `max_extra` cópias por chamada
+(0.1 = até 10% a mais de requisições). Acima disso a chamada só espera.
+
+Streaming: a cópia é marcada com a tag `nostream` do LangGraph, então só
+a chamada original emite tokens. Depois que a original emite o primeiro
+token ela não é mais duplicada, e uma cópia já enviada só é usada se a
+original falhar (senão o stream mostraria o começo de uma resposta e,
+em seguida, a outra inteira). Se a cópia vencer antes disso, a resposta
+aparece inteira no fim do nó.
+
+No caminho síncrono (`invoke`) a chamada original roda numa thread
+própria e as cópias num pool de threads; a perdedora não pode ser
+interrompida: ela termina em segundo plano e o resultado é descartado
+(cópias perdedoras ocupando o pool nunca atrasam a chamada original).
+No assíncrono a task perdedora é cancelada de fato (e sai da fila do
+RateLimiter, se estiver nela).
+
+Configuração por variáveis de ambiente:
+  LLM_HEDGE=1                 (padrão: 0, sem cópias)
+  LLM_HEDGE_PERCENTILE=95     (percentil que dispara a cópia)
+  LLM_HEDGE_MAX_EXTRA=0.1     (cópias por chamada, no máximo)
+  LLM_HEDGE_INITIAL_MS=3000   (espera antes de haver amostras suficientes)
+
+Exemplo
+-------
+llm_model = prompt_template | hedged(llm, Hedger(percentile=95, max_extra=0.1))
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+from typing import Any, Optional
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langchain_core.runnables.config import merge_configs
+from langgraph.constants import TAG_NOSTREAM
+
+LLM_HEDGE = os.getenv("LLM_HEDGE", "0") == "1"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MAX_EXTRA = float(os.getenv("LLM_HEDGE_MAX_EXTRA", "0.1"))
+LLM_HEDGE_INITIAL_DELAY = float(os.getenv("LLM_HEDGE_INITIAL_MS", "3000")) / 1000
+
+
+def _sem_stream(config: Optional[RunnableConfig]) -> RunnableConfig:
+    """Config da cópia: igual à original, mas sem emitir tokens no stream."""
+    config = dict(config or {})
+    config["tags"] = [*config.get("tags", []), TAG_NOSTREAM]
+    return config
+
+
+class _PrimeiroToken(BaseCallbackHandler):
+    """Avisa quando a chamada original emite o primeiro token no stream."""
+
+    run_inline = True
+
+    def __init__(self) -> None:
+        self.emitiu = threading.Event()
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.emitiu.set()
+
+
+def _com_aviso(
+    config: Optional[RunnableConfig], aviso: _PrimeiroToken
+) -> RunnableConfig:
+    """Config da original, com o callback que detecta o primeiro token."""
+    return merge_configs(config, {"callbacks": [aviso]})
+
+
+def _viva(futura: Any) -> bool:
+    """A chamada ainda pode dar certo (em andamento ou já concluída sem erro)."""
+    return not futura.done() or futura.exception() is None
+
+
+class Hedger:
+    """
+    Decide quando duplicar uma chamada e guarda as latências observadas.
+
+    Args:
+        percentile: Percentil das latências recentes que dispara a cópia
+        max_extra: Cópias por chamada permitidas (limite de carga extra)
+        initial_delay: Espera antes da cópia enquanto há poucas amostras
+        min_samples: Amostras necessárias para usar o percentil
+        window: Quantas latências recentes entram no cálculo
+        max_workers: Threads das cópias no caminho síncrono
+    """
+
+    def __init__(
+        self,
+        percentile: float = LLM_HEDGE_PERCENTILE,
+        max_extra: float = LLM_HEDGE_MAX_EXTRA,
+        initial_delay: float = LLM_HEDGE_INITIAL_DELAY,
+        min_samples: int = 20,
+        window: int = 500,
+        max_workers: int = 32,
+    ) -> None:
+        self.percentile = percentile
+        self.max_extra = max_extra
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self._latencias: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.over_budget = 0
+
+    def delay(self) -> float:
+        """Segundos de espera antes de mandar a cópia."""
+        with self._lock:
+            if len(self._latencias) < self.min_samples:
+                return self.initial_delay
+            ordenadas = sorted(self._latencias)
+        indice = min(int(len(ordenadas) * self.percentile / 100), len(ordenadas) - 1)
+        return ordenadas[indice]
+
+    def _registrar(self, segundos: float) -> None:
+        with self._lock:
+            self._latencias.append(segundos)
+
+    def _contar_chamada(self) -> None:
+        with self._lock:
+            self.calls += 1
+
+    def _contar_vitoria(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def _pode_duplicar(self, aviso: _PrimeiroToken) -> bool:
+        if aviso.emitiu.is_set():
+            return False  # Já está no stream: uma cópia duplicaria a resposta
+        with self._lock:
+            if self.hedges + 1 > self.max_extra * self.calls:
+                self.over_budget += 1
+                return False
+            self.hedges += 1
+            return True
+
+    # ------------------------------------------------------------------ síncrono
+    def _submit(self, runnable: Runnable, input: Any, config: Any):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        self.max_workers, thread_name_prefix="hedge"
+                    )
+        contexto = contextvars.copy_context()
+        return self._executor.submit(contexto.run, runnable.invoke, input, config)
+
+    @staticmethod
+    def _thread(runnable: Runnable, input: Any, config: Any) -> Future:
+        """`runnable.invoke` numa thread própria (a original não espera o pool)."""
+        futura: Future = Future()
+        contexto = contextvars.copy_context()
+
+        def rodar() -> None:
+            if not futura.set_running_or_notify_cancel():
+                return
+            try:
+                futura.set_result(contexto.run(runnable.invoke, input, config))
+            except BaseException as e:
+                futura.set_exception(e)
+
+        threading.Thread(target=rodar, name="hedge-primary", daemon=True).start()
+        return futura
+
+    def call(
+        self, runnable: Runnable, input: Any, config: Optional[RunnableConfig] = None
+    ) -> Any:
+        """`runnable.invoke` com uma cópia se a resposta demorar."""
+        self._contar_chamada()
+        aviso = _PrimeiroToken()
+        inicio = time.monotonic()
+        primeira = self._thread(runnable, input, _com_aviso(config, aviso))
+        try:
+            result = primeira.result(timeout=self.delay())
+        except FutureTimeoutError:
+            pass
+        else:
+            self._registrar(time.monotonic() - inicio)
+            return result
+        if not self._pode_duplicar(aviso):
+            result = primeira.result()
+            self._registrar(time.monotonic() - inicio)
+            return result
+
+        inicios = {primeira: inicio}
+        copia = self._submit(runnable, input, _sem_stream(config))
+        inicios[copia] = time.monotonic()
+        pendentes, erro, reserva = set(inicios), None, None
+        while pendentes:
+            prontas, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+            for futura in prontas:
+                if futura.exception() is not None:
+                    erro = futura.exception()
+                elif futura is copia and aviso.emitiu.is_set() and _viva(primeira):
+                    reserva = futura  # A original já está no stream: vale a dela
+                else:
+                    for outra in pendentes:
+                        outra.cancel()  # Já em execução: termina e é descartada
+                    return self._vencedora(futura, copia, inicios)
+        if reserva is not None:
+            return self._vencedora(reserva, copia, inicios)
+        raise erro
+
+    def _vencedora(self, futura: Any, copia: Any, inicios: dict) -> Any:
+        """Registra a latência da chamada que venceu e devolve o resultado."""
+        self._registrar(time.monotonic() - inicios[futura])
+        if futura is copia:
+            self._contar_vitoria()
+        return futura.result()
+
+    # ------------------------------------------------------------------ assíncrono
+    async def acall(
+        self, runnable: Runnable, input: Any, config: Optional[RunnableConfig] = None
+    ) -> Any:
+        """Versão assíncrona de `call`; a perdedora é cancelada."""
+        self._contar_chamada()
+        aviso = _PrimeiroToken()
+        inicio = time.monotonic()
+        primeira = asyncio.ensure_future(
+            runnable.ainvoke(input, _com_aviso(config, aviso))
+        )
+        inicios = {primeira: inicio}
+        try:
+            prontas, _ = await asyncio.wait({primeira}, timeout=self.delay())
+            if prontas or not self._pode_duplicar(aviso):
+                result = await primeira
+                self._registrar(time.monotonic() - inicio)
+                return result
+
+            copia = asyncio.ensure_future(runnable.ainvoke(input, _sem_stream(config)))
+            inicios[copia] = time.monotonic()
+            pendentes, erro, reserva = set(inicios), None, None
+            while pendentes:
+                prontas, pendentes = await asyncio.wait(
+                    pendentes, return_when=asyncio.FIRST_COMPLETED
+                )
+                for tarefa in prontas:
+                    if tarefa.exception() is not None:
+                        erro = tarefa.exception()
+                    elif tarefa is copia and aviso.emitiu.is_set() and _viva(primeira):
+                        reserva = tarefa  # A original já está no stream
+                    else:
+                        return self._vencedora(tarefa, copia, inicios)
+            if reserva is not None:
+                return self._vencedora(reserva, copia, inicios)
+            raise erro
+        finally:
+            for tarefa in inicios:
+                if not tarefa.done():
+                    tarefa.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "over_budget": self.over_budget,
+            "extra_load": self.hedges / self.calls if self.calls else 0.0,
+            "delay_ms": 1000 * self.delay(),
+        }
+
+
+def hedged(runnable: Runnable, hedger: Hedger) -> Runnable:
+    """Envolve um modelo (ex.: ChatGroq) para usar hedging via `hedger`."""
+
+    def chamar(input: Any, config: RunnableConfig) -> Any:
+        return hedger.call(runnable, input, config)
+
+    async def achamar(input: Any, config: RunnableConfig) -> Any:
+        return await hedger.acall(runnable, input, config)
+
+    return RunnableLambda(chamar, afunc=achamar, name="hedged_llm")
@@ -0,0 +1,382 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script llm_rate_limiter.py
+==========================
+Agendador de chamadas ao LLM que respeita os limites da API (Groq).
+
+A Groq limita cada API key em requisições por minuto (RPM) e tokens por
+minuto (TPM). Com `ChatGroq(max_retries=2)` cada sessão descobre o limite
+levando um 429 e tenta de novo por conta própria, todas ao mesmo tempo.
+Aqui todas as sessões do processo passam por um único RateLimiter:
+
+- Dois token buckets (RPM e TPM) decidem quando a próxima chamada pode
+  sair. Os tokens são estimados antes da chamada e acertados depois com o
+  `usage_metadata` da resposta.
+- Quem espera fica numa fila de prioridade (menor número sai primeiro;
+  o chat vem antes do resumo em segundo plano) e, na mesma prioridade,
+  por ordem de chegada.
+- 429, 5xx, timeouts e erros de conexão são repetidos com backoff
+  exponencial com jitter. Um 429 pausa a fila inteira pelo tempo indicado
+  em `retry-after`/`x-ratelimit-reset-*`, em vez de cada sessão
+  insistir sozinha.
+
+Configuração por variáveis de ambiente:
+  GROQ_RATE_LIMIT=1      (padrão: 0, chamadas diretas ao ChatGroq)
+  GROQ_RPM=30            (requisições por minuto da sua API key)
+  GROQ_TPM=12000         (tokens por minuto da sua API key)
+  GROQ_MAX_RETRIES=6     (tentativas extras por chamada)
+
+Exemplo
+-------
+limiter = RateLimiter(rpm=30, tpm=12000)
+llm_model = prompt_template | rate_limited(llm, limiter)
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, Optional
+
+import groq
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+GROQ_RATE_LIMIT = os.getenv("GROQ_RATE_LIMIT", "0") == "1"
+GROQ_RPM = int(os.getenv("GROQ_RPM", "30"))
+GROQ_TPM = int(os.getenv("GROQ_TPM", "12000"))
+GROQ_MAX_RETRIES = int(os.getenv("GROQ_MAX_RETRIES", "6"))
+
+PRIORITY_CHAT = 0  # Resposta que o usuário está esperando
+PRIORITY_BACKGROUND = 10  # Resumo / manutenção
+
+# Tokens de resposta reservados antes da chamada (acertados depois)
+COMPLETION_TOKENS_ESTIMATE = 256
+
+_DURACAO = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIDADES = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+class TokenBucket:
+    """
+    Balde que enche `per_minute / 60` unidades por segundo.
+
+    Args:
+        per_minute: Limite por minuto
+        burst_seconds: Quantos segundos de limite cabem no balde (rajada)
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 60.0) -> None:
+        self.rate = per_minute / 60.0
+        self.capacity = max(self.rate * burst_seconds, 1.0)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, agora: float) -> None:
+        self.level = min(self.capacity, self.level + (agora - self.updated) * self.rate)
+        self.updated = agora
+
+    def wait_time(self, amount: float, agora: float) -> float:
+        """Segundos até haver `amount` unidades (0 se já há)."""
+        self._refill(agora)
+        falta = min(amount, self.capacity) - self.level
+        return falta / self.rate if falta > 0 else 0.0
+
+    def take(self, amount: float, agora: float) -> None:
+        self._refill(agora)
+        self.level -= amount
+
+    def adjust(self, delta: float) -> None:
+        """Desconta (ou devolve, se negativo) unidades após o fato."""
+        self.level = min(self.capacity, self.level - delta)
+
+
+class _Vez:
+    """Lugar de uma chamada na fila (síncrona ou assíncrona)."""
+
+    __slots__ = ("priority", "seq", "tokens", "loop", "evento")
+
+    def __init__(self, priority: int, seq: int, tokens: int, loop=None) -> None:
+        self.priority = priority
+        self.seq = seq
+        self.tokens = tokens
+        self.loop = loop
+        self.evento = asyncio.Event() if loop else threading.Event()
+
+    def __lt__(self, other: "_Vez") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+    def acordar(self) -> None:
+        if self.loop is None:
+            self.evento.set()
+        else:
+            self.loop.call_soon_threadsafe(self.evento.set)
+
+
+def estimate_tokens(input: Any) -> int:
+    """Tokens aproximados de um prompt (4 caracteres por token) + a resposta."""
+    if hasattr(input, "to_messages"):
+        input = input.to_messages()
+    if isinstance(input, list):
+        caracteres = sum(
+            len(str(m.content if isinstance(m, BaseMessage) else m)) for m in input
+        )
+    else:
+        caracteres = len(str(input))
+    return caracteres // 4 + COMPLETION_TOKENS_ESTIMATE
+
+
+def _segundos(valor: Optional[str]) -> Optional[float]:
+    """'1.5', '250ms', '2m59.56s' → segundos."""
+    if not valor:
+        return None
+    try:
+        return float(valor)
+    except ValueError:
+        partes = _DURACAO.findall(valor)
+        if not partes:
+            return None
+        return sum(float(n) * _UNIDADES[u] for n, u in partes)
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Espera sugerida pelo servidor nos cabeçalhos de um erro HTTP."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    if (ms := _segundos(headers.get("retry-after-ms"))) is not None:
+        return ms / 1000
+    if (segundos := _segundos(headers.get("retry-after"))) is not None:
+        return segundos
+    resets = [
+        _segundos(headers.get(h))
+        for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+def is_rate_limit(error: BaseException) -> bool:
+    return getattr(error, "status_code", None) == 429
+
+
+def is_retryable(error: BaseException) -> bool:
+    """429, erros 5xx, timeouts e falhas de conexão."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, (groq.APIConnectionError, TimeoutError, ConnectionError))
+
+
+class RateLimiter:
+    """
+    Fila de prioridade + buckets RPM/TPM compartilhados por todas as sessões.
+
+    Args:
+        rpm: Requisições por minuto
+        tpm: Tokens por minuto
+        max_retries: Tentativas extras para erros que valem repetir
+        base_delay: Primeiro intervalo do backoff (segundos)
+        max_delay: Teto do backoff (segundos)
+        burst_seconds: Segundos de limite liberados de uma vez (ver TokenBucket)
+    """
+
+    def __init__(
+        self,
+        rpm: float = GROQ_RPM,
+        tpm: float = GROQ_TPM,
+        max_retries: int = GROQ_MAX_RETRIES,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        burst_seconds: float = 60.0,
+    ) -> None:
+        self.requests = TokenBucket(rpm, burst_seconds)
+        self.tokens = TokenBucket(tpm, burst_seconds)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._fila: list = []
+        self._seq = itertools.count()
+        self._pausa_ate = 0.0
+        self.counters = {
+            "calls": 0,
+            "rate_limited": 0,
+            "retries": 0,
+            "failures": 0,
+            "queued_s": 0.0,
+        }
+
+    # ------------------------------------------------------------------ fila
+    def _entrar(self, tokens: int, priority: int, loop=None) -> _Vez:
+        with self._lock:
+            vez = _Vez(priority, next(self._seq), tokens, loop)
+            heapq.heappush(self._fila, vez)
+            return vez
+
+    def _tentar(self, vez: _Vez) -> Optional[float]:
+        """
+        Tenta liberar `vez` (chamar com `_lock`).
+
+        Returns:
+            0 se liberou, segundos até poder sair se é a primeira da fila,
+            None se ainda há chamadas na frente
+        """
+        if self._fila[0] is not vez:
+            return None
+        agora = time.monotonic()
+        espera = max(
+            self._pausa_ate - agora,
+            self.requests.wait_time(1, agora),
+            self.tokens.wait_time(vez.tokens, agora),
+        )
+        if espera > 0:
+            return espera
+        self.requests.take(1, agora)
+        self.tokens.take(vez.tokens, agora)
+        heapq.heappop(self._fila)
+        if self._fila:
+            self._fila[0].acordar()
+        return 0.0
+
+    def _sair(self, vez: _Vez) -> None:
+        """Remove uma chamada desistente (cancelada) da fila."""
+        with self._lock:
+            if vez in self._fila:
+                self._fila.remove(vez)
+                heapq.heapify(self._fila)
+                if self._fila:
+                    self._fila[0].acordar()
+
+    def acquire(self, tokens: int, priority: int = PRIORITY_CHAT) -> None:
+        """Bloqueia até a chamada poder sair."""
+        vez = self._entrar(tokens, priority)
+        inicio = time.monotonic()
+        try:
+            while True:
+                vez.evento.clear()
+                with self._lock:
+                    espera = self._tentar(vez)
+                if espera == 0:
+                    break
+                vez.evento.wait(espera)
+        except BaseException:
+            self._sair(vez)
+            raise
+        self.counters["queued_s"] += time.monotonic() - inicio
+
+    async def aacquire(self, tokens: int, priority: int = PRIORITY_CHAT) -> None:
+        """Versão assíncrona de `acquire` (não bloqueia o event loop)."""
+        vez = self._entrar(tokens, priority, asyncio.get_running_loop())
+        inicio = time.monotonic()
+        try:
+            while True:
+                vez.evento.clear()
+                with self._lock:
+                    espera = self._tentar(vez)
+                if espera == 0:
+                    break
+                try:
+                    await asyncio.wait_for(vez.evento.wait(), espera)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._sair(vez)
+            raise
+        self.counters["queued_s"] += time.monotonic() - inicio
+
+    # ------------------------------------------------------------------ tentativas
+    def _backoff(self, error: Exception, tentativa: int) -> float:
+        """Espera antes da próxima tentativa, ou relança o erro."""
+        if not is_retryable(error) or tentativa >= self.max_retries:
+            self.counters["failures"] += 1
+            raise error
+        self.counters["retries"] += 1
+        teto = min(self.max_delay, self.base_delay * 2**tentativa)
+        espera = teto / 2 + random.uniform(0, teto / 2)  # Jitter
+        if is_rate_limit(error):
+            self.counters["rate_limited"] += 1
+            dica = retry_after(error)
+            if dica is not None:
+                espera = dica + random.uniform(0, self.base_delay / 4)
+            # O limite é da API key: a fila inteira espera, não só esta sessão
+            with self._lock:
+                self._pausa_ate = max(self._pausa_ate, time.monotonic() + espera)
+        return espera
+
+    def _acertar(self, estimativa: int, result: Any) -> None:
+        uso = result.usage_metadata if isinstance(result, AIMessage) else None
+        if uso and uso.get("total_tokens"):
+            with self._lock:
+                self.tokens.adjust(uso["total_tokens"] - estimativa)
+
+    def call(
+        self,
+        runnable: Runnable,
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+        priority: int = PRIORITY_CHAT,
+    ) -> Any:
+        """`runnable.invoke` respeitando os limites e repetindo erros transitórios."""
+        estimativa = estimate_tokens(input)
+        for tentativa in itertools.count():
+            self.acquire(estimativa, priority)
+            self.counters["calls"] += 1
+            try:
+                result = runnable.invoke(input, config)
+            except Exception as e:
+                time.sleep(self._backoff(e, tentativa))
+                continue
+            self._acertar(estimativa, result)
+            return result
+
+    async def acall(
+        self,
+        runnable: Runnable,
+        input: Any,
+        config: Optional[RunnableConfig] = None,
+        priority: int = PRIORITY_CHAT,
+    ) -> Any:
+        """Versão assíncrona de `call`."""
+        estimativa = estimate_tokens(input)
+        for tentativa in itertools.count():
+            await self.aacquire(estimativa, priority)
+            self.counters["calls"] += 1
+            try:
+                result = await runnable.ainvoke(input, config)
+            except Exception as e:
+                await asyncio.sleep(self._backoff(e, tentativa))
+                continue
+            self._acertar(estimativa, result)
+            return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "waiting": len(self._fila)}
+
+
+def rate_limited(
+    runnable: Runnable, limiter: RateLimiter, priority: int = PRIORITY_CHAT
+) -> Runnable:
+    """
+    Envolve um modelo (ex.: ChatGroq) para passar pelo `limiter`.
+
+    A prioridade pode ser trocada por chamada com
+    `config={"metadata": {"llm_priority": n}}`.
+    """
+
+    def _priority(config: RunnableConfig) -> int:
+        return (config or {}).get("metadata", {}).get("llm_priority", priority)
+
+    def chamar(input: Any, config: RunnableConfig) -> Any:
+        return limiter.call(runnable, input, config, _priority(config))
+
+    async def achamar(input: Any, config: RunnableConfig) -> Any:
+        return await limiter.acall(runnable, input, config, _priority(config))
+
+    return RunnableLambda(chamar, afunc=achamar, name="rate_limited_llm")
@@ -0,0 +1,497 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script message_dedup_saver.py
+=============================
+Checkpointer que guarda cada mensagem UMA vez (endereçada pelo conteúdo).
+
+O SqliteSaver padrão serializa a lista inteira `channel_values["messages"]`
+em todo checkpoint, então a mesma mensagem é regravada dezenas de vezes
+numa thread longa. O DedupSqliteSaver grava cada mensagem na tabela
+`message_blobs`, com chave = hash BLAKE2b (128 bits) dos bytes serializados, e o
+checkpoint passa a guardar apenas a lista ordenada de referências:
+
+    channel_values["messages"] = {"__message_refs__": ["<hash>", ...]}
+
+Assim o armazenamento por turno cresce O(mensagens novas), e não
+O(histórico). Checkpoints antigos (com a lista completa) continuam
+legíveis, e a leitura devolve sempre as mensagens já reidratadas.
+
+As mensagens novas e o checkpoint que as referencia são gravados na MESMA
+transação, então nenhuma outra conexão (ex.: a limpeza da retenção) vê
+mensagens sem o checkpoint que as usa.
+
+O DedupAsyncSqliteSaver faz o mesmo sobre o AsyncSqliteSaver (AsyncChatEngine).
+
+Exemplo
+-------
+conn = sqlite3.connect("chatbot_memory.db", check_same_thread=False)
+graph = build_graph(DedupSqliteSaver(conn))
+"""
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+import aiosqlite
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.sqlite import SqliteSaver
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+MESSAGE_REFS_KEY = "__message_refs__"
+
+# Hashes já gravados que ficam em memória (evita INSERTs repetidos)
+KNOWN_HASHES_SIZE = 100_000
+
+# checkpoint_id: checkpoint que gravou a mensagem pela primeira vez (a
+# limpeza só apaga mensagens mais velhas que o último checkpoint da thread)
+MESSAGE_BLOBS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS message_blobs (
+    thread_id TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    type TEXT,
+    value BLOB,
+    checkpoint_id TEXT,
+    PRIMARY KEY (thread_id, hash)
+)
+"""
+
+INSERT_MESSAGE_BLOBS = (
+    "INSERT OR IGNORE INTO message_blobs (thread_id, hash, type, value, "
+    "checkpoint_id) VALUES (?, ?, ?, ?, ?)"
+)
+
+
+def migrate_message_blobs(conn: sqlite3.Connection) -> None:
+    """Acrescenta `checkpoint_id` em tabelas criadas antes da coluna existir."""
+    colunas = [c[1] for c in conn.execute("PRAGMA table_info(message_blobs)")]
+    if "checkpoint_id" not in colunas:
+        conn.execute("ALTER TABLE message_blobs ADD COLUMN checkpoint_id TEXT")
+
+
+class _MessageDedup:
+    """Hash, cache de hashes gravados e troca mensagens ↔ referências."""
+
+    def _init_dedup(self) -> None:
+        self._known: "OrderedDict[tuple, None]" = OrderedDict()
+
+    @staticmethod
+    def _deduplicable(messages: Any) -> bool:
+        return isinstance(messages, list) and all(
+            isinstance(m, BaseMessage) for m in messages
+        )
+
+    def _new_messages(
+        self, thread_id: str, checkpoint_id: str, messages: List[BaseMessage]
+    ) -> Tuple[List[str], List[tuple]]:
+        """Referências das mensagens e as linhas das que ainda não foram gravadas."""
+        refs, novas = [], []
+        for message in messages:
+            type_, value = self.serde.dumps_typed(message)
+            digest = hashlib.blake2b(
+                type_.encode() + b"\0" + value, digest_size=16
+            ).hexdigest()
+            refs.append(digest)
+            chave = (thread_id, digest)
+            if chave in self._known:
+                self._known.move_to_end(chave)
+            else:
+                novas.append((thread_id, digest, type_, value, checkpoint_id))
+        return refs, novas
+
+    @staticmethod
+    def _with_refs(checkpoint: Checkpoint, refs: List[str]) -> Checkpoint:
+        return {
+            **checkpoint,
+            "channel_values": {
+                **checkpoint["channel_values"],
+                "messages": {MESSAGE_REFS_KEY: refs},
+            },
+        }
+
+    @staticmethod
+    def _select_blobs(thread_id: str, refs: List[str]) -> Tuple[str, tuple]:
+        unicos = set(refs)
+        return (
+            "SELECT hash, type, value FROM message_blobs WHERE thread_id = ? "
+            f"AND hash IN ({','.join('?' * len(unicos))})",
+            (thread_id, *unicos),
+        )
+
+    @staticmethod
+    def _refs_of(tupla: CheckpointTuple) -> Optional[List[str]]:
+        """Referências guardadas no checkpoint (None se ele tiver a lista completa)."""
+        messages = tupla.checkpoint["channel_values"].get("messages")
+        if isinstance(messages, dict) and MESSAGE_REFS_KEY in messages:
+            return messages[MESSAGE_REFS_KEY]
+        return None
+
+    def _remember(self, novas: List[tuple]) -> None:
+        """Marca como gravadas as mensagens de um `put` já confirmado."""
+        for linha in novas:
+            self._known[(linha[0], linha[1])] = None
+        while len(self._known) > KNOWN_HASHES_SIZE:
+            self._known.popitem(last=False)
+
+    def _forget(self, thread_id: str, refs: List[str]) -> None:
+        for ref in refs:
+            self._known.pop((thread_id, ref), None)
+
+    def _forget_thread(self, thread_id: str) -> None:
+        self._known = OrderedDict(
+            (k, None) for k in self._known if k[0] != str(thread_id)
+        )
+
+
+class DedupSqliteSaver(_MessageDedup, SqliteSaver):
+    """
+    SqliteSaver que deduplica as mensagens entre checkpoints da mesma thread.
+
+    As chaves são (thread_id, hash), então `delete_thread` e a retenção
+    conseguem limpar as mensagens de uma thread sem afetar as outras.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, *, serde=None) -> None:
+        super().__init__(conn, serde=serde)
+        self._init_dedup()
+        self._local = threading.local()  # Cursor do `put` em andamento
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        try:
+            self.conn.execute(MESSAGE_BLOBS_SCHEMA)
+            migrate_message_blobs(self.conn)
+        except sqlite3.OperationalError as e:
+            # Banco aberto só para leitura (visualizadores): sem a tabela
+            # também não há checkpoints com referências para reidratar
+            if "readonly database" not in str(e):
+                raise
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        aberto = getattr(self._local, "cursor", None)
+        if aberto is not None:
+            # Dentro do `put`: mesmo lock e mesma transação das mensagens
+            yield aberto
+            return
+        with super().cursor(transaction) as cur:
+            yield cur
+
+    # ------------------------------------------------------------------ escrita
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        messages = checkpoint["channel_values"].get("messages")
+        if not self._deduplicable(messages):
+            return super().put(config, checkpoint, metadata, new_versions)
+
+        thread_id = str(config["configurable"]["thread_id"])
+        refs, novas = self._new_messages(thread_id, checkpoint["id"], messages)
+        checkpoint = self._with_refs(checkpoint, refs)
+        # Mensagens e checkpoint numa única transação (um só COMMIT)
+        with self.cursor() as cur:
+            self._local.cursor = cur
+            try:
+                if novas:
+                    cur.executemany(INSERT_MESSAGE_BLOBS, novas)
+                salvo = super().put(config, checkpoint, metadata, new_versions)
+            finally:
+                self._local.cursor = None
+        # Só depois do COMMIT: um lote desfeito não deixa hashes "conhecidos"
+        # que não estão no banco
+        self._remember(novas)
+        return salvo
+
+    # ------------------------------------------------------------------ leitura
+    def _load_messages(self, thread_id: str, refs: List[str]) -> List[BaseMessage]:
+        if not refs:
+            return []
+        try:
+            with self.cursor(transaction=False) as cur:
+                cur.execute(*self._select_blobs(thread_id, refs))
+                por_hash = {h: self.serde.loads_typed((t, v)) for h, t, v in cur}
+            return [por_hash[ref] for ref in refs]
+        except Exception:
+            # Não confia mais no cache de hashes desta leitura: o próximo
+            # `put` regrava as mensagens se elas tiverem sumido do banco
+            self._forget(thread_id, refs)
+            raise
+
+    def _rehydrate(self, tupla: Optional[CheckpointTuple]) -> Optional[CheckpointTuple]:
+        if tupla is None:
+            return None
+        refs = self._refs_of(tupla)
+        if refs is None:
+            return tupla  # Checkpoint antigo (lista completa) ou sem mensagens
+        thread_id = str(tupla.config["configurable"]["thread_id"])
+        tupla.checkpoint["channel_values"]["messages"] = self._load_messages(
+            thread_id, refs
+        )
+        return tupla
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self._rehydrate(super().get_tuple(config))
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        # Materializa a lista antes de reidratar: o SqliteSaver mantém o
+        # lock da conexão enquanto o gerador estiver aberto.
+        tuplas = [*super().list(config, filter=filter, before=before, limit=limit)]
+        for tupla in tuplas:
+            yield self._rehydrate(tupla)
+
+    # ------------------------------------------------------------------ limpeza
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute(
+                "DELETE FROM message_blobs WHERE thread_id = ?", (str(thread_id),)
+            )
+        self._forget_thread(thread_id)
+
+
+class _TaskLock:
+    """
+    asyncio.Lock que a task dona pode adquirir de novo. O `aput` segura o
+    lock enquanto grava as mensagens, e o AsyncSqliteSaver.aput o pede
+    outra vez para gravar o checkpoint antes do mesmo COMMIT.
+    """
+
+    def __init__(self) -> None:
+        self._lock = asyncio.Lock()
+        self._dona: Optional[asyncio.Task] = None
+        self._nivel = 0
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    async def acquire(self) -> bool:
+        task = asyncio.current_task()
+        if self._dona is not task:
+            await self._lock.acquire()
+            self._dona = task
+        self._nivel += 1
+        return True
+
+    def release(self) -> None:
+        self._nivel -= 1
+        if self._nivel == 0:
+            self._dona = None
+            self._lock.release()
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+
+class DedupAsyncSqliteSaver(_MessageDedup, AsyncSqliteSaver):
+    """
+    DedupSqliteSaver para o AsyncSqliteSaver (usado pelo AsyncChatEngine).
+
+    Lê e grava o mesmo formato do DedupSqliteSaver, então o chatbot
+    síncrono e o motor assíncrono podem usar o mesmo banco.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, *, serde=None) -> None:
+        super().__init__(conn, serde=serde)
+        self.lock = _TaskLock()
+        self._init_dedup()
+
+    async def setup(self) -> None:
+        async with self.lock:
+            if self.is_setup:
+                return
+            await super().setup()
+            async with self.conn.execute(MESSAGE_BLOBS_SCHEMA):
+                pass
+            async with self.conn.execute("PRAGMA table_info(message_blobs)") as cur:
+                colunas = [c[1] for c in await cur.fetchall()]
+            if "checkpoint_id" not in colunas:
+                async with self.conn.execute(
+                    "ALTER TABLE message_blobs ADD COLUMN checkpoint_id TEXT"
+                ):
+                    pass
+            await self.conn.commit()
+
+    def _after_commit(self, callback: Callable[[], None]) -> None:
+        """Roda `callback` depois do COMMIT (o group commit adia até o lote)."""
+        callback()
+
+    # ------------------------------------------------------------------ escrita
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        messages = checkpoint["channel_values"].get("messages")
+        if not self._deduplicable(messages):
+            return await super().aput(config, checkpoint, metadata, new_versions)
+
+        thread_id = str(config["configurable"]["thread_id"])
+        refs, novas = self._new_messages(thread_id, checkpoint["id"], messages)
+        checkpoint = self._with_refs(checkpoint, refs)
+        await self.setup()
+        # Mensagens e checkpoint numa única transação: o COMMIT do
+        # AsyncSqliteSaver.aput confirma as duas coisas
+        async with self.lock:
+            if novas:
+                async with self.conn.executemany(INSERT_MESSAGE_BLOBS, novas):
+                    pass
+            salvo = await super().aput(config, checkpoint, metadata, new_versions)
+        self._after_commit(lambda: self._remember(novas))
+        return salvo
+
+    # ------------------------------------------------------------------ leitura
+    async def _aload_messages(
+        self, thread_id: str, refs: List[str]
+    ) -> List[BaseMessage]:
+        if not refs:
+            return []
+        try:
+            async with self.lock, self.conn.execute(
+                *self._select_blobs(thread_id, refs)
+            ) as cur:
+                por_hash = {
+                    h: self.serde.loads_typed((t, v))
+                    for h, t, v in await cur.fetchall()
+                }
+            return [por_hash[ref] for ref in refs]
+        except Exception:
+            self._forget(thread_id, refs)
+            raise
+
+    async def _arehydrate(
+        self, tupla: Optional[CheckpointTuple]
+    ) -> Optional[CheckpointTuple]:
+        if tupla is None:
+            return None
+        refs = self._refs_of(tupla)
+        if refs is None:
+            return tupla
+        thread_id = str(tupla.config["configurable"]["thread_id"])
+        tupla.checkpoint["channel_values"]["messages"] = await self._aload_messages(
+            thread_id, refs
+        )
+        return tupla
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self._arehydrate(await super().aget_tuple(config))
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        tuplas = [
+            tupla
+            async for tupla in super().alist(
+                config, filter=filter, before=before, limit=limit
+            )
+        ]
+        for tupla in tuplas:
+            yield await self._arehydrate(tupla)
+
+    # ------------------------------------------------------------------ limpeza
+    async def adelete_thread(self, thread_id: str) -> None:
+        async with self.lock:
+            async with self.conn.execute(
+                "DELETE FROM message_blobs WHERE thread_id = ?", (str(thread_id),)
+            ):
+                pass
+            # O COMMIT do AsyncSqliteSaver também confirma o DELETE acima
+            await super().adelete_thread(thread_id)
+        self._forget_thread(thread_id)
+
+
+def collect_unreferenced_messages(
+    conn: sqlite3.Connection, thread_id: str, serde=None
+) -> int:
+    """
+    Apaga de `message_blobs` as mensagens que nenhum checkpoint da thread usa.
+
+    Chamado pela retenção (checkpoint_retention.py) depois de podar
+    checkpoints antigos. A leitura dos checkpoints e o DELETE rodam numa
+    única transação de escrita (BEGIN IMMEDIATE), então nenhum `put` é
+    confirmado no meio; e só entram mensagens gravadas antes do último
+    checkpoint da thread.
+
+    Args:
+        conn: Conexão com o banco de checkpoints
+        thread_id: Thread a limpar
+        serde: Serializador usado pelo checkpointer (padrão make_serializer())
+
+    Returns:
+        Número de mensagens apagadas
+    """
+    if serde is None:
+        from compressed_serializer import make_serializer
+
+        serde = make_serializer()
+    if conn.in_transaction:
+        conn.commit()
+    migrate_message_blobs(conn)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        usados = set()
+        ultimo = None
+        for checkpoint_id, type_, value in conn.execute(
+            "SELECT checkpoint_id, type, checkpoint FROM checkpoints "
+            "WHERE thread_id = ?",
+            (thread_id,),
+        ):
+            ultimo = max(ultimo or checkpoint_id, checkpoint_id)
+            messages = serde.loads_typed((type_, value))["channel_values"].get(
+                "messages"
+            )
+            if isinstance(messages, dict) and MESSAGE_REFS_KEY in messages:
+                usados.update(messages[MESSAGE_REFS_KEY])
+
+        orfaos = []
+        if ultimo is not None:
+            orfaos = [
+                (thread_id, h)
+                for (h,) in conn.execute(
+                    "SELECT hash FROM message_blobs WHERE thread_id = ? "
+                    "AND (checkpoint_id IS NULL OR checkpoint_id < ?)",
+                    (thread_id, ultimo),
+                )
+                if h not in usados
+            ]
+        conn.executemany(
+            "DELETE FROM message_blobs WHERE thread_id = ? AND hash = ?", orfaos
+        )
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    return len(orfaos)
@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script metrics.py
+=================
+Instrumentação do graph do chatbot: para onde vai o tempo de cada turno.
+
+Métricas (histogramas e contadores, no formato do Prometheus):
+
+  chatbot_node_seconds{node}             filternode, summarizenode, chatnode
+  chatbot_checkpoint_seconds{op}         read (get_tuple), write (put),
+                                         write_pending (put_writes)
+  chatbot_checkpoint_bytes{op}           bytes serializados lidos/gravados
+  chatbot_llm_ttft_seconds               até o primeiro token (= total sem streaming)
+  chatbot_llm_seconds                    chamada completa ao LLM
+  chatbot_llm_prompt_tokens_total        tokens de entrada
+  chatbot_llm_completion_tokens_total    tokens de saída
+  chatbot_llm_errors_total
+
+Tudo fica num registro em memória (`REGISTRY.snapshot()`), que pode ser
+exportado em texto do Prometheus (`REGISTRY.to_prometheus()`): num
+arquivo (`METRICS_FILE`, gravado a cada turno do chat interativo e no
+fechamento do AsyncChatEngine) ou em `GET /metrics` no chat_server.
+
+Os bytes dos checkpoints são os que o serializador realmente produz ou lê
+(já comprimidos, se houver compressão): o CompressedSerializer chama
+`count_bytes` e o InstrumentedSaver soma o que foi contado durante cada
+leitura ou escrita. Uma leitura servida pelo cache do checkpoint conta 0
+bytes.
+
+Configuração por variáveis de ambiente:
+  METRICS=1                    (padrão: 0, sem instrumentação)
+  METRICS_FILE=metrics.prom    (vazio = não grava arquivo)
+
+Exemplo
+-------
+memory = instrumented_saver(SqliteSaver(conn, serde=make_serializer()))
+graph = build_graph(memory)   # com METRICS=1 os nós e o LLM são medidos
+print(REGISTRY.to_prometheus())
+"""
+import bisect
+import contextlib
+import contextvars
+import copy
+import functools
+import os
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler, BaseCallbackManager
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+METRICS = os.getenv("METRICS", "0") == "1"
+METRICS_FILE = os.getenv("METRICS_FILE", "")
+
+SECONDS_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)  # fmt: skip
+BYTES_BUCKETS = tuple(256 * 4**n for n in range(9))  # 256 B ... 16 MB
+
+
+class Histogram:
+    """Histograma cumulativo com buckets fixos (como o do Prometheus)."""
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # O último é o +Inf
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Limite superior do bucket onde cai o quantil `q` (estimativa)."""
+        if not self.count:
+            return None
+        alvo, acumulado = q * self.count, 0
+        for limite, n in zip(self.buckets, self.counts):
+            acumulado += n
+            if acumulado >= alvo:
+                return limite
+        return float("inf")
+
+    def snapshot(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+        }
+
+
+class Counter:
+    def __init__(self) -> None:
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> float:
+        return self.value
+
+
+class MetricsRegistry:
+    """Métricas do processo, por nome e labels."""
+
+    def __init__(self) -> None:
+        self._metricas: Dict[Tuple[str, tuple], Any] = {}
+        self._ajuda: Dict[str, Tuple[str, str]] = {}  # nome → (tipo, ajuda)
+        self._lock = threading.Lock()
+
+    def _obter(self, nome: str, tipo: str, ajuda: str, labels: dict, criar) -> Any:
+        key = (nome, tuple(sorted(labels.items())))
+        metrica = self._metricas.get(key)
+        if metrica is None:
+            with self._lock:
+                metrica = self._metricas.get(key)
+                if metrica is None:
+                    metrica = self._metricas[key] = criar()
+                    self._ajuda.setdefault(nome, (tipo, ajuda))
+        return metrica
+
+    def histogram(
+        self,
+        nome: str,
+        ajuda: str = "",
+        buckets: Sequence[float] = SECONDS_BUCKETS,
+        **labels: str,
+    ) -> Histogram:
+        return self._obter(nome, "histogram", ajuda, labels, lambda: Histogram(buckets))
+
+    def counter(self, nome: str, ajuda: str = "", **labels: str) -> Counter:
+        return self._obter(nome, "counter", ajuda, labels, Counter)
+
+    def _itens(self) -> list:
+        with self._lock:
+            return sorted(self._metricas.items(), key=lambda item: item[0])
+
+    def snapshot(self) -> dict:
+        """{"nome{label=valor}": valores} para inspeção no próprio processo."""
+        return {
+            nome + _labels(labels): metrica.snapshot()
+            for (nome, labels), metrica in self._itens()
+        }
+
+    def to_prometheus(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus (0.0.4)."""
+        linhas, itens = [], self._itens()
+        for nome, (tipo, ajuda) in sorted(self._ajuda.copy().items()):
+            linhas += [f"# HELP {nome} {ajuda}", f"# TYPE {nome} {tipo}"]
+            for (outro, labels), metrica in itens:
+                if outro != nome:
+                    continue
+                if tipo == "counter":
+                    linhas.append(f"{nome}{_labels(labels)} {metrica.value:g}")
+                    continue
+                acumulado = 0
+                for limite, n in zip(metrica.buckets, metrica.counts):
+                    acumulado += n
+                    le = labels + (("le", f"{limite:g}"),)
+                    linhas.append(f"{nome}_bucket{_labels(le)} {acumulado}")
+                le = labels + (("le", "+Inf"),)
+                linhas.append(f"{nome}_bucket{_labels(le)} {metrica.count}")
+                linhas.append(f"{nome}_sum{_labels(labels)} {metrica.sum:g}")
+                linhas.append(f"{nome}_count{_labels(labels)} {metrica.count}")
+        return "\n".join(linhas) + "\n"
+
+    def write(self, path: str) -> None:
+        """Grava o texto do Prometheus em `path` (troca atômica do arquivo)."""
+        temporario = f"{path}.tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(temporario, path)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._metricas.clear()
+            self._ajuda.clear()
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in labels) + "}"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def write_metrics_file(path: Optional[str] = None) -> None:
+    """Grava REGISTRY em `path` (ou METRICS_FILE), se a instrumentação estiver ativa."""
+    path = path or METRICS_FILE
+    if METRICS and path:
+        REGISTRY.write(path)
+
+
+# ---------------------------------------------------------------------- nós
+def _node_histogram(node: str) -> Histogram:
+    return REGISTRY.histogram(
+        "chatbot_node_seconds", "Duração de cada nó do graph", node=node
+    )
+
+
+def timed(func, node: str):
+    """Mede `func` (nó síncrono do graph) em chatbot_node_seconds{node}."""
+
+    @functools.wraps(func)
+    def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _node_histogram(node).observe(time.perf_counter() - inicio)
+
+    return medido
+
+
+def atimed(func, node: str):
+    """Versão de `timed` para nós assíncronos."""
+
+    @functools.wraps(func)
+    async def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            _node_histogram(node).observe(time.perf_counter() - inicio)
+
+    return medido
+
+
+# ---------------------------------------------------------------------- LLM
+class LLMMetricsHandler(BaseCallbackHandler):
+    """Callback que mede cada chamada ao modelo de chat (TTFT, total, tokens)."""
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY) -> None:
+        self.registry = registry
+        self._inicios: Dict[UUID, float] = {}
+        self._primeiro: set = set()
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kw) -> None:
+        self._inicios[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kw) -> None:
+        inicio = self._inicios.get(run_id)
+        if inicio is not None and run_id not in self._primeiro:
+            self._primeiro.add(run_id)
+            self.registry.histogram(
+                "chatbot_llm_ttft_seconds", "Tempo até o primeiro token do LLM"
+            ).observe(time.perf_counter() - inicio)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kw) -> None:
+        inicio = self._inicios.pop(run_id, None)
+        if inicio is None:
+            return
+        total = time.perf_counter() - inicio
+        self.registry.histogram(
+            "chatbot_llm_seconds", "Duração das chamadas ao LLM"
+        ).observe(total)
+        if run_id in self._primeiro:
+            self._primeiro.discard(run_id)
+        else:  # Sem streaming o primeiro token chega com a resposta inteira
+            self.registry.histogram(
+                "chatbot_llm_ttft_seconds", "Tempo até o primeiro token do LLM"
+            ).observe(total)
+        for geracoes in response.generations:
+            for geracao in geracoes:
+                message = getattr(geracao, "message", None)
+                uso = message.usage_metadata if isinstance(message, AIMessage) else None
+                if uso:
+                    self.registry.counter(
+                        "chatbot_llm_prompt_tokens_total", "Tokens de entrada do LLM"
+                    ).inc(uso.get("input_tokens", 0))
+                    self.registry.counter(
+                        "chatbot_llm_completion_tokens_total", "Tokens de saída do LLM"
+                    ).inc(uso.get("output_tokens", 0))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kw) -> None:
+        self._inicios.pop(run_id, None)
+        self._primeiro.discard(run_id)
+        self.registry.counter(
+            "chatbot_llm_errors_total", "Chamadas ao LLM que falharam"
+        ).inc()
+
+
+LLM_HANDLER = LLMMetricsHandler()
+
+
+def _com_handler(config: RunnableConfig) -> RunnableConfig:
+    """`config` com LLM_HANDLER somado aos callbacks que já estão lá."""
+    callbacks = config.get("callbacks")
+    if isinstance(callbacks, BaseCallbackManager):
+        callbacks = callbacks.copy()
+        callbacks.add_handler(LLM_HANDLER, inherit=True)
+    else:
+        callbacks = [*(callbacks or []), LLM_HANDLER]
+    return {**config, "callbacks": callbacks}
+
+
+def instrumented_llm(runnable: Runnable) -> Runnable:
+    """
+    Envolve o modelo (prompt | LLM) para medir as chamadas com LLM_HANDLER.
+
+    O handler é somado aos callbacks recebidos do graph (um `with_config`
+    substituiria os do graph e desligaria o streaming de tokens).
+    """
+
+    def chamar(input: Any, config: RunnableConfig) -> Any:
+        return runnable.invoke(input, _com_handler(config))
+
+    async def achamar(input: Any, config: RunnableConfig) -> Any:
+        return await runnable.ainvoke(input, _com_handler(config))
+
+    return RunnableLambda(chamar, afunc=achamar, name="llm_metrics")
+
+
+# ---------------------------------------------------------------------- checkpoints
+_bytes_contados: contextvars.ContextVar = contextvars.ContextVar(
+    "checkpoint_bytes", default=None
+)
+
+
+def count_bytes(n: int) -> None:
+    """Soma `n` bytes à leitura/escrita de checkpoint em andamento (se houver)."""
+    contador = _bytes_contados.get()
+    if contador is not None:
+        contador[0] += n
+
+
+@contextlib.contextmanager
+def counting_bytes() -> Iterator[list]:
+    """
+    Conta em `contador[0]` os bytes serializados dentro do bloco.
+
+    Blocos aninhados (ex.: InstrumentedSaver em volta do LedgerSaver) veem
+    os mesmos bytes: ao sair, a contagem interna é somada à externa.
+    """
+    externo = _bytes_contados.get()
+    contador = [0]
+    token = _bytes_contados.set(contador)
+    try:
+        yield contador
+    finally:
+        _bytes_contados.reset(token)
+        if externo is not None:
+            externo[0] += contador[0]
+
+
+class _Medicao:
+    """Mede duração e bytes serializados de uma operação do checkpointer."""
+
+    def __init__(self, op: str) -> None:
+        self.op = op
+
+    def __enter__(self) -> "_Medicao":
+        self._contagem = counting_bytes()
+        self._contador = self._contagem.__enter__()
+        self._inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        tempo = time.perf_counter() - self._inicio
+        self._contagem.__exit__(*exc)
+        REGISTRY.histogram(
+            "chatbot_checkpoint_seconds", "Duração das operações do checkpointer",
+            op=self.op,
+        ).observe(tempo)  # fmt: skip
+        REGISTRY.histogram(
+            "chatbot_checkpoint_bytes", "Bytes serializados por operação",
+            BYTES_BUCKETS, op=self.op,
+        ).observe(self._contador[0])  # fmt: skip
+
+
+class InstrumentedSaver(BaseCheckpointSaver):
+    """
+    Checkpointer que mede o tempo e os bytes de cada leitura e escrita.
+
+    Args:
+        saver: Checkpointer de verdade (SqliteSaver, CachedCheckpointSaver...)
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver) -> None:
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+
+    def __getattr__(self, nome: str) -> Any:
+        # stats(), clear() etc. do checkpointer embrulhado
+        if nome == "saver" or nome.startswith("__"):
+            raise AttributeError(nome)
+        return getattr(self.saver, nome)
+
+    # ------------------------------------------------------------------ síncrono
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with _Medicao("read"):
+            return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with _Medicao("write"):
+            return self.saver.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with _Medicao("write_pending"):
+            self.saver.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver.delete_thread(thread_id)
+
+    # ------------------------------------------------------------------ assíncrono
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with _Medicao("read"):
+            return await self.saver.aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for tupla in self.saver.alist(
+            config, filter=filter, before=before, limit=limit
+        ):
+            yield tupla
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with _Medicao("write"):
+            return await self.saver.aput(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with _Medicao("write_pending"):
+            await self.saver.aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.saver.adelete_thread(thread_id)
+
+    # ------------------------------------------------------------------ delegação
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.saver.get_next_version(current, channel)
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def with_allowlist(self, extra_allowlist) -> "InstrumentedSaver":
+        saver = self.saver.with_allowlist(extra_allowlist)
+        if saver is self.saver:
+            return self
+        clone = copy.copy(self)
+        clone.saver, clone.serde = saver, saver.serde
+        return clone
+
+
+def instrumented_saver(saver: BaseCheckpointSaver) -> BaseCheckpointSaver:
+    """Embrulha `saver` no InstrumentedSaver se METRICS=1; senão devolve `saver`."""
+    return InstrumentedSaver(saver) if METRICS else saver
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script model_router.py
+======================
+Roteamento entre um modelo rápido e um modelo grande, com fallback.
+
+Todo turno ia para o `llama-3.3-70b-versatile`, até um "obrigado". O
+ModelRouter olha a última mensagem do usuário antes de chamar o LLM:
+mensagens curtas e sem pedidos complexos vão para o modelo rápido
+(`FAST_MODEL`, por padrão `llama-3.1-8b-instant`), o resto vai para o
+grande. O roteamento fica dentro do `llm_model` do ChatNode, então o
+graph, o State e os checkpoints não mudam.
+
+Cada rota guarda as latências e erros das últimas chamadas. Se o p90
+de uma rota passa de `max_latency` ou a taxa de erro passa de
+`max_error_rate`, ela fica "degradada" por `cooldown` segundos e as
+chamadas vão para a outra; depois disso ela volta a receber tráfego
+(se continuar ruim, degrada de novo). Um erro numa chamada também é
+repetido uma vez na outra rota.
+
+Configuração por variáveis de ambiente:
+  LLM_ROUTING=1                        (padrão: 0, sempre o modelo grande)
+  FAST_MODEL=llama-3.1-8b-instant
+  ROUTER_SIMPLE_MAX_WORDS=12           (até quantas palavras é "simples")
+  ROUTER_MAX_LATENCY_MS=5000           (p90 acima disso degrada a rota)
+  ROUTER_MAX_ERROR_RATE=0.5
+  ROUTER_COOLDOWN_S=30
+
+Exemplo
+-------
+router = ModelRouter(Route("8b", fast_llm), Route("70b", llm))
+llm_model = prompt_template | routed(router)
+"""
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+LLM_ROUTING = os.getenv("LLM_ROUTING", "0") == "1"
+FAST_MODEL = os.getenv("FAST_MODEL", "llama-3.1-8b-instant")
+ROUTER_SIMPLE_MAX_WORDS = int(os.getenv("ROUTER_SIMPLE_MAX_WORDS", "12"))
+ROUTER_MAX_LATENCY = float(os.getenv("ROUTER_MAX_LATENCY_MS", "5000")) / 1000
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))
+ROUTER_COOLDOWN = float(os.getenv("ROUTER_COOLDOWN_S", "30"))
+
+# Preço em US$ por milhão de tokens (entrada, saída), para estimar o custo
+MODEL_PRICES = {
+    "llama-3.3-70b-versatile": (0.59, 0.79),
+    "llama-3.1-8b-instant": (0.05, 0.08),
+}
+
+# Pedidos que merecem o modelo grande mesmo quando a mensagem é curta
+COMPLEX_HINTS = re.compile(
+    r"\b(explique|explica|por ?que|porquê|compare|analise|resuma|"
+    r"passo a passo|código|codigo|implemente|calcule|demonstre|"
+    r"explain|why|compare|analy[sz]e|summari[sz]e|code|implement)\b",
+    re.IGNORECASE,
+)
+
+
+def last_user_text(input: Any) -> str:
+    """Texto da última mensagem do usuário no prompt."""
+    mensagens = input.to_messages() if hasattr(input, "to_messages") else input
+    if not isinstance(mensagens, list):
+        return str(mensagens)
+    for mensagem in reversed(mensagens):
+        if isinstance(mensagem, HumanMessage):
+            return str(mensagem.content)
+    return ""
+
+
+def is_simple(texto: str, max_words: int = ROUTER_SIMPLE_MAX_WORDS) -> bool:
+    """Mensagem curta, de uma linha, sem pedido complexo nem código."""
+    return (
+        len(texto.split()) <= max_words
+        and "\n" not in texto.strip()
+        and "```" not in texto
+        and not COMPLEX_HINTS.search(texto)
+    )
+
+
+class Route:
+    """
+    Um backend (modelo) com as estatísticas das últimas chamadas.
+
+    Args:
+        name: Nome do modelo (usado em MODEL_PRICES e nas métricas)
+        runnable: Modelo de chat (ChatGroq, stub, rate_limited(...)...)
+        window: Quantas chamadas recentes entram nas métricas
+    """
+
+    def __init__(self, name: str, runnable: Runnable, window: int = 100) -> None:
+        self.name = name
+        self.runnable = runnable
+        self._recentes: deque = deque(maxlen=window)  # (segundos, ok)
+        self._lock = threading.Lock()
+        self.degraded_until = 0.0
+        self.calls = 0
+        self.errors = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def record(self, segundos: float, result: Any = None, ok: bool = True) -> None:
+        with self._lock:
+            self._recentes.append((segundos, ok))
+            self.calls += 1
+            self.errors += not ok
+            uso = result.usage_metadata if isinstance(result, AIMessage) else None
+            if uso:
+                self.input_tokens += uso.get("input_tokens", 0)
+                self.output_tokens += uso.get("output_tokens", 0)
+
+    def latency_percentile(self, p: float) -> Optional[float]:
+        with self._lock:
+            latencias = sorted(s for s, ok in self._recentes if ok)
+        if not latencias:
+            return None
+        return latencias[min(int(len(latencias) * p / 100), len(latencias) - 1)]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self._recentes:
+                return 0.0
+            return sum(not ok for _, ok in self._recentes) / len(self._recentes)
+
+    def cost(self) -> float:
+        entrada, saida = MODEL_PRICES.get(self.name, (0.0, 0.0))
+        return (self.input_tokens * entrada + self.output_tokens * saida) / 1e6
+
+    def stats(self) -> dict:
+        p50, p90 = self.latency_percentile(50), self.latency_percentile(90)
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "error_rate": self.error_rate(),
+            "p50_ms": 1000 * p50 if p50 is not None else None,
+            "p90_ms": 1000 * p90 if p90 is not None else None,
+            "degraded": self.degraded_until > time.monotonic(),
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost_usd": self.cost(),
+        }
+
+
+class ModelRouter:
+    """
+    Escolhe a rota de cada chamada e troca de rota quando uma degrada.
+
+    Args:
+        fast: Rota do modelo rápido (turnos simples)
+        large: Rota do modelo grande (demais turnos)
+        max_latency: p90 (segundos) acima do qual a rota degrada
+        max_error_rate: Taxa de erro acima da qual a rota degrada
+        cooldown: Segundos que uma rota degradada fica sem tráfego
+        min_samples: Chamadas recentes necessárias para avaliar uma rota
+        simple_max_words: Limite de palavras de um turno "simples"
+    """
+
+    def __init__(
+        self,
+        fast: Route,
+        large: Route,
+        max_latency: float = ROUTER_MAX_LATENCY,
+        max_error_rate: float = ROUTER_MAX_ERROR_RATE,
+        cooldown: float = ROUTER_COOLDOWN,
+        min_samples: int = 5,
+        simple_max_words: int = ROUTER_SIMPLE_MAX_WORDS,
+    ) -> None:
+        self.fast = fast
+        self.large = large
+        self.max_latency = max_latency
+        self.max_error_rate = max_error_rate
+        self.cooldown = cooldown
+        self.min_samples = min_samples
+        self.simple_max_words = simple_max_words
+        self.decisions = {"fast": 0, "large": 0, "fallback": 0}
+
+    def _avaliar(self, route: Route) -> None:
+        """Degrada a rota se o p90 ou a taxa de erro recentes passaram do limite."""
+        with route._lock:
+            amostras = len(route._recentes)
+        if amostras < self.min_samples:
+            return
+        p90 = route.latency_percentile(90)
+        lenta = p90 is not None and p90 > self.max_latency
+        if lenta or route.error_rate() > self.max_error_rate:
+            route.degraded_until = time.monotonic() + self.cooldown
+            with route._lock:
+                route._recentes.clear()  # Volta do cooldown com histórico limpo
+
+    def choose(self, input: Any) -> tuple:
+        """(rota escolhida, rota alternativa) para o prompt."""
+        if is_simple(last_user_text(input), self.simple_max_words):
+            preferida, outra = self.fast, self.large
+        else:
+            preferida, outra = self.large, self.fast
+        agora = time.monotonic()
+        if preferida.degraded_until > agora and outra.degraded_until <= agora:
+            self.decisions["fallback"] += 1
+            preferida, outra = outra, preferida
+        self.decisions["fast" if preferida is self.fast else "large"] += 1
+        return preferida, outra
+
+    def call(self, input: Any, config: Optional[RunnableConfig] = None) -> AIMessage:
+        rotas = self.choose(input)
+        for n, route in enumerate(rotas):
+            inicio = time.monotonic()
+            try:
+                result = route.runnable.invoke(input, config)
+            except Exception:
+                route.record(time.monotonic() - inicio, ok=False)
+                self._avaliar(route)
+                if n == len(rotas) - 1:
+                    raise
+                self.decisions["fallback"] += 1
+                continue
+            route.record(time.monotonic() - inicio, result)
+            self._avaliar(route)
+            return result
+
+    async def acall(
+        self, input: Any, config: Optional[RunnableConfig] = None
+    ) -> AIMessage:
+        rotas = self.choose(input)
+        for n, route in enumerate(rotas):
+            inicio = time.monotonic()
+            try:
+                result = await route.runnable.ainvoke(input, config)
+            except Exception:
+                route.record(time.monotonic() - inicio, ok=False)
+                self._avaliar(route)
+                if n == len(rotas) - 1:
+                    raise
+                self.decisions["fallback"] += 1
+                continue
+            route.record(time.monotonic() - inicio, result)
+            self._avaliar(route)
+            return result
+
+    def stats(self) -> dict:
+        return {
+            "decisions": dict(self.decisions),
+            "routes": {r.name: r.stats() for r in (self.fast, self.large)},
+        }
+
+
+def routed(router: ModelRouter) -> Runnable:
+    """Runnable que entrega cada prompt à rota escolhida pelo `router`."""
+
+    def chamar(input: Any, config: RunnableConfig) -> AIMessage:
+        return router.call(input, config)
+
+    async def achamar(input: Any, config: RunnableConfig) -> AIMessage:
+        return await router.acall(input, config)
+
+    return RunnableLambda(chamar, afunc=achamar, name="model_router")
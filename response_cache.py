@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script response_cache.py
+========================
+Cache de respostas do LLM para prompts repetidos.
+
+Muitas threads começam com as mesmas perguntas e o mesmo system message.
+Com `temperature=0.0` a resposta para o mesmo prompt é (praticamente) a
+mesma, então o ResponseCache guarda a resposta pela chave:
+
+    sha256(modelo, temperatura, system message, janela de mensagens)
+
+A janela é a que o ChatNode envia ao LLM, já recortada pelo FilterNode.
+Só o tipo e o texto de cada mensagem entram na chave (ids e metadados
+não), com espaços nas pontas removidos. Num acerto a chamada de rede não
+acontece.
+
+Dois níveis:
+- memória: LRU com `max_entries` respostas;
+- SQLite (opcional, `db_path`): sobrevive a reinícios e é dividido entre
+  processos; entradas mais velhas que `ttl` segundos são ignoradas e
+  apagadas.
+
+Com temperatura diferente de 0 o cache não é usado (a resposta deve
+variar). Num acerto não há tokens no streaming: a resposta aparece
+inteira no fim do nó.
+
+Configuração por variáveis de ambiente:
+  RESPONSE_CACHE=1                 (padrão: 0, sem cache)
+  RESPONSE_CACHE_ENTRIES=1024
+  RESPONSE_CACHE_DB=llm_cache.db   (vazio = só memória)
+  RESPONSE_CACHE_TTL_S=86400
+
+Exemplo
+-------
+cache = ResponseCache("llama-3.3-70b-versatile", 0.0, db_path="llm_cache.db")
+llm_model = prompt_template | cached_llm(llm, cache)
+print(cache.stats())
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from storage_profiles import connect
+
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RESPONSE_CACHE_ENTRIES", "1024"))
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "")
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL_S", "86400"))
+
+# A cada quantas gravações as entradas vencidas são apagadas do SQLite
+PURGE_EVERY = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+def cache_key(model: str, temperature: float, input: Any) -> str:
+    """Hash estável do modelo, da temperatura e das mensagens do prompt."""
+    mensagens = input.to_messages() if hasattr(input, "to_messages") else input
+    if not isinstance(mensagens, list):
+        mensagens = [mensagens]
+    normalizadas = [
+        [getattr(m, "type", "text"), str(getattr(m, "content", m)).strip()]
+        for m in mensagens
+    ]
+    texto = json.dumps(
+        [model, float(temperature), normalizadas],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Respostas do LLM por prompt, em memória (LRU) e opcionalmente no SQLite.
+
+    Args:
+        model: Nome do modelo (entra na chave)
+        temperature: Temperatura do modelo; diferente de 0 desliga o cache
+        max_entries: Respostas mantidas em memória
+        db_path: Arquivo SQLite do segundo nível (None = só memória)
+        ttl: Segundos de validade de uma resposta no SQLite
+    """
+
+    def __init__(
+        self,
+        model: str,
+        temperature: float = 0.0,
+        max_entries: int = RESPONSE_CACHE_ENTRIES,
+        db_path: Optional[str] = RESPONSE_CACHE_DB or None,
+        ttl: float = RESPONSE_CACHE_TTL,
+    ) -> None:
+        self.model = model
+        self.temperature = temperature
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = temperature == 0.0
+        self._memoria: "OrderedDict[str, dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            self.conn = connect(db_path, check_same_thread=False)
+            self.conn.execute(SCHEMA)
+            self.conn.commit()
+        self.memory_hits = 0
+        self.sqlite_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.stores = 0
+
+    def key(self, input: Any) -> str:
+        return cache_key(self.model, self.temperature, input)
+
+    def get(self, key: str) -> Optional[dict]:
+        """Resposta guardada para a chave, ou None."""
+        with self._lock:
+            resposta = self._memoria.get(key)
+            if resposta is not None:
+                self._memoria.move_to_end(key)
+                self.memory_hits += 1
+                return resposta
+            if self.conn is not None:
+                linha = self.conn.execute(
+                    "SELECT response, created_at FROM llm_response_cache WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                if linha and time.time() - linha[1] <= self.ttl:
+                    resposta = json.loads(linha[0])
+                    self._guardar_memoria(key, resposta)
+                    self.sqlite_hits += 1
+                    return resposta
+                if linha:
+                    self.conn.execute(
+                        "DELETE FROM llm_response_cache WHERE key = ?", (key,)
+                    )
+                    self.conn.commit()
+                    self.expired += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: str, message: AIMessage) -> None:
+        resposta = {
+            "content": message.content,
+            "response_metadata": message.response_metadata,
+        }
+        with self._lock:
+            self._guardar_memoria(key, resposta)
+            self.stores += 1
+            if self.conn is None:
+                return
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_response_cache VALUES (?, ?, ?, ?)",
+                (key, self.model, json.dumps(resposta, default=str), time.time()),
+            )
+            if self.stores % PURGE_EVERY == 0:
+                self._apagar_vencidas()
+            self.conn.commit()
+
+    def _guardar_memoria(self, key: str, resposta: dict) -> None:
+        self._memoria[key] = resposta
+        self._memoria.move_to_end(key)
+        while len(self._memoria) > self.max_entries:
+            self._memoria.popitem(last=False)
+
+    def _apagar_vencidas(self) -> None:
+        cursor = self.conn.execute(
+            "DELETE FROM llm_response_cache WHERE created_at < ?",
+            (time.time() - self.ttl,),
+        )
+        self.expired += cursor.rowcount
+
+    def purge_expired(self) -> None:
+        """Apaga do SQLite as respostas mais velhas que `ttl`."""
+        if self.conn is None:
+            return
+        with self._lock:
+            self._apagar_vencidas()
+            self.conn.commit()
+
+    def close(self) -> None:
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.sqlite_hits
+        total = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "memory_hits": self.memory_hits,
+            "sqlite_hits": self.sqlite_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "stores": self.stores,
+            "expired": self.expired,
+            "memory_entries": len(self._memoria),
+        }
+
+
+def _mensagem(resposta: dict) -> AIMessage:
+    """AIMessage nova (id novo a cada uso) a partir da resposta guardada."""
+    return AIMessage(
+        content=resposta["content"],
+        response_metadata={**resposta["response_metadata"], "cache_hit": True},
+    )
+
+
+async def _direto(func, *args) -> Any:
+    return func(*args)
+
+
+def cached_llm(runnable: Runnable, cache: ResponseCache) -> Runnable:
+    """Envolve um modelo (ex.: ChatGroq) para responder do `cache` quando possível."""
+    if not cache.enabled:
+        return runnable
+
+    def chamar(input: Any, config: RunnableConfig) -> AIMessage:
+        key = cache.key(input)
+        resposta = cache.get(key)
+        if resposta is not None:
+            return _mensagem(resposta)
+        result = runnable.invoke(input, config)
+        cache.put(key, result)
+        return result
+
+    async def achamar(input: Any, config: RunnableConfig) -> AIMessage:
+        # Só o nível SQLite faz I/O; a memória é consultada no próprio loop
+        em_thread = asyncio.to_thread if cache.conn is not None else _direto
+        key = cache.key(input)
+        resposta = await em_thread(cache.get, key)
+        if resposta is not None:
+            return _mensagem(resposta)
+        result = await runnable.ainvoke(input, config)
+        await em_thread(cache.put, key, result)
+        return result
+
+    return RunnableLambda(chamar, afunc=achamar, name="cached_llm")
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script session_scheduler.py
+===========================
+Agendador de turnos: um de cada vez por thread_id, em paralelo entre
+threads diferentes.
+
+Duas chamadas `graph.ainvoke` concorrentes na mesma thread leem o mesmo
+checkpoint pai; as duas gravam um checkpoint filho e a mensagem de uma
+delas some do histórico (o `add_messages` da outra não a viu). O
+SessionScheduler dá a cada thread_id um lock próprio (uma fila FIFO de
+turnos) e limita o total de turnos em execução com um semáforo global.
+
+A ordem é: primeiro o lock da thread, depois a vaga global. Assim um
+turno parado na fila da sua thread não ocupa uma vaga que outra thread
+poderia usar.
+
+Métricas (`stats()`): turnos em execução, turnos na fila (por thread e
+no total), maior fila já vista, turnos concluídos e espera média.
+
+Exemplo
+-------
+scheduler = SessionScheduler(graph, max_concurrent=64)
+state = await scheduler.ainvoke({"messages": ["Olá!"]}, config)
+async with scheduler.slot("usuario_1"):
+    await graph.aupdate_state(...)
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+
+class _Sessao:
+    """Lock de uma thread_id e quantos turnos dela existem (fila + execução)."""
+
+    __slots__ = ("lock", "depth")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.depth = 0
+
+
+class SessionScheduler:
+    """
+    Serializa os turnos de cada thread_id e limita a concorrência global.
+
+    Args:
+        graph: Graph compilado (usado por `ainvoke`/`astream`)
+        max_concurrent: Máximo de turnos em execução ao mesmo tempo
+    """
+
+    def __init__(self, graph: Any = None, max_concurrent: int = 512) -> None:
+        self.graph = graph
+        self.max_concurrent = max_concurrent
+        self._semaforo = asyncio.Semaphore(max_concurrent)
+        self._sessoes: Dict[str, _Sessao] = {}
+        self.running = 0
+        self.completed = 0
+        self.peak_depth = 0
+        self._espera_total = 0.0
+
+    @asynccontextmanager
+    async def slot(self, thread_id: str) -> AsyncIterator[None]:
+        """Reserva a vez da thread e uma vaga global durante o bloco."""
+        sessao = self._sessoes.get(thread_id)
+        if sessao is None:
+            sessao = self._sessoes[thread_id] = _Sessao()
+        sessao.depth += 1
+        self.peak_depth = max(self.peak_depth, sessao.depth)
+        inicio = time.perf_counter()
+        try:
+            async with sessao.lock, self._semaforo:
+                self._espera_total += time.perf_counter() - inicio
+                self.running += 1
+                try:
+                    yield
+                finally:
+                    self.running -= 1
+                    self.completed += 1
+        finally:
+            sessao.depth -= 1
+            if sessao.depth == 0:
+                # Threads ociosas não ficam guardadas para sempre
+                del self._sessoes[thread_id]
+
+    async def ainvoke(self, input: Any, config: dict, **kwargs) -> Any:
+        """`graph.ainvoke` na vez da thread de `config`."""
+        async with self.slot(config["configurable"]["thread_id"]):
+            return await self.graph.ainvoke(input, config=config, **kwargs)
+
+    async def astream(self, input: Any, config: dict, **kwargs) -> AsyncIterator:
+        """`graph.astream` na vez da thread de `config`."""
+        async with self.slot(config["configurable"]["thread_id"]):
+            async for item in self.graph.astream(input, config=config, **kwargs):
+                yield item
+
+    def queue_depth(self, thread_id: str) -> int:
+        """Turnos da thread esperando a vez (sem contar o que está rodando)."""
+        sessao = self._sessoes.get(thread_id)
+        return max(sessao.depth - 1, 0) if sessao else 0
+
+    def stats(self) -> dict:
+        total = sum(s.depth for s in self._sessoes.values())
+        iniciados = self.completed + self.running
+        return {
+            "running": self.running,
+            "queued": total - self.running,
+            "active_threads": len(self._sessoes),
+            "max_queue_depth": max(
+                (s.depth - 1 for s in self._sessoes.values()), default=0
+            ),
+            "peak_depth": self.peak_depth,
+            "completed": self.completed,
+            "mean_wait_ms": 1000 * self._espera_total / max(iniciados, 1),
+        }
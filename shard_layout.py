@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script shard_layout.py
+======================
+Onde fica cada thread quando os checkpoints são divididos em shards
+(ver sharded_saver.py):
+
+    chatbot_memory.db, 4 shards → chatbot_memory.0-of-4.db ... chatbot_memory.3-of-4.db
+
+Só usa a biblioteca padrão: os visualizadores e o ledger de uso localizam
+os arquivos sem importar langgraph.
+"""
+import glob
+import hashlib
+import os
+import re
+import sqlite3
+from typing import Dict, List
+
+from storage_profiles import connect_readonly
+
+
+def shard_index(thread_id: str, shards: int) -> int:
+    """Shard de uma thread (estável entre processos, ao contrário de hash())."""
+    digest = hashlib.blake2b(str(thread_id).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % shards
+
+
+def shard_paths(db_path: str, shards: int) -> List[str]:
+    """Arquivos dos shards; com 1 shard é o próprio `db_path`."""
+    if shards <= 1:
+        return [db_path]
+    raiz, ext = os.path.splitext(db_path)
+    return [f"{raiz}.{i}-of-{shards}{ext}" for i in range(shards)]
+
+
+def shard_layouts(db_path: str) -> Dict[int, List[str]]:
+    """
+    Arquivos de shards existentes agrupados pelo número de shards.
+
+    Returns:
+        {N: arquivos "i-of-N" encontrados, em ordem de i}
+    """
+    raiz, ext = os.path.splitext(db_path)
+    padrao = re.compile(re.escape(raiz) + r"\.(\d+)-of-(\d+)" + re.escape(ext) + "$")
+    encontrados = []
+    for caminho in glob.glob(f"{glob.escape(raiz)}.*-of-*{ext}"):
+        if m := padrao.match(caminho):
+            encontrados.append((int(m.group(2)), int(m.group(1)), caminho))
+    layouts: Dict[int, List[str]] = {}
+    for total, _, caminho in sorted(encontrados):
+        layouts.setdefault(total, []).append(caminho)
+    return layouts
+
+
+def has_checkpoints(conn: sqlite3.Connection) -> bool:
+    """
+    O arquivo tem a tabela `checkpoints` (o SqliteSaver só a cria na
+    primeira escrita, então um shard recém-aberto ainda não tem).
+    """
+    return (
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'checkpoints'"
+        ).fetchone()
+        is not None
+    )
+
+
+def _tem_conversas(path: str) -> bool:
+    conn = connect_readonly(path)
+    try:
+        return (
+            has_checkpoints(conn)
+            and conn.execute("SELECT 1 FROM checkpoints LIMIT 1").fetchone() is not None
+        )
+    finally:
+        conn.close()
+
+
+def check_layout(db_path: str, shards: int) -> None:
+    """
+    Confere, antes de abrir os bancos, que não há conversas gravadas com
+    outro número de shards.
+
+    Ao mudar CHECKPOINT_SHARDS (ex.: de 1 para 4 com um chatbot_memory.db
+    já usado) cada thread passa a ser procurada em outro arquivo e todas as
+    conversas anteriores somem sem aviso.
+
+    Raises:
+        ValueError: Há checkpoints fora dos arquivos de `shards`
+    """
+    proprios = set(shard_paths(db_path, shards))
+    outros = [
+        caminho
+        for caminho in find_shards(db_path)
+        if caminho not in proprios and _tem_conversas(caminho)
+    ]
+    if outros:
+        raise ValueError(
+            f"Há conversas de '{db_path}' gravadas com outro número de shards "
+            f"({', '.join(outros)}) que ficariam invisíveis com "
+            f"CHECKPOINT_SHARDS={shards}; volte ao número anterior ou mova os "
+            "arquivos antigos"
+        )
+
+
+def find_shards(db_path: str) -> List[str]:
+    """
+    Arquivos de checkpoints existentes para `db_path` (shards e/ou o original).
+
+    Usado pelos visualizadores, que não sabem com quantos shards o chatbot
+    foi iniciado.
+    """
+    caminhos = [c for arquivos in shard_layouts(db_path).values() for c in arquivos]
+    if os.path.exists(db_path):
+        caminhos.insert(0, db_path)
+    return caminhos
+
+
+def shard_for_thread(db_path: str, thread_id: str) -> str:
+    """
+    Arquivo onde o chatbot grava a thread (conforme os shards existentes).
+
+    O shard depende do número de shards, então só funciona com um único
+    layout completo (todos os arquivos "i-of-N"). Com dois layouts (ex.:
+    2-of-2 e 4-of-4 depois de mudar CHECKPOINT_SHARDS) a thread pode estar
+    em qualquer um deles.
+
+    Raises:
+        ValueError: Mais de um layout, ou um layout com arquivos faltando
+    """
+    layouts = shard_layouts(db_path)
+    if not layouts:
+        return db_path
+    if len(layouts) > 1:
+        raise ValueError(
+            f"Há mais de um conjunto de shards para '{db_path}' "
+            f"({', '.join(f'{n} shards' for n in layouts)}); "
+            "use um único CHECKPOINT_SHARDS ou mova os arquivos antigos"
+        )
+    ((total, arquivos),) = layouts.items()
+    if len(arquivos) != total:
+        raise ValueError(
+            f"Shards incompletos para '{db_path}': {len(arquivos)} de {total} arquivos"
+        )
+    return arquivos[shard_index(thread_id, total)]
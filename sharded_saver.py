@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script sharded_saver.py
+=======================
+Checkpointer que distribui as threads entre N arquivos SQLite.
+
+Com um único `chatbot_memory.db` todas as conversas disputam o mesmo lock
+de escrita. O ShardedCheckpointSaver escolhe o arquivo ("shard") de cada
+`thread_id` por um hash estável (BLAKE2b, igual em qualquer processo e
+execução), então cada shard tem seu próprio lock e as escritas de
+conversas diferentes podem acontecer em paralelo.
+
+Os arquivos ficam ao lado do banco original:
+
+    chatbot_memory.db, 4 shards → chatbot_memory.0-of-4.db ... chatbot_memory.3-of-4.db
+
+`get_tuple`, `put`, `put_writes` e `delete_thread` vão direto ao shard da
+thread; `list` sem thread_id consulta todos os shards e junta os
+resultados (do checkpoint mais novo para o mais antigo).
+
+Configuração por variável de ambiente:
+  CHECKPOINT_SHARDS=4   (padrão: 1, um único arquivo)
+
+A escolha do shard (`shard_index`, `shard_paths`, `find_shards`) fica em
+shard_layout.py, sem dependências, para os visualizadores.
+
+Exemplo
+-------
+savers = [SqliteSaver(connect(p)) for p in shard_paths("chatbot_memory.db", 4)]
+graph = build_graph(ShardedCheckpointSaver(savers))
+"""
+import copy
+import heapq
+from typing import Any, AsyncIterator, Iterator, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+from shard_layout import shard_index
+
+
+def _newest_first(listas: List[List[CheckpointTuple]]) -> Iterator[CheckpointTuple]:
+    """Junta listas já ordenadas do mais novo para o mais antigo."""
+    # Ids de checkpoint são UUID v6: a ordem do texto é a ordem do tempo
+    return heapq.merge(*listas, key=lambda t: t.checkpoint["id"], reverse=True)
+
+
+class ShardedCheckpointSaver(BaseCheckpointSaver):
+    """
+    Roteia cada thread_id para um dos checkpointers de `savers`.
+
+    Args:
+        savers: Um checkpointer por shard, na ordem de `shard_paths`
+    """
+
+    def __init__(self, savers: Sequence[BaseCheckpointSaver]) -> None:
+        if not savers:
+            raise ValueError("ShardedCheckpointSaver precisa de pelo menos um shard")
+        super().__init__(serde=savers[0].serde)
+        self.savers = list(savers)
+
+    def saver_for(self, config: RunnableConfig) -> BaseCheckpointSaver:
+        thread_id = config["configurable"]["thread_id"]
+        return self.savers[shard_index(thread_id, len(self.savers))]
+
+    # ------------------------------------------------------------------ síncrono
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.saver_for(config).get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        if config is not None and "thread_id" in config.get("configurable", {}):
+            yield from self.saver_for(config).list(
+                config, filter=filter, before=before, limit=limit
+            )
+            return
+        # Sem thread: cada shard já devolve do mais novo para o mais antigo
+        listas = [
+            [*saver.list(config, filter=filter, before=before, limit=limit)]
+            for saver in self.savers
+        ]
+        for n, tupla in enumerate(_newest_first(listas)):
+            if limit is not None and n >= limit:
+                return
+            yield tupla
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.saver_for(config).put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        self.saver_for(config).put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.saver_for({"configurable": {"thread_id": thread_id}}).delete_thread(
+            thread_id
+        )
+
+    # ------------------------------------------------------------------ assíncrono
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await self.saver_for(config).aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        if config is not None and "thread_id" in config.get("configurable", {}):
+            async for tupla in self.saver_for(config).alist(
+                config, filter=filter, before=before, limit=limit
+            ):
+                yield tupla
+            return
+        listas = []
+        for saver in self.savers:
+            listas.append(
+                [
+                    tupla
+                    async for tupla in saver.alist(
+                        config, filter=filter, before=before, limit=limit
+                    )
+                ]
+            )
+        for n, tupla in enumerate(_newest_first(listas)):
+            if limit is not None and n >= limit:
+                return
+            yield tupla
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return await self.saver_for(config).aput(
+            config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self.saver_for(config).aput_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self.saver_for({"configurable": {"thread_id": thread_id}}).adelete_thread(
+            thread_id
+        )
+
+    # ------------------------------------------------------------------ delegação
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.savers[0].get_next_version(current, channel)
+
+    def with_allowlist(self, extra_allowlist) -> "ShardedCheckpointSaver":
+        savers = [saver.with_allowlist(extra_allowlist) for saver in self.savers]
+        if all(novo is antigo for novo, antigo in zip(savers, self.savers)):
+            return self
+        clone = copy.copy(self)
+        clone.savers, clone.serde = savers, savers[0].serde
+        return clone
@@ -17,6 +17,28 @@ import sqlite3
 import json
 import pickle
 
+from storage_profiles import connect_readonly
+
+
+def armazenamento_por_tabela(conn: sqlite3.Connection) -> dict:
+    """
+    Linhas e bytes gravados em checkpoints, writes e message_blobs.
+    """
+    relatorio = {}
+    for tabela, coluna in (
+        ("checkpoints", "LENGTH(checkpoint) + LENGTH(metadata)"),
+        ("writes", "LENGTH(value)"),
+        ("message_blobs", "LENGTH(value)"),
+    ):
+        try:
+            linhas, total = conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM({coluna}), 0) FROM {tabela}"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            linhas, total = 0, 0  # Tabela inexistente (banco sem deduplicação)
+        relatorio[tabela] = {"rows": linhas, "bytes": total}
+    return relatorio
+
 
 def visualizar_estrutura_banco(db_path: str = "chatbot_memory.db"):
     """
@@ -27,7 +49,7 @@ def visualizar_estrutura_banco(db_path: str = "chatbot_memory.db"):
     print("=" * 80)
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect_readonly(db_path)
         cursor = conn.cursor()
         
         # Lista todas as tabelas
@@ -75,7 +97,7 @@ def visualizar_checkpoints(db_path: str = "chatbot_memory.db", limit: int = 10):
     print("=" * 80)
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect_readonly(db_path)
         cursor = conn.cursor()
         
         # Busca checkpoints
@@ -114,6 +136,11 @@ def visualizar_checkpoints(db_path: str = "chatbot_memory.db", limit: int = 10):
             except Exception:
                 print("  Dados: [binário]")
         
+        # Bytes por tabela (message_blobs só existe com DEDUP_MESSAGES=1)
+        print("\n📦 Armazenamento por tabela:")
+        for tabela, info in armazenamento_por_tabela(conn).items():
+            print(f"  • {tabela}: {info['rows']} linhas, {info['bytes'] / 1024:.1f} KB")
+        
         conn.close()
         
     except sqlite3.Error as e:
@@ -131,7 +158,7 @@ def visualizar_writes(db_path: str = "chatbot_memory.db", limit: int = 20):
     print("=" * 80)
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect_readonly(db_path)
         cursor = conn.cursor()
         
         # Busca writes
@@ -202,7 +229,7 @@ def visualizar_conversas_por_thread(db_path: str = "chatbot_memory.db"):
     print("=" * 80)
     
     try:
-        conn = sqlite3.connect(db_path)
+        conn = connect_readonly(db_path)
         cursor = conn.cursor()
         
         # Agrupa por thread_id
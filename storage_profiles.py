@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script storage_profiles.py
+==========================
+Perfis de armazenamento (PRAGMAs do SQLite) para o `chatbot_memory.db`.
+
+O `sqlite3.connect` padrão usa um cache de ~2 MB, nenhum mmap e
+synchronous=FULL; o modo do journal é o que o SqliteSaver deixa no
+arquivo (WAL). Aqui cada perfil define, de uma vez, o modo do journal, o
+nível de `synchronous`, o mmap, o cache de páginas e o tempo de espera
+por locks, e o chatbot e o motor assíncrono abrem o banco com o mesmo
+perfil:
+
+- default:    não executa nenhum PRAGMA (mesmo comportamento de antes dos
+              perfis)
+- durable:    WAL + synchronous=FULL (todo commit vai ao disco)
+- fast:       WAL + synchronous=NORMAL, checkpoints do WAL mais espaçados
+              (um crash do SO pode perder os últimos commits, nunca
+              corromper o banco)
+- read-heavy: WAL + synchronous=NORMAL com mmap e cache grandes, para
+              muitos leitores (visualizadores, várias sessões)
+
+Os visualizadores usam `connect_readonly`: abrem o arquivo em modo
+somente leitura (`mode=ro`, sem criá-lo se não existir) e só aplicam os
+PRAGMAs que valem para a conexão (mmap, cache e busy_timeout).
+
+Configuração por variável de ambiente:
+  SQLITE_PROFILE=default|durable|fast|read-heavy   (padrão: default)
+
+Run
+---
+uv run storage_profiles.py --db chatbot_memory.db   # mostra os PRAGMAs em uso
+uv run storage_profiles.py --profile fast            # ... e os que o perfil aplica
+
+Só lê o banco: não aplica o perfil nem cria o arquivo.
+"""
+import argparse
+import os
+import sqlite3
+from typing import Dict, List, Optional
+from urllib.request import pathname2url
+
+MB = 1024 * 1024
+
+PROFILES: Dict[str, dict] = {
+    "default": {},
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -8 * 1024,  # Negativo = KiB
+        "busy_timeout": 5000,  # ms
+        "wal_autocheckpoint": 1000,  # páginas
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * MB,
+        "cache_size": -64 * 1024,
+        "busy_timeout": 5000,
+        "wal_autocheckpoint": 4000,
+    },
+    "read-heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 1024 * MB,
+        "cache_size": -256 * 1024,
+        "busy_timeout": 15000,
+        "wal_autocheckpoint": 1000,
+    },
+}
+
+DEFAULT_PROFILE = "default"
+
+# PRAGMAs controlados pelos perfis
+PRAGMAS = (
+    "journal_mode",
+    "synchronous",
+    "mmap_size",
+    "cache_size",
+    "busy_timeout",
+    "wal_autocheckpoint",
+)
+
+# PRAGMAs que só valem para a conexão (não gravam nada no arquivo)
+READ_ONLY_PRAGMAS = ("busy_timeout", "mmap_size", "cache_size")
+
+
+def profile_name(profile: Optional[str] = None) -> str:
+    """Nome do perfil (argumento, SQLITE_PROFILE ou o padrão)."""
+    nome = profile or os.getenv("SQLITE_PROFILE", DEFAULT_PROFILE)
+    if nome not in PROFILES:
+        raise ValueError(
+            f"Perfil de armazenamento inválido: {nome} (use {', '.join(PROFILES)})"
+        )
+    return nome
+
+
+def profile_pragmas(profile: Optional[str] = None) -> List[str]:
+    """Comandos PRAGMA do perfil, na ordem em que devem ser executados."""
+    # O busy_timeout vem primeiro: trocar o journal_mode pode esperar um lock
+    pragmas = PROFILES[profile_name(profile)]
+    ordem = sorted(pragmas, key=lambda nome: nome != "busy_timeout")
+    return [f"PRAGMA {nome} = {pragmas[nome]}" for nome in ordem]
+
+
+def apply_profile(
+    conn: sqlite3.Connection, profile: Optional[str] = None
+) -> sqlite3.Connection:
+    """Aplica o perfil numa conexão já aberta e a devolve."""
+    for pragma in profile_pragmas(profile):
+        conn.execute(pragma).fetchall()
+    return conn
+
+
+async def aapply_profile(conn, profile: Optional[str] = None):
+    """Versão para conexões do aiosqlite (AsyncChatEngine)."""
+    for pragma in profile_pragmas(profile):
+        await (await conn.execute(pragma)).fetchall()
+    return conn
+
+
+def connect(
+    db_path: str, profile: Optional[str] = None, **kwargs
+) -> sqlite3.Connection:
+    """`sqlite3.connect` com o perfil de armazenamento aplicado."""
+    return apply_profile(sqlite3.connect(db_path, **kwargs), profile)
+
+
+def connect_readonly(
+    db_path: str, profile: Optional[str] = None, **kwargs
+) -> sqlite3.Connection:
+    """
+    Abre o banco só para leitura (visualizadores).
+
+    Usa uma URI `mode=ro`, então um arquivo inexistente gera
+    sqlite3.OperationalError em vez de ser criado, e do perfil só aplica
+    os PRAGMAs da conexão (nada de journal_mode/wal_autocheckpoint).
+    """
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, **kwargs)
+    pragmas = PROFILES[profile_name(profile)]
+    for nome in READ_ONLY_PRAGMAS:
+        if nome in pragmas:
+            conn.execute(f"PRAGMA {nome} = {pragmas[nome]}").fetchall()
+    return conn
+
+
+def current_settings(conn: sqlite3.Connection) -> dict:
+    """Valores atuais dos PRAGMAs controlados pelos perfis."""
+    return {nome: conn.execute(f"PRAGMA {nome}").fetchone()[0] for nome in PRAGMAS}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfis de armazenamento do SQLite")
+    parser.add_argument("--db", default="chatbot_memory.db")
+    parser.add_argument("--profile", choices=list(PROFILES))
+    args = parser.parse_args()
+
+    try:
+        conn = connect_readonly(args.db)
+    except sqlite3.OperationalError as e:
+        raise SystemExit(f"❌ Não foi possível abrir '{args.db}': {e}")
+    print(f"📦 PRAGMAs em uso em '{args.db}':")
+    for nome, valor in current_settings(conn).items():
+        print(f"   {nome:<20} {valor}")
+    conn.close()
+
+    print(f"\n⚙️  Perfil '{profile_name(args.profile)}' aplica:")
+    for pragma in profile_pragmas(args.profile) or ["(nenhum PRAGMA)"]:
+        print(f"   {pragma}")
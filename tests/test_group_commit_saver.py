@@ -0,0 +1,91 @@
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script test_group_commit_saver.py
+=================================
+Falhas no meio de um lote do GroupCommitSqliteSaver: ninguém pode ficar
+esperando um COMMIT que não vem.
+
+Rodar com:
+
+uv run pytest tests/
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from group_commit_saver import GroupCommitSqliteSaver
+
+TIMEOUT = 5.0
+
+
+class FalhaNaEscrita(Exception):
+    pass
+
+
+@pytest.fixture
+def saver(tmp_path):
+    conn = sqlite3.connect(tmp_path / "gc.db", check_same_thread=False)
+    conn.execute("CREATE TABLE t (v TEXT)")
+    conn.commit()
+    saver = GroupCommitSqliteSaver(conn, window=0.5, max_batch=64)
+    yield saver
+    conn.close()
+
+
+def _escreve(saver, valor, falha=False):
+    with saver.cursor() as cur:
+        cur.execute("INSERT INTO t VALUES (?)", (valor,))
+        if falha:
+            raise FalhaNaEscrita(valor)
+
+
+def _valores(saver):
+    with saver.lock:
+        return sorted(v for (v,) in saver.conn.execute("SELECT v FROM t"))
+
+
+def _em_thread(alvo, *args):
+    resultado = {}
+
+    def rodar():
+        try:
+            alvo(*args)
+            resultado["ok"] = True
+        except Exception as e:
+            resultado["erro"] = e
+
+    thread = threading.Thread(target=rodar, daemon=True)
+    thread.start()
+    return thread, resultado
+
+
+def test_lider_que_falha_nao_trava_o_proximo_lote(saver):
+    with pytest.raises(FalhaNaEscrita):
+        _escreve(saver, "lider", falha=True)
+
+    thread, resultado = _em_thread(_escreve, saver, "seguidora")
+    thread.join(TIMEOUT)
+
+    assert not thread.is_alive(), "a escrita seguinte ficou esperando o lote"
+    assert resultado == {"ok": True}
+    assert _valores(saver) == ["seguidora"]
+
+
+def test_falha_no_meio_do_lote_acorda_a_lider(saver):
+    lider, resultado = _em_thread(_escreve, saver, "lider")
+    # A líder já registrou a escrita e está na janela esperando o lote
+    while saver.group_commit.records == 0:
+        pass
+
+    with pytest.raises(FalhaNaEscrita):
+        _escreve(saver, "seguidora", falha=True)
+    lider.join(TIMEOUT)
+
+    assert not lider.is_alive(), "a líder ficou esperando um lote desfeito"
+    assert isinstance(resultado.get("erro"), FalhaNaEscrita)
+    assert _valores(saver) == []
+
+    _escreve(saver, "depois")
+    assert _valores(saver) == ["depois"]
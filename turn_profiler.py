@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script turn_profiler.py
+=======================
+Perfil (profiling) opcional de turnos do chatbot: onde foi o tempo de um
+turno lento (renderização do `prompt_template`, desserialização das
+mensagens, `filter_node`, SQLite ou rede)?
+
+Com PROFILE_TURNS=N, um a cada N turnos de cada thread é perfilado
+(1 = todos) e o resultado vai para um arquivo por turno:
+
+    profiles/run-20260101-120000-4242/usuario_1--turn00003.prof
+
+Dois modos (PROFILE_MODE):
+  cprofile   cProfile determinístico (`.prof`, lido pelo pstats/snakeviz).
+             Mede a thread que executa o turno; as escritas que o
+             LangGraph faz em segundo plano ficam de fora.
+  sample     Amostra a pilha de TODAS as threads a cada PROFILE_INTERVAL
+             segundos (`.folded`, formato do flamegraph.pl/speedscope).
+             Mais barato e inclui as threads do checkpointer; as threads
+             ociosas dos pools são descartadas.
+
+Atenção em processos assíncronos (AsyncChatEngine, batch_runner,
+chat_server): o perfil fica ligado entre o início e o fim do turno, mas
+a cada `await` o event loop roda as outras sessões. Nos dois modos o
+arquivo do turno inclui o trabalho de todas as sessões que o loop
+executou nesse intervalo (no cprofile essas funções aparecem como se
+fossem do turno). Com muitas sessões simultâneas, leia os perfis como uma
+amostra do processo naquele momento, não como o custo do turno; para
+isolar um turno, perfile com uma única sessão (ex.: batch_runner com
+`--concurrency 1`). Só um turno é perfilado por vez; os que coincidem com
+ele são contados em `skipped` e seguem sem perfil.
+
+O comando `summary` junta todos os arquivos de um diretório e lista as
+funções mais quentes.
+
+Configuração por variáveis de ambiente:
+  PROFILE_TURNS=1              (padrão: 0, desligado; N = um a cada N turnos)
+  PROFILE_MODE=cprofile        (cprofile | sample)
+  PROFILE_DIR=profiles
+  PROFILE_INTERVAL=0.001       (segundos entre amostras no modo sample)
+
+Run
+---
+PROFILE_TURNS=1 uv run chatbot_with_memory_checkpoints.py
+uv run batch_runner.py conversas.jsonl --stub --profile-every 10
+uv run turn_profiler.py summary profiles --top 25
+uv run turn_profiler.py summary profiles --sort total --thread usuario_1
+"""
+import argparse
+import contextlib
+import cProfile
+import glob
+import linecache
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PROFILE_TURNS = int(os.getenv("PROFILE_TURNS", "0"))
+PROFILE_MODE = os.getenv("PROFILE_MODE", "cprofile")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.001"))
+
+MODES = {"cprofile": ".prof", "sample": ".folded"}
+
+# Linha de uma thread bloqueada esperando o próximo item de uma fila
+_ESPERA_NA_FILA = re.compile(r"\b\w+\.get\((block=True)?\)")
+
+
+def _frame_label(code) -> str:
+    """`nome (arquivo:linha da definição)`: o mesmo rótulo nos dois modos."""
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def _ocioso(frame) -> bool:
+    """
+    Thread esperando trabalho numa fila (pools, worker do aiosqlite): não diz
+    nada sobre o turno. A espera do event loop no `select` é mantida (é o
+    tempo de rede/timers do turno).
+    """
+    linha = linecache.getline(frame.f_code.co_filename, frame.f_lineno)
+    if _ESPERA_NA_FILA.search(linha):
+        return True
+    # Pool de threads parado em Condition.wait (dentro do _worker)
+    while frame is not None:
+        if frame.f_code.co_name == "_worker" and frame.f_code.co_filename.endswith(
+            os.path.join("futures", "thread.py")
+        ):
+            return True
+        frame = frame.f_back
+    return False
+
+
+class StackSampler:
+    """
+    Amostrador de pilhas de todas as threads do processo.
+
+    Args:
+        interval: Segundos entre duas amostras
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL) -> None:
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _amostrar(self) -> None:
+        proprio = threading.get_ident()
+        nomes = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == proprio or _ocioso(frame):
+                continue
+            pilha = []
+            while frame is not None:
+                pilha.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            pilha.reverse()
+            if pilha:
+                self.stacks[(nomes.get(ident, str(ident)), *pilha)] += 1
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._amostrar()
+
+    def start(self) -> "StackSampler":
+        self._thread = threading.Thread(
+            target=self._loop, name="turn-profiler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def write(self, path: str) -> None:
+        """Pilhas no formato "folded": `thread;raiz;...;folha contagem`."""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# interval={self.interval}\n")
+            for pilha, n in self.stacks.most_common():
+                f.write(";".join(pilha) + f" {n}\n")
+
+
+class TurnProfiler:
+    """
+    Perfila um a cada `every` turnos de cada thread.
+
+    Uso:
+        with profiler.turn(thread_id):
+            graph.invoke(...)
+
+    Args:
+        directory: Diretório raiz dos perfis (cada execução ganha um subdiretório)
+        every: Perfila o turno 1, 1 + every, 1 + 2*every... de cada thread
+        mode: "cprofile" ou "sample"
+        interval: Segundos entre amostras (modo sample)
+    """
+
+    def __init__(
+        self,
+        directory: str = PROFILE_DIR,
+        every: int = PROFILE_TURNS or 1,
+        mode: str = PROFILE_MODE,
+        interval: float = PROFILE_INTERVAL,
+    ) -> None:
+        if mode not in MODES:
+            raise ValueError(f"PROFILE_MODE deve ser um de {sorted(MODES)}: {mode!r}")
+        self.every = max(1, every)
+        self.mode = mode
+        self.interval = interval
+        self.directory = os.path.join(
+            directory, time.strftime("run-%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        )
+        self._turnos: Counter = Counter()  # Turnos vistos por thread
+        self._ocupado = threading.Lock()  # Um perfil por vez
+        self.profiled = 0
+        self.skipped = 0
+
+    def path_for(self, thread_id: str, turn: int) -> str:
+        nome = re.sub(r"[^\w.-]", "_", str(thread_id))
+        return os.path.join(self.directory, f"{nome}--turn{turn:05d}{MODES[self.mode]}")
+
+    @contextlib.contextmanager
+    def turn(self, thread_id: str) -> Iterator[Optional[str]]:
+        """
+        Perfila o bloco se for a vez deste turno da thread.
+
+        Produz o caminho do arquivo do perfil (ou None se o turno não for
+        perfilado). Serve tanto para código síncrono quanto para `await`s
+        dentro de uma coroutine; neste caso o perfil também mede as outras
+        coroutines que o event loop executar enquanto o bloco estiver aberto.
+        """
+        self._turnos[thread_id] += 1
+        turno = self._turnos[thread_id]
+        if (turno - 1) % self.every or not self._ocupado.acquire(blocking=False):
+            if not (turno - 1) % self.every:
+                self.skipped += 1
+            yield None
+            return
+
+        path = self.path_for(thread_id, turno)
+        try:
+            if self.mode == "cprofile":
+                perfil = cProfile.Profile()
+                perfil.enable()
+                try:
+                    yield path
+                finally:
+                    perfil.disable()
+                    os.makedirs(self.directory, exist_ok=True)
+                    perfil.dump_stats(path)
+            else:
+                sampler = StackSampler(self.interval).start()
+                try:
+                    yield path
+                finally:
+                    sampler.stop()
+                    os.makedirs(self.directory, exist_ok=True)
+                    sampler.write(path)
+            self.profiled += 1
+        finally:
+            self._ocupado.release()
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "every": self.every,
+            "directory": self.directory,
+            "profiled": self.profiled,
+            "skipped": self.skipped,
+        }
+
+
+def turn_profiler(every: Optional[int] = None) -> Optional[TurnProfiler]:
+    """TurnProfiler se `every` (ou PROFILE_TURNS) for > 0; senão None."""
+    every = PROFILE_TURNS if every is None else every
+    return TurnProfiler(every=every) if every > 0 else None
+
+
+def profiled(
+    profiler: Optional[TurnProfiler], thread_id: str
+) -> contextlib.AbstractContextManager:
+    """`profiler.turn(thread_id)`, ou um contexto vazio sem profiler."""
+    return contextlib.nullcontext() if profiler is None else profiler.turn(thread_id)
+
+
+# ---------------------------------------------------------------------- resumo
+def _ler_cprofile(paths: List[str]) -> Dict[str, list]:
+    """{função: [chamadas, tempo próprio s, tempo total s]} de arquivos .prof."""
+    funcoes: Dict[str, list] = {}
+    if not paths:
+        return funcoes
+    stats = pstats.Stats(*paths)
+    for (arquivo, linha, nome), (_, chamadas, proprio, total, _) in stats.stats.items():
+        rotulo = f"{nome} ({os.path.basename(arquivo)}:{linha})"
+        acumulado = funcoes.setdefault(rotulo, [0, 0.0, 0.0])
+        acumulado[0] += chamadas
+        acumulado[1] += proprio
+        acumulado[2] += total
+    return funcoes
+
+
+def _ler_amostras(paths: List[str]) -> Dict[str, list]:
+    """{função: [amostras, tempo próprio s, tempo total s]} de arquivos .folded."""
+    funcoes: Dict[str, list] = {}
+    for path in paths:
+        intervalo = PROFILE_INTERVAL
+        with open(path, encoding="utf-8") as f:
+            for linha in f:
+                if linha.startswith("# interval="):
+                    intervalo = float(linha.split("=", 1)[1])
+                    continue
+                pilha, n = linha.rstrip("\n").rsplit(" ", 1)
+                quadros = pilha.split(";")[1:]  # O primeiro é o nome da thread
+                tempo = int(n) * intervalo
+                for rotulo in set(quadros):
+                    acumulado = funcoes.setdefault(rotulo, [0, 0.0, 0.0])
+                    acumulado[0] += int(n)
+                    acumulado[2] += tempo
+                funcoes[quadros[-1]][1] += tempo
+    return funcoes
+
+
+def summarize(
+    directory: str = PROFILE_DIR, thread_id: Optional[str] = None
+) -> Tuple[int, Dict[str, list]]:
+    """
+    Junta os perfis de `directory` (e subdiretórios).
+
+    Returns:
+        (número de turnos, {função: [chamadas ou amostras, próprio s, total s]})
+    """
+    prefixo = "*" if thread_id is None else re.sub(r"[^\w.-]", "_", thread_id)
+    encontrados = {
+        ext: glob.glob(
+            os.path.join(glob.escape(directory), "**", f"{prefixo}--turn*{ext}"),
+            recursive=True,
+        )
+        for ext in MODES.values()
+    }
+    funcoes = _ler_cprofile(encontrados[".prof"])
+    for rotulo, valores in _ler_amostras(encontrados[".folded"]).items():
+        acumulado = funcoes.setdefault(rotulo, [0, 0.0, 0.0])
+        for i, valor in enumerate(valores):
+            acumulado[i] += valor
+    return sum(len(p) for p in encontrados.values()), funcoes
+
+
+def print_summary(
+    directory: str = PROFILE_DIR,
+    top: int = 20,
+    sort: str = "self",
+    thread_id: Optional[str] = None,
+) -> None:
+    """Imprime as `top` funções mais quentes de todos os turnos perfilados."""
+    turnos, funcoes = summarize(directory, thread_id)
+    if not turnos:
+        print(f"⚠️  Nenhum perfil em '{directory}'. Rode com PROFILE_TURNS=1.")
+        return
+
+    coluna = 1 if sort == "self" else 2
+    quentes = sorted(funcoes.items(), key=lambda item: item[1][coluna], reverse=True)
+    print("=" * 100)
+    print(f"🔥 FUNÇÕES MAIS QUENTES ({turnos} turnos perfilados, ordem: {sort})")
+    print("=" * 100)
+    print(f"{'função':<64}{'chamadas':>10}{'próprio ms':>13}{'total ms':>13}")
+    print("-" * 100)
+    for rotulo, (chamadas, proprio, total) in quentes[:top]:
+        print(
+            f"{rotulo[:63]:<64}{chamadas:>10}{1000 * proprio:>13.1f}"
+            f"{1000 * total:>13.1f}"
+        )
+    print(
+        "\n💡 Chamadas = contagem do cProfile ou número de amostras (modo sample). "
+        "Tempos somados em todos os turnos."
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perfis dos turnos do chatbot")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    resumo = sub.add_parser("summary", help="Funções mais quentes dos perfis")
+    resumo.add_argument("directory", nargs="?", default=PROFILE_DIR)
+    resumo.add_argument("--top", type=int, default=20)
+    resumo.add_argument("--sort", choices=["self", "total"], default="self")
+    resumo.add_argument("--thread", help="Só os turnos desta thread")
+    args = parser.parse_args()
+
+    print_summary(args.directory, args.top, args.sort, args.thread)
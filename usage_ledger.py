@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script usage_ledger.py
+======================
+Livro-razão de uso por turno, gravado no mesmo banco dos checkpoints.
+
+As tabelas `checkpoints` e `writes` dizem quantos checkpoints cada thread
+tem, mas não quais conversas são caras. Com USAGE_LEDGER=1 cada turno
+concluído ganha uma linha em `turn_ledger`, ao lado delas (em cada shard,
+para as threads daquele shard):
+
+  thread_id, checkpoint_id    checkpoint final do turno (chave)
+  created_at                  epoch Unix do fim do turno
+  latency_seconds             do início do turno (leitura do último
+                              checkpoint) até o checkpoint final gravado
+  tokens_in, tokens_out       `usage_metadata` da resposta (ou estimativa)
+  messages                    mensagens no estado, já depois do recorte
+  checkpoint_bytes            bytes serializados gravados no turno
+
+Quem detecta os turnos é o LedgerSaver (usage_ledger_saver.py), que
+embrulha o checkpointer: o turno começa no `get_tuple` da thread e termina
+no `put` (source "loop") cujo estado acaba numa resposta do assistente. As
+inserções rodam numa thread à parte, fora do caminho crítico do turno.
+Este módulo é só SQL (sem langchain/langgraph), então o visualizador lê o
+ledger sem carregar o graph.
+
+Orçamentos de tokens (opcionais) por thread: antes de o ChatNode chamar o
+LLM, `check_budget` compara tokens_in + tokens_out já gastos pela thread
+com o orçamento e levanta TokenBudgetExceeded se ele tiver acabado. O
+gasto de cada thread é lido do banco uma única vez, ao abrir o ledger, e
+depois só somado em memória: a conferência não faz consultas no caminho
+do turno (nem no event loop do AsyncChatEngine).
+
+O ledger não é apagado junto com os checkpoints (retenção, delete_thread
+ou "limpar"): é o histórico de uso da thread.
+
+Orçamentos (JSON, "*" é o padrão para as threads não listadas):
+{
+    "*": 50000,
+    "usuario_vip": 500000
+}
+
+Configuração por variáveis de ambiente:
+  USAGE_LEDGER=1                 (padrão: 0; um orçamento também liga o ledger)
+  TOKEN_BUDGET=50000             (orçamento padrão por thread)
+  TOKEN_BUDGETS=budgets.json     (orçamentos por thread_id)
+
+Exemplo
+-------
+ledger = UsageLedger("chatbot_memory.db", budgets={"*": 50000})
+graph = build_graph(ledger_saver(SqliteSaver(conn), ledger), ledger=ledger)
+print(usage_by_thread(ledger.conns[0]))
+
+Run
+---
+uv run viewing_conversation_history.py --usage
+"""
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from shard_layout import shard_index, shard_paths
+from storage_profiles import connect
+
+TOKEN_BUDGET = int(os.getenv("TOKEN_BUDGET", "0"))
+TOKEN_BUDGETS_FILE = os.getenv("TOKEN_BUDGETS", "")
+USAGE_LEDGER = os.getenv("USAGE_LEDGER", "0") == "1" or bool(
+    TOKEN_BUDGET or TOKEN_BUDGETS_FILE
+)
+
+LEDGER_TABLE = "turn_ledger"
+
+LEDGER_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {LEDGER_TABLE} (
+    thread_id TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    latency_seconds REAL,
+    tokens_in INTEGER NOT NULL,
+    tokens_out INTEGER NOT NULL,
+    messages INTEGER NOT NULL,
+    checkpoint_bytes INTEGER NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_id)
+)"""
+
+
+class TokenBudgetExceeded(RuntimeError):
+    """A thread já gastou o orçamento de tokens."""
+
+    def __init__(self, thread_id: str, used: int, budget: int) -> None:
+        super().__init__(
+            f"thread '{thread_id}' esgotou o orçamento de tokens ({used}/{budget})"
+        )
+        self.thread_id = thread_id
+        self.used = used
+        self.budget = budget
+
+
+def load_budgets(
+    budgets_path: Optional[str] = None, default: Optional[int] = None
+) -> Dict[str, int]:
+    """Orçamentos a partir de um arquivo JSON e/ou do orçamento padrão."""
+    budgets: Dict[str, int] = {}
+    if budgets_path:
+        with open(budgets_path) as f:
+            budgets = {k: int(v) for k, v in json.load(f).items()}
+    if default:
+        budgets["*"] = default
+    return budgets
+
+
+def ensure_table(conn: sqlite3.Connection) -> None:
+    """Cria `turn_ledger` se ainda não existir."""
+    with conn:
+        conn.execute(LEDGER_SCHEMA)
+
+
+def has_ledger(conn: sqlite3.Connection) -> bool:
+    return (
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (LEDGER_TABLE,),
+        ).fetchone()
+        is not None
+    )
+
+
+def _percentil(valores: List[float], q: float) -> Optional[float]:
+    """Percentil pelo posto mais próximo (`valores` já ordenados)."""
+    if not valores:
+        return None
+    return valores[min(len(valores) - 1, max(0, round(q * len(valores)) - 1))]
+
+
+def usage_by_thread(conns: Sequence[sqlite3.Connection]) -> Dict[str, dict]:
+    """
+    Agregados do ledger por thread (somando os shards).
+
+    Returns:
+        {thread_id: {"turns", "tokens_in", "tokens_out", "tokens",
+        "latency_p50", "latency_p95", "messages", "checkpoint_bytes"}}
+    """
+    linhas: Dict[str, list] = {}
+    for conn in conns:
+        if not has_ledger(conn):
+            continue
+        for linha in conn.execute(
+            f"SELECT thread_id, latency_seconds, tokens_in, tokens_out, messages, "
+            f"checkpoint_bytes FROM {LEDGER_TABLE} ORDER BY created_at"
+        ):
+            linhas.setdefault(linha[0], []).append(linha[1:])
+
+    uso = {}
+    for thread_id, turnos in linhas.items():
+        latencias = sorted(t[0] for t in turnos if t[0] is not None)
+        tokens_in = sum(t[1] for t in turnos)
+        tokens_out = sum(t[2] for t in turnos)
+        uso[thread_id] = {
+            "turns": len(turnos),
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "tokens": tokens_in + tokens_out,
+            "latency_p50": _percentil(latencias, 0.50),
+            "latency_p95": _percentil(latencias, 0.95),
+            "messages": turnos[-1][3],  # No último turno
+            "checkpoint_bytes": sum(t[4] for t in turnos),
+        }
+    return uso
+
+
+class UsageLedger:
+    """
+    Grava as linhas de `turn_ledger` e controla os orçamentos de tokens.
+
+    Usa conexões próprias (uma por shard) e uma thread de escrita, então
+    o turno não espera o INSERT/COMMIT do ledger.
+
+    Args:
+        db_path: Banco dos checkpoints (o mesmo do checkpointer)
+        shards: Número de shards (ver shard_layout.py)
+        budgets: Orçamento de tokens por thread_id ("*" = padrão). Por
+            padrão segue TOKEN_BUDGET / TOKEN_BUDGETS.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "chatbot_memory.db",
+        shards: int = 1,
+        budgets: Optional[Dict[str, int]] = None,
+    ) -> None:
+        self.budgets = (
+            load_budgets(TOKEN_BUDGETS_FILE, TOKEN_BUDGET)
+            if budgets is None
+            else budgets
+        )
+        self.conns = [
+            connect(path, check_same_thread=False)
+            for path in shard_paths(db_path, shards)
+        ]
+        for conn in self.conns:
+            ensure_table(conn)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="usage-ledger"
+        )
+        # Tokens por thread; lock próprio, para não esperar as gravações,
+        # que seguram `_lock`
+        self._lock_usados = threading.Lock()
+        self._usados: Dict[str, int] = self._carregar_usados()
+
+    def _carregar_usados(self) -> Dict[str, int]:
+        """Tokens já gastos por thread, somados em todos os shards."""
+        usados: Dict[str, int] = {}
+        for conn in self.conns:
+            for thread_id, tokens in conn.execute(
+                f"SELECT thread_id, COALESCE(SUM(tokens_in + tokens_out), 0) "
+                f"FROM {LEDGER_TABLE} GROUP BY thread_id"
+            ):
+                usados[thread_id] = usados.get(thread_id, 0) + tokens
+        return usados
+
+    def _conn(self, thread_id: str) -> sqlite3.Connection:
+        return self.conns[shard_index(thread_id, len(self.conns))]
+
+    def _inserir(self, linha: dict) -> None:
+        conn = self._conn(linha["thread_id"])
+        with self._lock, conn:
+            conn.execute(
+                f"INSERT OR IGNORE INTO {LEDGER_TABLE} (thread_id, checkpoint_id, "
+                "created_at, latency_seconds, tokens_in, tokens_out, messages, "
+                "checkpoint_bytes) VALUES (:thread_id, :checkpoint_id, :created_at, "
+                ":latency_seconds, :tokens_in, :tokens_out, :messages, "
+                ":checkpoint_bytes)",
+                linha,
+            )
+
+    def record(self, linha: dict) -> None:
+        """Agenda a gravação de um turno (ver colunas em LEDGER_SCHEMA)."""
+        thread_id = linha["thread_id"]
+        with self._lock_usados:
+            self._usados[thread_id] = (
+                self._usados.get(thread_id, 0)
+                + linha["tokens_in"]
+                + linha["tokens_out"]
+            )
+        self._executor.submit(self._inserir, linha)
+
+    def tokens_used(self, thread_id: str) -> int:
+        """Tokens (entrada + saída) já gastos pela thread (contagem em memória)."""
+        with self._lock_usados:
+            return self._usados.get(thread_id, 0)
+
+    def budget_for(self, thread_id: str) -> Optional[int]:
+        return self.budgets.get(thread_id, self.budgets.get("*"))
+
+    def check_budget(self, thread_id: str) -> None:
+        """Levanta TokenBudgetExceeded se a thread já gastou o orçamento."""
+        budget = self.budget_for(thread_id)
+        if budget is None:
+            return
+        usados = self.tokens_used(thread_id)
+        if usados >= budget:
+            raise TokenBudgetExceeded(thread_id, usados, budget)
+
+    def flush(self) -> None:
+        """Espera as gravações pendentes."""
+        self._executor.submit(lambda: None).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+        for conn in self.conns:
+            conn.close()
+        self.conns = []
+
+
+def budget_checked(func, ledger: UsageLedger):
+    """Nó do graph que confere o orçamento da thread antes de rodar `func`."""
+
+    def verificado(state, config: dict):
+        ledger.check_budget(config["configurable"]["thread_id"])
+        return func(state)
+
+    return verificado
+
+
+def abudget_checked(func, ledger: UsageLedger):
+    """Versão de `budget_checked` para nós assíncronos."""
+
+    async def verificado(state, config: dict):
+        ledger.check_budget(config["configurable"]["thread_id"])
+        return await func(state)
+
+    return verificado
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Senior Data Scientist.: Dr. Eddy Giusepe Chirinos Isidro
+
+Script usage_ledger_saver.py
+============================
+Checkpointer que transforma os turnos do graph em linhas do `turn_ledger`
+(ver usage_ledger.py, que guarda só a parte SQL e os orçamentos).
+
+O turno começa no `get_tuple` da thread (namespace raiz) e termina no
+`put` com source "loop" cujo estado acaba numa resposta do assistente.
+Os bytes gravados no meio (`put` e `put_writes`) são somados ao turno.
+
+Exemplo
+-------
+ledger = UsageLedger("chatbot_memory.db")
+graph = build_graph(ledger_saver(SqliteSaver(conn), ledger), ledger=ledger)
+"""
+import copy
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+
+from metrics import counting_bytes
+from usage_ledger import UsageLedger
+
+
+def _tokens(messages: list) -> Tuple[int, int]:
+    """Tokens de entrada/saída da resposta (estimados se a API não informar)."""
+    uso = messages[-1].usage_metadata
+    if uso:
+        return uso.get("input_tokens", 0), uso.get("output_tokens", 0)
+    return (
+        count_tokens_approximately(messages[:-1]),
+        count_tokens_approximately(messages[-1:]),
+    )
+
+
+class LedgerSaver(BaseCheckpointSaver):
+    """
+    Checkpointer que registra no UsageLedger cada turno concluído.
+
+    Args:
+        saver: Checkpointer de verdade (SqliteSaver, CachedCheckpointSaver...)
+        ledger: Onde gravar as linhas
+    """
+
+    def __init__(self, saver: BaseCheckpointSaver, ledger: UsageLedger) -> None:
+        super().__init__(serde=saver.serde)
+        self.saver = saver
+        self.ledger = ledger
+        self._turnos: Dict[str, list] = {}  # thread_id → [início, bytes]
+
+    def __getattr__(self, nome: str) -> Any:
+        # stats(), clear() etc. do checkpointer embrulhado
+        if nome == "saver" or nome.startswith("__"):
+            raise AttributeError(nome)
+        return getattr(self.saver, nome)
+
+    def _inicio(self, config: RunnableConfig) -> None:
+        if not config["configurable"].get("checkpoint_ns"):
+            self._turnos[config["configurable"]["thread_id"]] = [
+                time.perf_counter(),
+                0,
+            ]
+
+    def _somar(self, config: RunnableConfig, n: int) -> None:
+        turno = self._turnos.get(config["configurable"]["thread_id"])
+        if turno is not None:
+            turno[1] += n
+
+    def _fim(
+        self, config: RunnableConfig, checkpoint: Checkpoint, metadata: dict
+    ) -> None:
+        """Grava a linha se `checkpoint` for o último do turno."""
+        if metadata.get("source") != "loop" or config["configurable"].get(
+            "checkpoint_ns"
+        ):
+            return
+        messages = checkpoint["channel_values"].get("messages") or []
+        if not messages or not isinstance(messages[-1], AIMessage):
+            return
+        thread_id = config["configurable"]["thread_id"]
+        inicio, gravados = self._turnos.pop(thread_id, (None, 0))
+        tokens_in, tokens_out = _tokens(messages)
+        self.ledger.record(
+            {
+                "thread_id": thread_id,
+                "checkpoint_id": checkpoint["id"],
+                "created_at": time.time(),
+                "latency_seconds": (
+                    None if inicio is None else time.perf_counter() - inicio
+                ),
+                "tokens_in": tokens_in,
+                "tokens_out": tokens_out,
+                "messages": len(messages),
+                "checkpoint_bytes": gravados,
+            }
+        )
+
+    # ------------------------------------------------------------------ síncrono
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self._inicio(config)
+        return self.saver.get_tuple(config)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        return self.saver.list(config, filter=filter, before=before, limit=limit)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with counting_bytes() as contador:
+            salvo = self.saver.put(config, checkpoint, metadata, new_versions)
+        self._somar(config, contador[0])
+        self._fim(config, checkpoint, metadata)
+        return salvo
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with counting_bytes() as contador:
+            self.saver.put_writes(config, writes, task_id, task_path)
+        self._somar(config, contador[0])
+
+    def delete_thread(self, thread_id: str) -> None:
+        self._turnos.pop(thread_id, None)
+        self.saver.delete_thread(thread_id)
+
+    # ------------------------------------------------------------------ assíncrono
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        self._inicio(config)
+        return await self.saver.aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for tupla in self.saver.alist(
+            config, filter=filter, before=before, limit=limit
+        ):
+            yield tupla
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        with counting_bytes() as contador:
+            salvo = await self.saver.aput(config, checkpoint, metadata, new_versions)
+        self._somar(config, contador[0])
+        self._fim(config, checkpoint, metadata)
+        return salvo
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        with counting_bytes() as contador:
+            await self.saver.aput_writes(config, writes, task_id, task_path)
+        self._somar(config, contador[0])
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self._turnos.pop(thread_id, None)
+        await self.saver.adelete_thread(thread_id)
+
+    # ------------------------------------------------------------------ delegação
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        return self.saver.get_next_version(current, channel)
+
+    @property
+    def config_specs(self) -> list:
+        return self.saver.config_specs
+
+    def with_allowlist(self, extra_allowlist) -> "LedgerSaver":
+        saver = self.saver.with_allowlist(extra_allowlist)
+        if saver is self.saver:
+            return self
+        clone = copy.copy(self)
+        clone.saver, clone.serde = saver, saver.serde
+        return clone
+
+
+def ledger_saver(
+    saver: BaseCheckpointSaver, ledger: Optional[UsageLedger]
+) -> BaseCheckpointSaver:
+    """Embrulha `saver` no LedgerSaver se houver ledger; senão devolve `saver`."""
+    return saver if ledger is None else LedgerSaver(saver, ledger)
@@ -10,8 +10,11 @@ Run
 ---
 uv run viewing_conversation_history.py
 """
-import sqlite3
-from langgraph.checkpoint.sqlite import SqliteSaver
+from collections import Counter
+
+from shard_layout import find_shards, has_checkpoints, shard_for_thread
+from storage_profiles import connect_readonly
+from usage_ledger import usage_by_thread
 
 
 def ver_historico_thread(
@@ -24,10 +27,22 @@ def ver_historico_thread(
     print(f"💬 HISTÓRICO DA CONVERSA - Thread: {thread_id}")
     print("=" * 40)
 
+    # Só esta opção desserializa checkpoints: as outras são SQL puro e não
+    # carregam langchain/langgraph
+    from compressed_serializer import make_serializer
+    from message_dedup_saver import DedupSqliteSaver
+
     try:
-        # Conecta ao banco usando SqliteSaver
-        conn = sqlite3.connect(db_path, check_same_thread=False)
-        checkpointer = SqliteSaver(conn)
+        # Conecta ao banco (ou ao shard da thread) usando DedupSqliteSaver
+        # (lê checkpoints com e sem deduplicação de mensagens, comprimidos ou não)
+        conn = connect_readonly(
+            shard_for_thread(db_path, thread_id), check_same_thread=False
+        )
+        if not has_checkpoints(conn):
+            print(f"\n⚠️  Nenhum checkpoint encontrado para thread '{thread_id}'")
+            conn.close()
+            return
+        checkpointer = DedupSqliteSaver(conn, serde=make_serializer())
 
         # Configuração da thread
         config = {"configurable": {"thread_id": thread_id}}
@@ -111,38 +126,37 @@ def ver_historico_thread(
 
 def listar_threads_disponiveis(db_path: str = "chatbot_memory.db"):
     """
-    Lista todas as threads disponíveis no banco.
+    Lista todas as threads disponíveis no banco (em todos os shards).
     """
     print("=" * 80)
     print("🧵 THREADS DISPONÍVEIS")
     print("=" * 80)
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Lista threads únicas
-        cursor.execute("SELECT DISTINCT thread_id FROM checkpoints ORDER BY thread_id")
-        threads = cursor.fetchall()
+        # Conta checkpoints por thread em cada arquivo e junta os resultados
+        checkpoints_por_thread = Counter()
+        for path in find_shards(db_path):
+            conn = connect_readonly(path)
+            if not has_checkpoints(conn):
+                conn.close()
+                continue
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"
+            )
+            for thread_id, num in cursor.fetchall():
+                checkpoints_por_thread[thread_id] += num
+            conn.close()
 
-        if not threads:
+        if not checkpoints_por_thread:
             print("\n⚠️  Nenhuma thread encontrada.")
-            conn.close()
             return
 
-        print(f"\n📊 Total de threads: {len(threads)}\n")
-
-        for (thread_id,) in threads:
-            # Conta checkpoints
-            cursor.execute(
-                "SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)
-            )
-            num_checkpoints = cursor.fetchone()[0]
+        print(f"\n📊 Total de threads: {len(checkpoints_por_thread)}\n")
 
+        for thread_id in sorted(checkpoints_por_thread):
             print(f"  🔹 {thread_id}")
-            print(f"      Checkpoints: {num_checkpoints}")
-
-        conn.close()
+            print(f"      Checkpoints: {checkpoints_por_thread[thread_id]}")
 
     except Exception as e:
         print(f"\n❌ Erro: {e}")
@@ -150,61 +164,122 @@ def listar_threads_disponiveis(db_path: str = "chatbot_memory.db"):
 
 def estatisticas_banco(db_path: str = "chatbot_memory.db"):
     """
-    Mostra estatísticas gerais do banco.
+    Mostra estatísticas gerais do banco (somando todos os shards).
     """
     print("=" * 80)
     print("📊 ESTATÍSTICAS DO BANCO DE DADOS")
     print("=" * 80)
 
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
+        import os
 
-        # Threads:
-        cursor.execute("SELECT COUNT(DISTINCT thread_id) FROM checkpoints")
-        num_threads = cursor.fetchone()[0]
+        arquivos = find_shards(db_path)
+        checkpoints_por_thread = Counter()
+        num_writes = 0
+        tamanho = 0.0
 
-        # Checkpoints:
-        cursor.execute("SELECT COUNT(*) FROM checkpoints")
-        num_checkpoints = cursor.fetchone()[0]
+        for path in arquivos:
+            # Tamanho do arquivo:
+            tamanho += os.path.getsize(path) / 1024  # KB
 
-        # Writes:
-        cursor.execute("SELECT COUNT(*) FROM writes")
-        num_writes = cursor.fetchone()[0]
+            conn = connect_readonly(path)
+            if not has_checkpoints(conn):
+                conn.close()
+                continue
+            cursor = conn.cursor()
 
-        # Tamanho do arquivo:
-        import os
+            # Checkpoints por thread:
+            cursor.execute(
+                "SELECT thread_id, COUNT(*) FROM checkpoints GROUP BY thread_id"
+            )
+            for thread_id, num in cursor.fetchall():
+                checkpoints_por_thread[thread_id] += num
+
+            # Writes:
+            cursor.execute("SELECT COUNT(*) FROM writes")
+            num_writes += cursor.fetchone()[0]
 
-        tamanho = os.path.getsize(db_path) / 1024  # KB
+            conn.close()
 
         print(
             f"""
 📈 Resumo:
-  • Threads (conversas): {num_threads}
-  • Checkpoints: {num_checkpoints}
+  • Threads (conversas): {len(checkpoints_por_thread)}
+  • Checkpoints: {sum(checkpoints_por_thread.values())}
   • Writes: {num_writes}
+  • Arquivos (shards): {len(arquivos)}
   • Tamanho do arquivo: {tamanho:.2f} KB
         """
         )
 
         # Threads com mais atividade
-        cursor.execute(
-            """
-            SELECT thread_id, COUNT(*) as num 
-            FROM checkpoints 
-            GROUP BY thread_id 
-            ORDER BY num DESC 
-            LIMIT 5
-        """
-        )
-        top_threads = cursor.fetchall()
+        top_threads = checkpoints_por_thread.most_common(5)
 
         if top_threads:
             print("\n🏆 Top 5 threads mais ativas:")
             for thread_id, num in top_threads:
                 print(f"  • {thread_id}: {num} checkpoints")
 
-        conn.close()
+        # Uso registrado no ledger (USAGE_LEDGER=1), se houver
+        conns = [connect_readonly(path) for path in arquivos]
+        uso = usage_by_thread(conns)
+        for conn in conns:
+            conn.close()
+        if uso:
+            print(
+                f"\n🧾 Ledger: {sum(u['turns'] for u in uso.values())} turnos, "
+                f"{sum(u['tokens'] for u in uso.values())} tokens "
+                "(detalhes em --usage)"
+            )
+
+    except Exception as e:
+        print(f"\n❌ Erro: {e}")
+
+
+def uso_por_thread(db_path: str = "chatbot_memory.db", limit: int = 20):
+    """
+    Mostra o uso por thread registrado em `turn_ledger` (USAGE_LEDGER=1):
+    latência p50/p95 dos turnos e total de tokens, das mais caras para as
+    mais baratas.
+    """
+    print("=" * 96)
+    print("🧾 USO POR THREAD (turn_ledger)")
+    print("=" * 96)
+
+    try:
+        conns = [connect_readonly(path) for path in find_shards(db_path)]
+        uso = usage_by_thread(conns)
+        for conn in conns:
+            conn.close()
+
+        if not uso:
+            print("\n⚠️  Nenhum turno registrado. Rode o chatbot com USAGE_LEDGER=1.")
+            return
+
+        def ms(segundos):
+            return "-" if segundos is None else f"{1000 * segundos:.0f}"
+
+        print(
+            f"\n{'thread_id':<24}{'turnos':>7}{'tokens in':>11}{'tokens out':>11}"
+            f"{'total':>10}{'p50 ms':>9}{'p95 ms':>9}{'msgs':>6}{'KB gravados':>13}"
+        )
+        print("-" * 96)
+        caras = sorted(uso.items(), key=lambda item: item[1]["tokens"], reverse=True)
+        for thread_id, u in caras[:limit]:
+            print(
+                f"{thread_id[:23]:<24}{u['turns']:>7}{u['tokens_in']:>11}"
+                f"{u['tokens_out']:>11}{u['tokens']:>10}{ms(u['latency_p50']):>9}"
+                f"{ms(u['latency_p95']):>9}{u['messages']:>6}"
+                f"{u['checkpoint_bytes'] / 1024:>13.1f}"
+            )
+        if len(caras) > limit:
+            print(f"... e mais {len(caras) - limit} threads")
+
+        print(
+            f"\n📈 Total: {len(uso)} threads, "
+            f"{sum(u['turns'] for u in uso.values())} turnos, "
+            f"{sum(u['tokens'] for u in uso.values())} tokens"
+        )
 
     except Exception as e:
         print(f"\n❌ Erro: {e}")
@@ -214,11 +289,9 @@ def menu_interativo():
     """
     Menu interativo para visualização.
     """
-    import os
-
     db_path = "chatbot_memory.db"
 
-    if not os.path.exists(db_path):
+    if not find_shards(db_path):
         print("⚠️  Arquivo 'chatbot_memory.db' não encontrado.")
         print("Execute o chatbot primeiro para criar o banco de dados.")
         return
@@ -231,6 +304,7 @@ def menu_interativo():
         print("  1. Ver histórico de uma thread")
         print("  2. Listar threads disponíveis")
         print("  3. Ver estatísticas do banco")
+        print("  4. Ver uso por thread (tokens e latência)")
         print("  0. Sair")
         print("-" * 42)
 
@@ -251,6 +325,9 @@ def menu_interativo():
             elif opcao == "3":
                 estatisticas_banco(db_path)
 
+            elif opcao == "4":
+                uso_por_thread(db_path)
+
             elif opcao == "0":
                 print("\n👋 Até logo!")
                 break
@@ -270,9 +347,8 @@ def menu_interativo():
 
 if __name__ == "__main__":
     import sys
-    import os
 
-    if not os.path.exists("chatbot_memory.db"):
+    if not find_shards("chatbot_memory.db"):
         print("⚠️  Arquivo 'chatbot_memory.db' não encontrado.")
         print("Execute o chatbot primeiro para criar o banco de dados.")
         sys.exit(1)
@@ -287,9 +363,12 @@ if __name__ == "__main__":
         listar_threads_disponiveis()
     elif sys.argv[1] == "--stats":
         estatisticas_banco()
+    elif sys.argv[1] == "--usage":
+        uso_por_thread()
     else:
         print("Uso:")
         print("  uv run ver_historico_conversa.py              # Modo interativo")
         print("  uv run ver_historico_conversa.py --thread ID  # Ver thread específica")
         print("  uv run ver_historico_conversa.py --list       # Listar threads")
         print("  uv run ver_historico_conversa.py --stats      # Estatísticas")
+        print("  uv run ver_historico_conversa.py --usage      # Uso por thread")